@@ -6,7 +6,17 @@ DeepSeek V3股票分析演示
 
 import sys
 import os
+import asyncio
+import argparse
+import inspect
+import json
+import time
+import hashlib
+import importlib.util
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
+from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
 
 # 导入日志模块
@@ -20,30 +30,273 @@ sys.path.insert(0, str(project_root))
 # 加载环境变量
 load_dotenv(project_root / ".env", override=True)
 
+@dataclass(frozen=True, slots=True)
+class DeepSeekSettings:
+    """DeepSeek连接配置（从环境变量读取一次）"""
+    api_key: Optional[str]
+    base_url: str
+    
+    @property
+    def chat_kwargs(self) -> Dict[str, Any]:
+        """按已安装ChatOpenAI版本生成的认证参数"""
+        key_kwarg, base_kwarg = _chat_openai_credential_kwargs()
+        return {key_kwarg: self.api_key, base_kwarg: self.base_url}
+
+@lru_cache(maxsize=1)
+def get_settings() -> DeepSeekSettings:
+    """获取DeepSeek配置（缓存，避免各演示重复读取环境变量）"""
+    return DeepSeekSettings(
+        api_key=os.getenv("DEEPSEEK_API_KEY"),
+        base_url=os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
+    )
+
+# 对话响应文件缓存（重复运行演示时直接复用，节省API费用）
+RESPONSE_CACHE_DIR = project_root / ".cache" / "deepseek"
+RESPONSE_CACHE_TTL = 30 * 24 * 3600  # 30天
+RESPONSE_CACHE_ENABLED = True
+
+# 多行提示信息，每块合并为一次日志调用输出
+CONFIG_STEPS_BANNER = (
+    "\n📝 配置步骤:",
+    "1. 访问 https://platform.deepseek.com/",
+    "2. 注册DeepSeek账号并登录",
+    "3. 进入API Keys页面",
+    "4. 创建新的API Key",
+    "5. 在.env文件中设置:",
+    "   DEEPSEEK_API_KEY=your_api_key",
+    "   DEEPSEEK_ENABLED=true",
+)
+
+TRADING_SYSTEM_BANNER = (
+    "\n📝 系统特点:",
+    "- 🧠 使用DeepSeek V3大模型，推理能力强",
+    "- 🛠️ 支持工具调用和智能体协作",
+    "- 📊 可进行多维度股票分析",
+    "- 💰 成本极低，性价比极高",
+    "- 🇨🇳 中文理解能力优秀",
+    "\n💡 使用建议:",
+    "1. 通过Web界面选择DeepSeek模型",
+    "2. 输入股票代码进行分析",
+    "3. 系统将自动调用多个智能体协作分析",
+    "4. 享受高质量、低成本的AI分析服务",
+)
+
+SUCCESS_BANNER = (
+    "\n🎉 所有演示成功！",
+    "\n🚀 DeepSeek V3已成功集成到TradingAgents！",
+    "\n📝 特色功能:",
+    "- 🧠 强大的推理和分析能力",
+    "- 🛠️ 完整的工具调用支持",
+    "- 🤖 多智能体协作分析",
+    "- 💰 极高的性价比",
+    "- 🇨🇳 优秀的中文理解能力",
+    "- 📊 专业的金融分析能力",
+    "\n🎯 下一步:",
+    "1. 在Web界面中选择DeepSeek模型",
+    "2. 开始您的股票投资分析之旅",
+    "3. 体验高性价比的AI投资助手",
+)
+
 def check_deepseek_config():
     """检查DeepSeek配置"""
     logger.debug(f"🔍 检查DeepSeek V3配置...")
     
-    api_key = os.getenv("DEEPSEEK_API_KEY")
-    base_url = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
+    settings = get_settings()
+    api_key = settings.api_key
+    base_url = settings.base_url
     
     if not api_key:
-        logger.error(f"❌ 错误：未找到DeepSeek API密钥")
-        logger.info(f"\n📝 配置步骤:")
-        logger.info(f"1. 访问 https://platform.deepseek.com/")
-        logger.info(f"2. 注册DeepSeek账号并登录")
-        logger.info(f"3. 进入API Keys页面")
-        logger.info(f"4. 创建新的API Key")
-        logger.info(f"5. 在.env文件中设置:")
-        logger.info(f"   DEEPSEEK_API_KEY=your_api_key")
-        logger.info(f"   DEEPSEEK_ENABLED=true")
+        logger.error("❌ 错误：未找到DeepSeek API密钥")
+        logger.info("\n".join(CONFIG_STEPS_BANNER))
         return False
     
     logger.info(f"✅ API Key: {api_key[:12]}...")
     logger.info(f"✅ Base URL: {base_url}")
     return True
 
-def demo_simple_chat():
+# 演示用股票基本信息
+STOCK_INFO = {
+    "AAPL": "苹果公司 - 科技股，主营iPhone、Mac等产品，市值约3万亿美元，P/E: 28.5",
+    "TSLA": "特斯拉 - 电动汽车制造商，由马斯克领导，专注新能源汽车，P/E: 65.2",
+    "MSFT": "微软 - 软件巨头，主营Windows、Office、Azure云服务，P/E: 32.1",
+    "000001": "平安银行 - 中国股份制银行，总部深圳，金融服务业，P/E: 5.8",
+    "600036": "招商银行 - 中国领先银行，零售银行业务突出，P/E: 6.2"
+}
+
+# 工具调用分析的系统提示词
+TOOL_AGENT_SYSTEM_PROMPT = """
+你是一个专业的股票分析师，擅长使用各种工具分析股票。
+请根据用户的问题，使用合适的工具获取信息，然后提供专业的分析建议。
+当需要调用多个相互独立的工具时，优先使用batch_tools一次性并发获取所有信息。
+分析要深入、逻辑清晰，并给出具体的投资建议。
+回答要用中文，格式清晰。
+"""
+
+@lru_cache(maxsize=256)
+def _lookup_stock_info(symbol: str) -> str:
+    """查询股票基本信息（同一会话内按股票代码缓存）"""
+    return STOCK_INFO.get(symbol, f"股票{symbol}的基本信息")
+
+@lru_cache(maxsize=256)
+def _lookup_financial_metrics(symbol: str) -> str:
+    """查询财务指标（同一会话内按股票代码缓存）"""
+    return f"股票{symbol}的财务指标：ROE 15%，毛利率 35%，净利润增长率 12%"
+
+@lru_cache(maxsize=256)
+def _lookup_market_sentiment(symbol: str) -> str:
+    """查询市场情绪（同一会话内按股票代码缓存）"""
+    return f"股票{symbol}当前市场情绪：中性偏乐观，机构持仓比例65%"
+
+@lru_cache(maxsize=1)
+def _build_stock_tools():
+    """构建股票分析工具（@tool会根据类型注解和文档生成参数schema，只构建一次）"""
+    from langchain.tools import tool
+    
+    @tool
+    def get_stock_info(symbol: str) -> str:
+        """获取股票基本信息"""
+        return _lookup_stock_info(symbol)
+    
+    @tool
+    def get_financial_metrics(symbol: str) -> str:
+        """获取财务指标"""
+        return _lookup_financial_metrics(symbol)
+    
+    @tool
+    def get_market_sentiment(symbol: str) -> str:
+        """获取市场情绪"""
+        return _lookup_market_sentiment(symbol)
+    
+    tool_registry = {
+        t.name: t for t in (get_stock_info, get_financial_metrics, get_market_sentiment)
+    }
+    
+    @tool
+    async def batch_tools(invocations: List[Dict[str, Any]]) -> str:
+        """批量并发执行多个相互独立的工具调用，invocations为[{"tool_name": 工具名称, "arguments": {参数}}]列表"""
+        async def _run(invocation: Dict[str, Any]) -> str:
+            target = tool_registry.get(invocation.get("tool_name"))
+            if target is None:
+                return f"未知工具: {invocation.get('tool_name')}"
+            return await target.ainvoke(invocation.get("arguments", {}))
+        
+        outputs = await asyncio.gather(*(_run(item) for item in invocations))
+        return "\n".join(
+            f"[{item.get('tool_name')}] {output}"
+            for item, output in zip(invocations, outputs)
+        )
+    
+    return (get_stock_info, get_financial_metrics, get_market_sentiment, batch_tools)
+
+def create_http_client():
+    """创建所有演示共享的httpx.AsyncClient，复用keep-alive连接（安装了h2时启用HTTP/2）"""
+    import httpx
+    
+    return httpx.AsyncClient(
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        timeout=httpx.Timeout(120.0, connect=10.0)
+    )
+
+def _create_tool_agent(http_client=None):
+    """为给定的HTTP客户端创建带工具的DeepSeek智能体（工具定义只构建一次）"""
+    from tradingagents.llm.deepseek_adapter import create_deepseek_adapter
+    
+    settings = get_settings()
+    adapter = create_deepseek_adapter(
+        model="deepseek-chat", api_key=settings.api_key, base_url=settings.base_url,
+        http_client=http_client
+    )
+    return adapter.create_agent(list(_build_stock_tools()), TOOL_AGENT_SYSTEM_PROMPT, verbose=True)
+
+@lru_cache(maxsize=1)
+def _expected_demo_errors():
+    """演示中预期可能出现的异常类型（依赖缺失、配置错误、API/网络错误），其余异常交由main记录堆栈"""
+    errors = [ImportError, ValueError]
+    try:
+        import openai
+        errors.append(openai.APIError)
+    except ImportError:
+        pass
+    try:
+        import httpx
+        errors.append(httpx.HTTPError)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+@lru_cache(maxsize=1)
+def _chat_openai_credential_kwargs():
+    """探测已安装的ChatOpenAI支持的参数名（新版本为api_key/base_url，旧版本为openai_api_key/openai_api_base），只探测一次"""
+    from langchain_openai import ChatOpenAI
+    
+    parameters = inspect.signature(ChatOpenAI).parameters
+    if "api_key" in parameters and "base_url" in parameters:
+        return "api_key", "base_url"
+    return "openai_api_key", "openai_api_base"
+
+def _response_cache_key(model: str, temperature: float, messages) -> str:
+    """根据模型、温度和消息内容生成缓存键"""
+    payload = json.dumps(
+        [model, temperature, [m.content for m in messages]],
+        ensure_ascii=False
+    )
+    return hashlib.md5(payload.encode("utf-8")).hexdigest()
+
+def _load_cached_response(cache_key: str) -> Optional[str]:
+    """读取未过期的缓存响应"""
+    cache_path = RESPONSE_CACHE_DIR / f"{cache_key}.json"
+    try:
+        if time.time() - cache_path.stat().st_mtime > RESPONSE_CACHE_TTL:
+            return None
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)["content"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _save_cached_response(cache_key: str, content: str) -> None:
+    """保存响应到缓存，失败时仅记录警告"""
+    try:
+        RESPONSE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(RESPONSE_CACHE_DIR / f"{cache_key}.json", "w", encoding="utf-8") as f:
+            json.dump({"content": content}, f, ensure_ascii=False)
+    except OSError as e:
+        logger.warning(f"⚠️ 响应缓存写入失败: {e}")
+
+async def cached_stream(model: str, temperature: float, messages, stream_factory):
+    """带文件缓存的流式输出：命中缓存时直接返回缓存内容，否则调用模型并在完成后写入缓存"""
+    cache_key = _response_cache_key(model, temperature, messages)
+    if RESPONSE_CACHE_ENABLED:
+        cached = _load_cached_response(cache_key)
+        if cached is not None:
+            logger.info(f"💾 使用缓存响应 ({cache_key[:8]})")
+            yield cached
+            return
+    
+    parts = []
+    async for text in stream_factory():
+        parts.append(text)
+        yield text
+    _save_cached_response(cache_key, "".join(parts))
+
+async def _stream_to_stdout(tag: str, chunks) -> str:
+    """将流式输出按行写到stdout（带标签避免并发演示之间的输出交错），返回完整文本"""
+    parts = []
+    line = ""
+    async for text in chunks:
+        parts.append(text)
+        line += text
+        *complete, line = line.split("\n")
+        for row in complete:
+            sys.stdout.write(f"[{tag}] {row}\n")
+        if complete:
+            sys.stdout.flush()
+    if line:
+        sys.stdout.write(f"[{tag}] {line}\n")
+        sys.stdout.flush()
+    return "".join(parts)
+
+async def demo_simple_chat(http_client=None):
     """演示简单对话功能"""
     logger.info(f"\n🤖 演示DeepSeek V3简单对话...")
     
@@ -51,25 +304,14 @@ def demo_simple_chat():
         from langchain_openai import ChatOpenAI
         from langchain.schema import HumanMessage
         
-        # 创建DeepSeek模型
-        try:
-            # 尝试新版本参数
-            llm = ChatOpenAI(
-                model="deepseek-chat",
-                api_key=os.getenv("DEEPSEEK_API_KEY"),
-                base_url=os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com"),
-                temperature=0.1,
-                max_tokens=500
-            )
-        except Exception:
-            # 回退到旧版本参数
-            llm = ChatOpenAI(
-                model="deepseek-chat",
-                openai_api_key=os.getenv("DEEPSEEK_API_KEY"),
-                openai_api_base=os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com"),
-                temperature=0.1,
-                max_tokens=500
-            )
+        # 创建DeepSeek模型（按已安装版本选择参数名，避免失败的构造再回退）
+        llm = ChatOpenAI(
+            model="deepseek-chat",
+            **get_settings().chat_kwargs,
+            **({"http_async_client": http_client} if http_client is not None else {}),
+            temperature=0.1,
+            max_tokens=500
+        )
         
         # 测试对话
         messages = [HumanMessage(content="""
@@ -81,16 +323,22 @@ def demo_simple_chat():
         """)]
         
         logger.info(f"💭 正在生成回答...")
-        response = llm.invoke(messages)
-        logger.info(f"🎯 DeepSeek V3回答:\n{response.content}")
+        logger.info(f"🎯 DeepSeek V3回答:")
+        await _stream_to_stdout(
+            "简单对话",
+            cached_stream(
+                "deepseek-chat", 0.1, messages,
+                lambda: (chunk.content async for chunk in llm.astream(messages) if chunk.content)
+            )
+        )
         
         return True
         
-    except Exception as e:
-        logger.error(f"❌ 简单对话演示失败: {e}")
+    except _expected_demo_errors() as e:
+        logger.error("❌ 简单对话演示失败: %s", e)
         return False
 
-def demo_reasoning_analysis():
+async def demo_reasoning_analysis(http_client=None):
     """演示推理分析功能"""
     logger.info(f"\n🧠 演示DeepSeek V3推理分析...")
     
@@ -99,7 +347,11 @@ def demo_reasoning_analysis():
         from langchain.schema import HumanMessage
         
         # 创建DeepSeek适配器
-        adapter = create_deepseek_adapter(model="deepseek-chat")
+        settings = get_settings()
+        adapter = create_deepseek_adapter(
+            model="deepseek-chat", api_key=settings.api_key, base_url=settings.base_url,
+            http_client=http_client
+        )
         
         # 复杂推理任务
         complex_query = """
@@ -123,59 +375,28 @@ def demo_reasoning_analysis():
         messages = [HumanMessage(content=complex_query)]
         
         logger.info(f"💭 正在进行深度分析...")
-        response = adapter.chat(messages)
-        logger.info(f"🎯 DeepSeek V3分析:\n{response}")
+        logger.info(f"🎯 DeepSeek V3分析:")
+        await _stream_to_stdout(
+            "推理分析",
+            cached_stream(
+                adapter.model, adapter.temperature, messages,
+                lambda: adapter.astream_chat(messages)
+            )
+        )
         
         return True
         
-    except Exception as e:
-        logger.error(f"❌ 推理分析演示失败: {e}")
+    except _expected_demo_errors() as e:
+        logger.error("❌ 推理分析演示失败: %s", e)
         return False
 
-def demo_stock_analysis_with_tools():
+async def demo_stock_analysis_with_tools(http_client=None):
     """演示带工具的股票分析"""
     logger.info(f"\n📊 演示DeepSeek V3工具调用股票分析...")
     
     try:
-        from tradingagents.llm.deepseek_adapter import create_deepseek_adapter
-        from langchain.tools import tool
-        
-        # 定义股票分析工具
-        @tool
-        def get_stock_info(symbol: str) -> str:
-            """获取股票基本信息"""
-            stock_data = {
-                "AAPL": "苹果公司 - 科技股，主营iPhone、Mac等产品，市值约3万亿美元，P/E: 28.5",
-                "TSLA": "特斯拉 - 电动汽车制造商，由马斯克领导，专注新能源汽车，P/E: 65.2",
-                "MSFT": "微软 - 软件巨头，主营Windows、Office、Azure云服务，P/E: 32.1",
-                "000001": "平安银行 - 中国股份制银行，总部深圳，金融服务业，P/E: 5.8",
-                "600036": "招商银行 - 中国领先银行，零售银行业务突出，P/E: 6.2"
-            }
-            return stock_data.get(symbol, f"股票{symbol}的基本信息")
-        
-        @tool
-        def get_financial_metrics(symbol: str) -> str:
-            """获取财务指标"""
-            return f"股票{symbol}的财务指标：ROE 15%，毛利率 35%，净利润增长率 12%"
-        
-        @tool
-        def get_market_sentiment(symbol: str) -> str:
-            """获取市场情绪"""
-            return f"股票{symbol}当前市场情绪：中性偏乐观，机构持仓比例65%"
-        
-        # 创建DeepSeek适配器
-        adapter = create_deepseek_adapter(model="deepseek-chat")
-        
-        # 创建智能体
-        tools = [get_stock_info, get_financial_metrics, get_market_sentiment]
-        system_prompt = """
-        你是一个专业的股票分析师，擅长使用各种工具分析股票。
-        请根据用户的问题，使用合适的工具获取信息，然后提供专业的分析建议。
-        分析要深入、逻辑清晰，并给出具体的投资建议。
-        回答要用中文，格式清晰。
-        """
-        
-        agent = adapter.create_agent(tools, system_prompt, verbose=True)
+        # 智能体绑定在本次main()创建的HTTP客户端上，客户端关闭后不再复用
+        agent = _create_tool_agent(http_client)
         
         # 测试股票分析
         test_queries = [
@@ -183,117 +404,146 @@ def demo_stock_analysis_with_tools():
             "对比分析招商银行(600036)和平安银行(000001)，哪个更值得投资？"
         ]
         
-        for query in test_queries:
+        # 各问题相互独立，批量并发提交
+        logger.info(f"💭 正在并发分析 {len(test_queries)} 个问题...")
+        
+        inputs = [{"input": query} for query in test_queries]
+        results = await agent.abatch(inputs, config={"max_concurrency": len(inputs)})
+        
+        for query, result in zip(test_queries, results):
             logger.info(f"\n❓ 用户问题: {query}")
-            logger.info(f"💭 正在分析...")
-            
-            result = agent.invoke({"input": query})
             logger.info(f"🎯 分析结果:\n{result['output']}")
             logger.info(f"-")
         
         return True
         
-    except Exception as e:
-        logger.error(f"❌ 工具调用演示失败: {e}")
+    except _expected_demo_errors() as e:
+        logger.error("❌ 工具调用演示失败: %s", e)
         return False
 
-def demo_trading_system():
-    """演示完整的交易分析系统"""
+@lru_cache(maxsize=8)
+def _get_trading_graph(llm_provider: str, deep_think_llm: str, quick_think_llm: str,
+                       max_debate_rounds: int, online_tools: bool):
+    """按配置缓存TradingAgentsGraph实例（config为不可哈希的dict，因此以标量参数作为缓存键）"""
+    from tradingagents.default_config import DEFAULT_CONFIG
+    from tradingagents.graph.trading_graph import TradingAgentsGraph
+    
+    config = DEFAULT_CONFIG.copy()
+    config["llm_provider"] = llm_provider
+    config["deep_think_llm"] = deep_think_llm
+    config["quick_think_llm"] = quick_think_llm
+    config["max_debate_rounds"] = max_debate_rounds
+    config["online_tools"] = online_tools
+    return TradingAgentsGraph(debug=True, config=config)
+
+async def demo_trading_system(http_client=None):
+    """演示完整的交易分析系统（图内各智能体自行管理LLM客户端，不使用共享连接池）"""
     logger.info(f"\n🎯 演示DeepSeek V3完整交易分析系统...")
     
     try:
-        from tradingagents.default_config import DEFAULT_CONFIG
-        from tradingagents.graph.trading_graph import TradingAgentsGraph
-
-        
-        # 配置DeepSeek
-        config = DEFAULT_CONFIG.copy()
-        config["llm_provider"] = "deepseek"
-        config["deep_think_llm"] = "deepseek-chat"
-        config["quick_think_llm"] = "deepseek-chat"
-        config["max_debate_rounds"] = 1  # 快速演示
-        config["online_tools"] = False   # 使用缓存数据
-        
         logger.info(f"🏗️ 创建DeepSeek交易分析图...")
-        ta = TradingAgentsGraph(debug=True, config=config)
-        
-        logger.info(f"✅ DeepSeek V3交易分析系统初始化成功！")
-        logger.info(f"\n📝 系统特点:")
-        logger.info(f"- 🧠 使用DeepSeek V3大模型，推理能力强")
-        logger.info(f"- 🛠️ 支持工具调用和智能体协作")
-        logger.info(f"- 📊 可进行多维度股票分析")
-        logger.info(f"- 💰 成本极低，性价比极高")
-        logger.info(f"- 🇨🇳 中文理解能力优秀")
+        # 图的构建是同步的，放到线程中执行以免阻塞其他演示
+        ta = await asyncio.to_thread(
+            _get_trading_graph,
+            "deepseek",
+            "deepseek-chat",
+            "deepseek-chat",
+            1,      # 快速演示
+            False   # 使用缓存数据
+        )
         
-        logger.info(f"\n💡 使用建议:")
-        logger.info(f"1. 通过Web界面选择DeepSeek模型")
-        logger.info(f"2. 输入股票代码进行分析")
-        logger.info(f"3. 系统将自动调用多个智能体协作分析")
-        logger.info(f"4. 享受高质量、低成本的AI分析服务")
+        logger.info("✅ DeepSeek V3交易分析系统初始化成功！")
+        logger.info("\n".join(TRADING_SYSTEM_BANNER))
         
         return True
         
-    except Exception as e:
-        logger.error(f"❌ 交易系统演示失败: {e}")
+    except _expected_demo_errors() as e:
+        logger.error("❌ 交易系统演示失败: %s", e)
         return False
 
-def main():
+# 可选演示（重量级依赖均在各演示函数内部按需导入，未选中的演示不会产生导入开销）
+DEMOS = {
+    "simple": ("简单对话", demo_simple_chat),
+    "reasoning": ("推理分析", demo_reasoning_analysis),
+    "tools": ("工具调用分析", demo_stock_analysis_with_tools),
+    "trading": ("完整交易系统", demo_trading_system),
+}
+
+async def main(selected_demos: Optional[List[str]] = None):
     """主演示函数"""
-    logger.info(f"🎯 DeepSeek V3股票分析演示")
-    logger.info(f"=")
+    logger.info("🎯 DeepSeek V3股票分析演示\n=")
     
     # 检查配置
     if not check_deepseek_config():
         return False
     
     # 运行演示
-    demos = [
-        ("简单对话", demo_simple_chat),
-        ("推理分析", demo_reasoning_analysis),
-        ("工具调用分析", demo_stock_analysis_with_tools),
-        ("完整交易系统", demo_trading_system),
-    ]
+    demos = [DEMOS[key] for key in (selected_demos or DEMOS)]
+    
+    # 各演示之间相互独立且主要耗时在网络请求上，并发执行，并共享同一个HTTP连接池
+    async with create_http_client() as http_client:
+        results = await asyncio.gather(
+            *(demo_func(http_client) for _, demo_func in demos),
+            return_exceptions=True
+        )
     
     success_count = 0
-    for demo_name, demo_func in demos:
+    for (demo_name, _), result in zip(demos, results):
         logger.info(f"\n{'='*20} {demo_name} {'='*20}")
-        try:
-            if demo_func():
-                success_count += 1
-                logger.info(f"✅ {demo_name}演示成功")
-            else:
-                logger.error(f"❌ {demo_name}演示失败")
-        except Exception as e:
-            logger.error(f"❌ {demo_name}演示异常: {e}")
+        if isinstance(result, Exception):
+            # 非预期异常：保留完整堆栈，仅在日志被输出时才格式化
+            logger.error("❌ %s演示异常: %s", demo_name, result, exc_info=result)
+        elif result:
+            success_count += 1
+            logger.info(f"✅ {demo_name}演示成功")
+        else:
+            logger.error("❌ %s演示失败", demo_name)
     
     # 总结
-    logger.info(f"\n")
-    logger.info(f"📋 演示总结")
-    logger.info(f"=")
-    logger.info(f"成功演示: {success_count}/{len(demos)}")
+    logger.info(f"\n\n📋 演示总结\n=\n成功演示: {success_count}/{len(demos)}")
     
     if success_count == len(demos):
-        logger.info(f"\n🎉 所有演示成功！")
-        logger.info(f"\n🚀 DeepSeek V3已成功集成到TradingAgents！")
-        logger.info(f"\n📝 特色功能:")
-        logger.info(f"- 🧠 强大的推理和分析能力")
-        logger.info(f"- 🛠️ 完整的工具调用支持")
-        logger.info(f"- 🤖 多智能体协作分析")
-        logger.info(f"- 💰 极高的性价比")
-        logger.info(f"- 🇨🇳 优秀的中文理解能力")
-        logger.info(f"- 📊 专业的金融分析能力")
-        
-        logger.info(f"\n🎯 下一步:")
-        logger.info(f"1. 在Web界面中选择DeepSeek模型")
-        logger.info(f"2. 开始您的股票投资分析之旅")
-        logger.info(f"3. 体验高性价比的AI投资助手")
+        logger.info("\n".join(SUCCESS_BANNER))
     else:
-        logger.error(f"\n⚠️ {len(demos) - success_count} 个演示失败")
-        logger.info(f"请检查API密钥配置和网络连接")
+        logger.error("\n⚠️ %d 个演示失败", len(demos) - success_count)
+        logger.info("请检查API密钥配置和网络连接")
     
     return success_count == len(demos)
 
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="DeepSeek V3股票分析演示")
+    parser.add_argument(
+        "--demos",
+        default=",".join(DEMOS),
+        help=f"要运行的演示，逗号分隔 (可选: {','.join(DEMOS)})"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="不使用本地响应缓存，强制重新请求DeepSeek"
+    )
+    parser.add_argument(
+        "--skip-trading-system",
+        action="store_true",
+        help="跳过完整交易系统演示（避免加载整个智能体框架）"
+    )
+    args = parser.parse_args()
+    
+    global RESPONSE_CACHE_ENABLED
+    RESPONSE_CACHE_ENABLED = not args.no_cache
+    
+    selected = [name.strip() for name in args.demos.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in DEMOS]
+    if unknown:
+        parser.error(f"未知的演示: {', '.join(unknown)}")
+    if args.skip_trading_system:
+        selected = [name for name in selected if name != "trading"]
+    if not selected:
+        parser.error("至少需要选择一个演示")
+    return selected
+
 if __name__ == "__main__":
-    success = main()
+    success = asyncio.run(main(parse_args()))
     logger.error(f"\n{'🎉 演示完成' if success else '❌ 演示失败'}")
     sys.exit(0 if success else 1)
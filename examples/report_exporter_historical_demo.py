@@ -136,11 +136,12 @@ def main():
     print("-" * 40)
     
     # Extract data from both formats
-    current_stock, current_decision, current_state, current_metadata = exporter._extract_current_data(current_data)
-    historical_stock, historical_decision, historical_state, historical_metadata = exporter._extract_historical_data(historical_data)
+    current = exporter._extract_current_data(current_data)
+    historical = exporter._extract_historical_data(historical_data)
+    historical_metadata = historical.metadata
     
-    print(f"Current format - Stock: {current_stock}, LLM: {current_metadata.get('llm_provider')}")
-    print(f"Historical format - Stock: {historical_stock}, LLM: {historical_metadata.get('llm_provider')}")
+    print(f"Current format - Stock: {current.stock_symbol}, LLM: {current.metadata.get('llm_provider')}")
+    print(f"Historical format - Stock: {historical.stock_symbol}, LLM: {historical_metadata.get('llm_provider')}")
     print(f"Historical metadata includes: analysis_id={historical_metadata.get('analysis_id') is not None}, "
           f"execution_time={historical_metadata.get('execution_time')}, "
           f"cost_summary={historical_metadata.get('cost_summary')}")
@@ -148,9 +149,10 @@ def main():
     print("\n💾 Export Testing")
     print("-" * 40)
     
-    # Test markdown export for both formats
-    current_export = exporter.export_report(current_data, 'markdown')
-    historical_export = exporter.export_report(historical_data, 'markdown')
+    # Test markdown export for both formats in one batch
+    current_export, historical_export = exporter.export_report_batch(
+        [current_data, historical_data], 'markdown'
+    )
     
     print(f"Current data export successful: {current_export is not None}")
     print(f"Historical data export successful: {historical_export is not None}")
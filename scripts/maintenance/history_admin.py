@@ -18,7 +18,6 @@ project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 from tradingagents.utils.logging_manager import get_logger
-from web.utils.history_data_manager import get_data_manager, HistoryDataManager
 
 # Setup logging
 logger = get_logger('history_admin')
@@ -28,6 +27,8 @@ class HistoryAdminCLI:
     """Command-line interface for history administration"""
     
     def __init__(self):
+        # Imported here so help and usage errors don't load the MongoDB stack
+        from web.utils.history_data_manager import get_data_manager
         self.data_manager = get_data_manager()
     
     def cleanup_command(self, args) -> None:
@@ -46,6 +47,7 @@ class HistoryAdminCLI:
                     logger.info(f"📊 Dry run: Would delete {result['total_found']} failed records")
                 else:
                     logger.info(f"✅ Deleted {result['deleted_count']} failed records")
+                    self._refresh_statistics_after_cleanup(result)
             else:
                 logger.error(f"❌ Cleanup failed: {result.get('error', 'Unknown error')}")
                 sys.exit(1)
@@ -63,18 +65,43 @@ class HistoryAdminCLI:
                     if "sample_records" in result:
                         logger.info("📋 Sample records that would be deleted:")
                         for record in result["sample_records"][:5]:
-                            logger.info(f"  - {record['analysis_id']}: {record['stock_symbol']} ({record['created_at']})")
+                            logger.info("  - %s: %s (%s)", record['analysis_id'], record['stock_symbol'], record['created_at'])
                 else:
                     logger.info(f"✅ Deleted {result['deleted_count']} records in {result['processed_batches']} batches")
                     logger.info(f"⏱️ Operation completed in {result['duration']:.2f} seconds")
+                    self._refresh_statistics_after_cleanup(result)
             else:
                 logger.error(f"❌ Cleanup failed: {result.get('error', 'Unknown error')}")
                 sys.exit(1)
     
+    def _refresh_statistics_after_cleanup(self, result: Dict[str, Any]) -> None:
+        """Keep the materialized statistics in sync after records were deleted"""
+        if result.get("deleted_count", 0) > 0:
+            refresh = self.data_manager.refresh_statistics_view()
+            if not refresh["success"]:
+                logger.warning(f"⚠️ Failed to refresh statistics view: {refresh.get('error', 'Unknown error')}")
+    
+    @staticmethod
+    def _log_distribution(title: str, distribution: Dict[str, int], total: int) -> None:
+        """Log counts with their share of ``total``"""
+        if not distribution:
+            return
+        
+        # One division for the whole table instead of one per row
+        scale = 100.0 / total if total else 0.0
+        logger.info(title)
+        for key, count in distribution.items():
+            logger.info("  %s: %s (%.1f%%)", key, f"{count:,}", count * scale)
+    
     def stats_command(self, args) -> None:
         """Execute statistics command"""
         logger.info("📊 Gathering analysis history statistics...")
         
+        if args.refresh_view:
+            refresh = self.data_manager.refresh_statistics_view()
+            if not refresh["success"]:
+                logger.warning(f"⚠️ Failed to refresh statistics view: {refresh.get('error', 'Unknown error')}")
+        
         stats = self.data_manager.get_storage_statistics()
         
         if not stats["success"]:
@@ -91,19 +118,9 @@ class HistoryAdminCLI:
         logger.info(f"  Index Size: {storage_info['index_size_mb']:.2f} MB")
         logger.info(f"  Average Document Size: {storage_info['average_document_size_bytes']:,} bytes")
         
-        # Display status distribution
-        if stats["status_distribution"]:
-            logger.info("\n📈 Status Distribution:")
-            for status, count in stats["status_distribution"].items():
-                percentage = (count / storage_info['total_documents']) * 100
-                logger.info(f"  {status}: {count:,} ({percentage:.1f}%)")
-        
-        # Display market distribution
-        if stats["market_distribution"]:
-            logger.info("\n🌍 Market Distribution:")
-            for market, count in stats["market_distribution"].items():
-                percentage = (count / storage_info['total_documents']) * 100
-                logger.info(f"  {market}: {count:,} ({percentage:.1f}%)")
+        # Display status and market distributions
+        self._log_distribution("\n📈 Status Distribution:", stats["status_distribution"], storage_info['total_documents'])
+        self._log_distribution("\n🌍 Market Distribution:", stats["market_distribution"], storage_info['total_documents'])
         
         # Display performance statistics
         if stats["performance_stats"]:
@@ -124,7 +141,7 @@ class HistoryAdminCLI:
                 logger.info("\n📅 Recent Activity (Last 7 Days):")
                 for day in recent_days:
                     count = stats["daily_counts_last_30_days"][day]
-                    logger.info(f"  {day}: {count:,} analyses")
+                    logger.info("  %s: %s analyses", day, f"{count:,}")
         
         # Check for alerts if requested
         if args.check_alerts:
@@ -132,19 +149,20 @@ class HistoryAdminCLI:
             alerts = self.data_manager.check_storage_alerts(
                 max_size_mb=args.max_size_mb,
                 max_documents=args.max_documents,
-                max_daily_growth=args.max_daily_growth
+                max_daily_growth=args.max_daily_growth,
+                stats=stats
             )
             
             if alerts["success"]:
                 if alerts["alert_count"] > 0:
                     logger.warning(f"⚠️ Found {alerts['alert_count']} alerts:")
                     for alert in alerts["alerts"]:
-                        logger.warning(f"  - {alert['type']}: {alert['message']}")
+                        logger.warning("  - %s: %s", alert['type'], alert['message'])
                 
                 if alerts["warning_count"] > 0:
                     logger.info(f"💡 Found {alerts['warning_count']} warnings:")
                     for warning in alerts["warnings"]:
-                        logger.info(f"  - {warning['type']}: {warning['message']}")
+                        logger.info("  - %s: %s", warning['type'], warning['message'])
                 
                 if alerts["alert_count"] == 0 and alerts["warning_count"] == 0:
                     logger.info("✅ No storage alerts or warnings")
@@ -214,36 +232,76 @@ class HistoryAdminCLI:
         """Execute monitoring command"""
         logger.info("🔍 Starting analysis history monitoring...")
         
-        # Get current statistics
-        stats = self.data_manager.get_storage_statistics()
-        if not stats["success"]:
-            logger.error(f"❌ Failed to get statistics: {stats.get('error', 'Unknown error')}")
-            sys.exit(1)
+        if args.loop:
+            self._monitor_loop(args)
+            return
+        
+        # Full statistics are only needed for the verbose report; the alert
+        # check gathers what it needs on its own
+        stats = None
+        if args.verbose:
+            stats = self.data_manager.get_storage_statistics()
+            if not stats["success"]:
+                logger.error(f"❌ Failed to get statistics: {stats.get('error', 'Unknown error')}")
+                sys.exit(1)
         
         # Check alerts
         alerts = self.data_manager.check_storage_alerts(
             max_size_mb=args.max_size_mb,
             max_documents=args.max_documents,
-            max_daily_growth=args.max_daily_growth
+            max_daily_growth=args.max_daily_growth,
+            stats=stats
         )
         
         if not alerts["success"]:
             logger.error(f"❌ Failed to check alerts: {alerts.get('error', 'Unknown error')}")
             sys.exit(1)
         
+        self._report_monitoring(alerts, stats, args)
+    
+    def _monitor_loop(self, args) -> None:
+        """Keep monitoring in one process, reporting every ``args.loop`` seconds"""
+        logger.info(f"🔁 Monitoring every {args.loop} seconds (Ctrl+C to stop)")
+        
+        for alerts in self.data_manager.watch_storage_alerts(
+            interval=args.loop,
+            max_size_mb=args.max_size_mb,
+            max_documents=args.max_documents,
+            max_daily_growth=args.max_daily_growth
+        ):
+            if not alerts["success"]:
+                logger.error(f"❌ Failed to check alerts: {alerts.get('error', 'Unknown error')}")
+                sys.exit(1)
+            
+            self._report_monitoring(alerts, None, args)
+    
+    def _report_monitoring(self, alerts: Dict[str, Any], stats: Optional[Dict[str, Any]], args) -> None:
+        """Log a monitoring report for one alert check"""
         # Generate monitoring report
-        storage_info = stats["storage_info"]
+        storage_info = alerts["storage_stats"]
         
         logger.info("\n📊 Current Status:")
         logger.info(f"  Documents: {storage_info['total_documents']:,}")
         logger.info(f"  Storage Size: {storage_info['total_size_mb']:.2f} MB")
         logger.info(f"  Index Size: {storage_info['index_size_mb']:.2f} MB")
         
+        if stats is not None:
+            if stats["status_distribution"]:
+                logger.info("\n📈 Status Distribution:")
+                for status, count in stats["status_distribution"].items():
+                    logger.info("  %s: %s", status, f"{count:,}")
+            
+            recent_days = sorted(stats["daily_counts_last_30_days"].keys())[-7:]
+            if recent_days:
+                logger.info("\n📅 Recent Activity (Last 7 Days):")
+                for day in recent_days:
+                    logger.info("  %s: %s analyses", day, f"{stats['daily_counts_last_30_days'][day]:,}")
+        
         # Report alerts and warnings
         if alerts["alert_count"] > 0:
             logger.error(f"\n🚨 ALERTS ({alerts['alert_count']}):")
             for alert in alerts["alerts"]:
-                logger.error(f"  - {alert['message']}")
+                logger.error("  - %s", alert['message'])
             
             # Exit with error code if there are alerts
             if args.exit_on_alert:
@@ -252,7 +310,7 @@ class HistoryAdminCLI:
         if alerts["warning_count"] > 0:
             logger.warning(f"\n⚠️ WARNINGS ({alerts['warning_count']}):")
             for warning in alerts["warnings"]:
-                logger.warning(f"  - {warning['message']}")
+                logger.warning("  - %s", warning['message'])
         
         if alerts["alert_count"] == 0 and alerts["warning_count"] == 0:
             logger.info("\n✅ All monitoring checks passed")
@@ -263,42 +321,8 @@ class HistoryAdminCLI:
             logger.info(f"   Command: python {__file__} cleanup --max-age-days 180 --dry-run")
 
 
-def main():
-    """Main CLI entry point"""
-    parser = argparse.ArgumentParser(
-        description="Analysis History Administration Utilities",
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
-Examples:
-  # Show storage statistics
-  python history_admin.py stats
-  
-  # Check for storage alerts
-  python history_admin.py stats --check-alerts
-  
-  # Cleanup records older than 1 year (dry run)
-  python history_admin.py cleanup --max-age-days 365 --dry-run
-  
-  # Cleanup failed records older than 24 hours
-  python history_admin.py cleanup --failed-only --failed-age-hours 24
-  
-  # Export all data to compressed JSON
-  python history_admin.py export data_backup.json.gz --compress
-  
-  # Export data from specific date range
-  python history_admin.py export recent_data.json --date-from 2025-01-01 --date-to 2025-01-31
-  
-  # Import data from backup
-  python history_admin.py import data_backup.json.gz
-  
-  # Monitor storage and exit with error if alerts found
-  python history_admin.py monitor --exit-on-alert
-        """
-    )
-    
-    subparsers = parser.add_subparsers(dest='command', help='Available commands')
-    
-    # Cleanup command
+def _add_cleanup_parser(subparsers) -> None:
+    """Register the cleanup subcommand"""
     cleanup_parser = subparsers.add_parser('cleanup', help='Clean up old or failed analysis records')
     cleanup_parser.add_argument('--max-age-days', type=int, default=365,
                                help='Maximum age of records to keep in days (default: 365)')
@@ -310,19 +334,25 @@ Examples:
                                help='Only clean up failed/error records')
     cleanup_parser.add_argument('--failed-age-hours', type=int, default=24,
                                help='Maximum age of failed records to keep in hours (default: 24)')
-    
-    # Statistics command
+
+
+def _add_stats_parser(subparsers) -> None:
+    """Register the stats subcommand"""
     stats_parser = subparsers.add_parser('stats', help='Show storage statistics and usage information')
     stats_parser.add_argument('--check-alerts', action='store_true',
                              help='Also check for storage alerts and warnings')
+    stats_parser.add_argument('--refresh-view', action='store_true',
+                             help='Rebuild the materialized statistics before reporting')
     stats_parser.add_argument('--max-size-mb', type=int, default=1000,
                              help='Maximum storage size in MB for alerts (default: 1000)')
     stats_parser.add_argument('--max-documents', type=int, default=100000,
                              help='Maximum number of documents for alerts (default: 100000)')
     stats_parser.add_argument('--max-daily-growth', type=int, default=1000,
                              help='Maximum daily document growth for alerts (default: 1000)')
-    
-    # Export command
+
+
+def _add_export_parser(subparsers) -> None:
+    """Register the export subcommand"""
     export_parser = subparsers.add_parser('export', help='Export analysis history data')
     export_parser.add_argument('output_path', help='Output file path')
     export_parser.add_argument('--compress', action='store_true',
@@ -333,8 +363,10 @@ Examples:
     export_parser.add_argument('--date-to', help='Export records until this date (ISO format: 2025-01-31)')
     export_parser.add_argument('--status', help='Export only records with this status')
     export_parser.add_argument('--market-type', help='Export only records for this market type')
-    
-    # Import command
+
+
+def _add_import_parser(subparsers) -> None:
+    """Register the import subcommand"""
     import_parser = subparsers.add_parser('import', help='Import analysis history data')
     import_parser.add_argument('input_path', help='Input file path')
     import_parser.add_argument('--batch-size', type=int, default=1000,
@@ -343,8 +375,10 @@ Examples:
                               help='Overwrite existing records (default: skip existing)')
     import_parser.add_argument('--skip-validation', action='store_true',
                               help='Skip record validation during import')
-    
-    # Monitor command
+
+
+def _add_monitor_parser(subparsers) -> None:
+    """Register the monitor subcommand"""
     monitor_parser = subparsers.add_parser('monitor', help='Monitor storage usage and check for alerts')
     monitor_parser.add_argument('--max-size-mb', type=int, default=1000,
                                help='Maximum storage size in MB for alerts (default: 1000)')
@@ -354,6 +388,67 @@ Examples:
                                help='Maximum daily document growth for alerts (default: 1000)')
     monitor_parser.add_argument('--exit-on-alert', action='store_true',
                                help='Exit with error code if alerts are found')
+    monitor_parser.add_argument('--verbose', action='store_true',
+                               help='Also gather and show full storage statistics')
+    monitor_parser.add_argument('--loop', type=int, metavar='SECONDS',
+                               help='Keep running and report every SECONDS seconds, tracking new records via a change stream')
+
+
+SUBCOMMAND_PARSERS = {
+    'cleanup': _add_cleanup_parser,
+    'stats': _add_stats_parser,
+    'export': _add_export_parser,
+    'import': _add_import_parser,
+    'monitor': _add_monitor_parser,
+}
+
+
+def main():
+    """Main CLI entry point"""
+    parser = argparse.ArgumentParser(
+        description="Analysis History Administration Utilities",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Show storage statistics
+  python history_admin.py stats
+  
+  # Check for storage alerts
+  python history_admin.py stats --check-alerts
+  
+  # Cleanup records older than 1 year (dry run)
+  python history_admin.py cleanup --max-age-days 365 --dry-run
+  
+  # Cleanup failed records older than 24 hours
+  python history_admin.py cleanup --failed-only --failed-age-hours 24
+  
+  # Export all data to compressed JSON
+  python history_admin.py export data_backup.json.gz --compress
+  
+  # Export data from specific date range
+  python history_admin.py export recent_data.json --date-from 2025-01-01 --date-to 2025-01-31
+  
+  # Import data from backup
+  python history_admin.py import data_backup.json.gz
+  
+  # Monitor storage and exit with error if alerts found
+  python history_admin.py monitor --exit-on-alert
+  
+  # Keep monitoring in the background, reporting every minute
+  python history_admin.py monitor --loop 60
+        """
+    )
+    
+    subparsers = parser.add_subparsers(dest='command', help='Available commands')
+    
+    # Only the requested subcommand needs its arguments; help and usage
+    # errors fall back to registering all of them
+    selected = sys.argv[1] if len(sys.argv) > 1 else None
+    if selected in SUBCOMMAND_PARSERS:
+        SUBCOMMAND_PARSERS[selected](subparsers)
+    else:
+        for add_parser in SUBCOMMAND_PARSERS.values():
+            add_parser(subparsers)
     
     args = parser.parse_args()
     
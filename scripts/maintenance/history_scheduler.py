@@ -6,27 +6,129 @@ This script provides automated cleanup and maintenance operations for analysis h
 It can be run as a cron job or scheduled task to perform regular maintenance.
 """
 
+import os
 import sys
-import json
+import copy
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import reduce
+from operator import getitem
 from pathlib import Path
-from typing import Dict, Any, List
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional
 
 # Add project root to path
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from tradingagents.utils.logging_manager import get_logger
-from web.utils.history_data_manager import get_data_manager
+from web.utils.history_json import dumps as _json_dumps, loads as _loads
 
-# Setup logging
-logger = get_logger('history_scheduler')
+# The project logging setup and the data manager (MongoDB driver included)
+# are imported on first use so --help and argument errors return immediately
+logger = logging.getLogger('history_scheduler')
+
+
+def _setup_logging() -> None:
+    """Configure the project log handlers for the scheduler logger"""
+    from tradingagents.utils.logging_manager import get_logger
+    get_logger('history_scheduler')
+
+
+# Read-only scheduler defaults; _load_config hands out deep copies
+_DEFAULT_CONFIG = MappingProxyType({
+    "cleanup": {
+        "enabled": True,
+        "max_age_days": 365,
+        "batch_size": 100,
+        "cleanup_failed_records": True,
+        "failed_record_age_hours": 24
+    },
+    "monitoring": {
+        "enabled": True,
+        "max_size_mb": 1000,
+        "max_documents": 100000,
+        "max_daily_growth": 1000,
+        "alert_on_warnings": False,
+        "cache_ttl_seconds": 0
+    },
+    "backup": {
+        "enabled": False,
+        "backup_path": "data/backups/history",
+        "backup_frequency_days": 7,
+        "compress_backups": True,
+        "keep_backups": 4
+    },
+    "notifications": {
+        "enabled": False,
+        "log_level": "INFO",
+        "email_alerts": False,
+        "webhook_url": None
+    }
+})
+
+# Parsed and merged configurations keyed by (path, mtime_ns, size)
+_CONFIG_CACHE: Dict[tuple, Dict[str, Any]] = {}
+
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize to indented UTF-8 JSON bytes"""
+    return _json_dumps(obj, indent=True)
+
+
+def _copy_default_config() -> Dict[str, Any]:
+    """Return a mutable deep copy of the scheduler defaults"""
+    return copy.deepcopy(dict(_DEFAULT_CONFIG))
+
+
+def _section_paths(config: Dict[str, Any]) -> frozenset:
+    """Key paths of every nested section (dict value) in ``config``, root included"""
+    paths = {()}
+    stack = [((), config)]
+    while stack:
+        prefix, section = stack.pop()
+        for key, value in section.items():
+            if isinstance(value, dict):
+                paths.add(prefix + (key,))
+                stack.append((prefix + (key,), value))
+    return frozenset(paths)
+
+
+# The defaults' shape is fixed, so the merge only has to type-check user
+# values that land on one of these paths
+_SECTION_PATHS = _section_paths(_DEFAULT_CONFIG)
+
+
+def merge_config(default: Dict[str, Any], user: Dict[str, Any]) -> None:
+    """
+    Deep-merge ``user`` into a copy of the defaults in place
+    
+    User values are walked iteratively; only values sitting on a known
+    section path are descended into, everything else is assigned as-is.
+    """
+    stack = [((), user)]
+    while stack:
+        prefix, overrides = stack.pop()
+        target = reduce(getitem, prefix, default)
+        for key, value in overrides.items():
+            path = prefix + (key,)
+            if path in _SECTION_PATHS and isinstance(value, dict):
+                stack.append((path, value))
+            else:
+                target[key] = value
 
 
 class HistoryScheduler:
     """Automated history maintenance scheduler"""
     
+    # Sidecar in the backup directory recording the most recent backup
+    BACKUP_MANIFEST_NAME = ".manifest.json"
+    BACKUP_MANIFEST_KEYS = ("last_backup_ts", "last_backup_epoch", "last_backup_human", "file")
+    
+    # Recent storage alert check, stored next to the backup directory
+    MONITORING_CACHE_NAME = ".monitor_cache.json"
+    
     def __init__(self, config_path: str = None):
         """
         Initialize the scheduler
@@ -34,194 +136,178 @@ class HistoryScheduler:
         Args:
             config_path: Path to configuration file (optional)
         """
+        _setup_logging()
+        from web.utils.history_data_manager import get_data_manager
+        
         self.data_manager = get_data_manager()
         self.config = self._load_config(config_path)
         self.results = []
+        
+        # Make sure the cleanup deletes run as created_at / status range scans
+        # once up front rather than on the first cleanup pass
+        if self.data_manager.is_available():
+            self.data_manager.ensure_maintenance_indexes()
     
     def _load_config(self, config_path: str = None) -> Dict[str, Any]:
         """Load scheduler configuration"""
-        default_config = {
-            "cleanup": {
-                "enabled": True,
-                "max_age_days": 365,
-                "batch_size": 100,
-                "cleanup_failed_records": True,
-                "failed_record_age_hours": 24
-            },
-            "monitoring": {
-                "enabled": True,
-                "max_size_mb": 1000,
-                "max_documents": 100000,
-                "max_daily_growth": 1000,
-                "alert_on_warnings": False
-            },
-            "backup": {
-                "enabled": False,
-                "backup_path": "data/backups/history",
-                "backup_frequency_days": 7,
-                "compress_backups": True,
-                "keep_backups": 4
-            },
-            "notifications": {
-                "enabled": False,
-                "log_level": "INFO",
-                "email_alerts": False,
-                "webhook_url": None
-            }
-        }
-        
-        if config_path and Path(config_path).exists():
-            try:
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    user_config = json.load(f)
-                
-                # Merge user config with defaults
-                def merge_config(default, user):
-                    for key, value in user.items():
-                        if key in default and isinstance(default[key], dict) and isinstance(value, dict):
-                            merge_config(default[key], value)
-                        else:
-                            default[key] = value
-                
-                merge_config(default_config, user_config)
-                logger.info(f"Loaded configuration from {config_path}")
-                
-            except Exception as e:
-                logger.warning(f"Failed to load config from {config_path}: {e}")
-                logger.info("Using default configuration")
+        if not config_path or not Path(config_path).exists():
+            return _copy_default_config()
         
-        return default_config
+        try:
+            st = os.stat(config_path)
+            cache_key = (str(config_path), st.st_mtime_ns, st.st_size)
+            cached = _CONFIG_CACHE.get(cache_key)
+            if cached is not None:
+                return copy.deepcopy(cached)
+            
+            with open(config_path, 'rb') as f:
+                user_config = _loads(f.read())
+            
+            # Only the subtrees the user overrides need merging
+            config = _copy_default_config()
+            if user_config:
+                merge_config(config, user_config)
+            _CONFIG_CACHE[cache_key] = copy.deepcopy(config)
+            logger.info("Loaded configuration from %s", config_path)
+            return config
+            
+        except Exception as e:
+            logger.warning("Failed to load config from %s: %s", config_path, e)
+            logger.info("Using default configuration")
+            return _copy_default_config()
     
     def run_cleanup(self) -> Dict[str, Any]:
-        """Run cleanup operations"""
+        """
+        Run cleanup operations
+        
+        The result only carries an ``errors`` list when something failed,
+        so the common nothing-to-clean run allocates no error bookkeeping.
+        """
         if not self.config["cleanup"]["enabled"]:
             logger.info("Cleanup is disabled in configuration")
             return {"success": True, "skipped": True, "reason": "disabled"}
         
-        logger.info("🧹 Starting scheduled cleanup operations...")
+        logger.info("Starting scheduled cleanup operations...")
         
         results = {
             "success": True,
             "operations": [],
-            "total_deleted": 0,
-            "errors": []
+            "total_deleted": 0
         }
         
         try:
-            # Cleanup old records
-            cleanup_result = self.data_manager.cleanup_old_records(
-                max_age_days=self.config["cleanup"]["max_age_days"],
-                batch_size=self.config["cleanup"]["batch_size"],
+            # Old records and stale failed records go out in one combined delete
+            cleanup_config = self.config["cleanup"]
+            cleanup_result = self.data_manager.cleanup_records(
+                max_age_days=cleanup_config["max_age_days"],
+                failed_record_age_hours=(
+                    cleanup_config["failed_record_age_hours"]
+                    if cleanup_config["cleanup_failed_records"] else None
+                ),
+                batch_size=cleanup_config["batch_size"],
                 dry_run=False
             )
             
             if cleanup_result["success"]:
                 deleted_count = cleanup_result.get("deleted_count", 0)
-                results["operations"].append({
-                    "type": "old_records_cleanup",
+                results["operations"] = [{
+                    "type": "records_cleanup",
                     "success": True,
                     "deleted_count": deleted_count,
                     "duration": cleanup_result.get("duration", 0)
-                })
-                results["total_deleted"] += deleted_count
+                }]
+                results["total_deleted"] = deleted_count
                 
                 if deleted_count > 0:
-                    logger.info(f"✅ Cleaned up {deleted_count} old records")
+                    logger.info("Cleaned up %d records", deleted_count)
                 else:
-                    logger.info("✅ No old records found for cleanup")
+                    logger.info("No records found for cleanup")
             else:
                 error_msg = cleanup_result.get("error", "Unknown error")
-                results["errors"].append(f"Old records cleanup failed: {error_msg}")
-                logger.error(f"❌ Old records cleanup failed: {error_msg}")
-            
-            # Cleanup failed records if enabled
-            if self.config["cleanup"]["cleanup_failed_records"]:
-                failed_cleanup_result = self.data_manager.cleanup_failed_records(
-                    max_age_hours=self.config["cleanup"]["failed_record_age_hours"],
-                    dry_run=False
-                )
-                
-                if failed_cleanup_result["success"]:
-                    failed_deleted = failed_cleanup_result.get("deleted_count", 0)
-                    results["operations"].append({
-                        "type": "failed_records_cleanup",
-                        "success": True,
-                        "deleted_count": failed_deleted,
-                        "duration": failed_cleanup_result.get("duration", 0)
-                    })
-                    results["total_deleted"] += failed_deleted
-                    
-                    if failed_deleted > 0:
-                        logger.info(f"✅ Cleaned up {failed_deleted} failed records")
-                    else:
-                        logger.info("✅ No failed records found for cleanup")
-                else:
-                    error_msg = failed_cleanup_result.get("error", "Unknown error")
-                    results["errors"].append(f"Failed records cleanup failed: {error_msg}")
-                    logger.error(f"❌ Failed records cleanup failed: {error_msg}")
+                results.setdefault("errors", []).append(f"Records cleanup failed: {error_msg}")
+                logger.error("Records cleanup failed: %s", error_msg)
         
         except Exception as e:
             results["success"] = False
-            results["errors"].append(f"Cleanup operation failed: {str(e)}")
-            logger.error(f"❌ Cleanup operation failed: {e}")
+            results.setdefault("errors", []).append(f"Cleanup operation failed: {str(e)}")
+            logger.error("Cleanup operation failed: %s", e)
         
         return results
     
-    def run_monitoring(self) -> Dict[str, Any]:
-        """Run monitoring and alerting"""
+    def run_monitoring(self, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Run monitoring and alerting
+        
+        Args:
+            dry_run: Leave the filesystem untouched (no monitoring cache write)
+        """
         if not self.config["monitoring"]["enabled"]:
             logger.info("Monitoring is disabled in configuration")
             return {"success": True, "skipped": True, "reason": "disabled"}
         
-        logger.info("🔍 Starting scheduled monitoring...")
+        logger.info("Starting scheduled monitoring...")
         
         try:
-            # Get storage statistics
-            stats = self.data_manager.get_storage_statistics()
-            if not stats["success"]:
-                return {
-                    "success": False,
-                    "error": f"Failed to get storage statistics: {stats.get('error', 'Unknown error')}"
-                }
-            
-            # Check for alerts
-            alerts = self.data_manager.check_storage_alerts(
-                max_size_mb=self.config["monitoring"]["max_size_mb"],
-                max_documents=self.config["monitoring"]["max_documents"],
-                max_daily_growth=self.config["monitoring"]["max_daily_growth"]
-            )
+            monitoring_config = self.config["monitoring"]
+            thresholds = [
+                monitoring_config["max_size_mb"],
+                monitoring_config["max_documents"],
+                monitoring_config["max_daily_growth"]
+            ]
+            cache_path = Path(self.config["backup"]["backup_path"]).parent / self.MONITORING_CACHE_NAME
+            cache_ttl = monitoring_config.get("cache_ttl_seconds", 0)
             
-            if not alerts["success"]:
-                return {
-                    "success": False,
-                    "error": f"Failed to check storage alerts: {alerts.get('error', 'Unknown error')}"
-                }
+            # With cache_ttl_seconds set, back-to-back cron invocations reuse
+            # a recent check instead of querying MongoDB again
+            alerts = self._read_monitoring_cache(cache_path, cache_ttl, thresholds)
+            from_cache = alerts is not None
+            if from_cache:
+                logger.info("Using cached monitoring result from %s", alerts.get("timestamp"))
+            else:
+                # check_storage_alerts gathers collStats and the recent daily
+                # counts itself and returns the storage snapshot alongside the
+                # alerts, so one call covers both
+                alerts = self.data_manager.check_storage_alerts(
+                    max_size_mb=monitoring_config["max_size_mb"],
+                    max_documents=monitoring_config["max_documents"],
+                    max_daily_growth=monitoring_config["max_daily_growth"]
+                )
+                
+                if not alerts["success"]:
+                    return {
+                        "success": False,
+                        "error": f"Failed to check storage alerts: {alerts.get('error', 'Unknown error')}"
+                    }
+                
+                if cache_ttl > 0 and not dry_run:
+                    self._write_monitoring_cache(cache_path, thresholds, alerts)
             
             # Log current status
-            storage_info = stats["storage_info"]
-            logger.info(f"📊 Current storage: {storage_info['total_documents']:,} documents, {storage_info['total_size_mb']:.2f} MB")
+            storage_info = alerts["storage_stats"]
+            logger.info("Current storage: %d documents, %.2f MB",
+                        storage_info['total_documents'], storage_info['total_size_mb'])
             
             # Handle alerts
             alert_triggered = False
             if alerts["alert_count"] > 0:
                 alert_triggered = True
-                logger.error(f"🚨 Found {alerts['alert_count']} storage alerts:")
+                logger.error("Found %d storage alerts:", alerts['alert_count'])
                 for alert in alerts["alerts"]:
-                    logger.error(f"  - {alert['message']}")
+                    logger.error("  - %s", alert['message'])
             
             # Handle warnings
             warning_triggered = False
             if alerts["warning_count"] > 0:
                 warning_triggered = True
-                if self.config["monitoring"]["alert_on_warnings"]:
+                if monitoring_config["alert_on_warnings"]:
                     alert_triggered = True
                 
-                logger.warning(f"⚠️ Found {alerts['warning_count']} storage warnings:")
+                logger.warning("Found %d storage warnings:", alerts['warning_count'])
                 for warning in alerts["warnings"]:
-                    logger.warning(f"  - {warning['message']}")
+                    logger.warning("  - %s", warning['message'])
             
             if not alert_triggered and not warning_triggered:
-                logger.info("✅ All monitoring checks passed")
+                logger.info("All monitoring checks passed")
             
             return {
                 "success": True,
@@ -230,23 +316,51 @@ class HistoryScheduler:
                 "warning_count": alerts["warning_count"],
                 "alerts": alerts["alerts"],
                 "warnings": alerts["warnings"],
-                "alert_triggered": alert_triggered
+                "alert_triggered": alert_triggered,
+                "from_cache": from_cache
             }
             
         except Exception as e:
-            logger.error(f"❌ Monitoring operation failed: {e}")
+            logger.error("Monitoring operation failed: %s", e)
             return {
                 "success": False,
                 "error": str(e)
             }
     
+    @staticmethod
+    def _read_monitoring_cache(cache_path: Path, ttl_seconds: float,
+                               thresholds: List[Any]) -> Optional[Dict[str, Any]]:
+        """Return a cached storage alert check younger than ``ttl_seconds``, if any"""
+        if ttl_seconds <= 0:
+            return None
+        try:
+            if time.time() - cache_path.stat().st_mtime >= ttl_seconds:
+                return None
+            cached = _loads(cache_path.read_bytes())
+            if cached.get("thresholds") != thresholds:
+                return None
+            return cached["alerts"]
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+    
+    @staticmethod
+    def _write_monitoring_cache(cache_path: Path, thresholds: List[Any], alerts: Dict[str, Any]) -> None:
+        """Atomically store a storage alert check for later invocations"""
+        tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_bytes(_dumps({"thresholds": thresholds, "alerts": alerts}))
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning("Failed to write monitoring cache: %s", e)
+    
     def run_backup(self) -> Dict[str, Any]:
         """Run backup operations"""
         if not self.config["backup"]["enabled"]:
             logger.info("Backup is disabled in configuration")
             return {"success": True, "skipped": True, "reason": "disabled"}
         
-        logger.info("💾 Starting scheduled backup...")
+        logger.info("Starting scheduled backup...")
         
         try:
             backup_dir = Path(self.config["backup"]["backup_path"])
@@ -254,23 +368,34 @@ class HistoryScheduler:
             
             # Check if backup is needed based on frequency
             frequency_days = self.config["backup"]["backup_frequency_days"]
-            last_backup_file = None
-            
-            # Find the most recent backup
-            for backup_file in backup_dir.glob("history_backup_*.json*"):
-                if last_backup_file is None or backup_file.stat().st_mtime > last_backup_file.stat().st_mtime:
-                    last_backup_file = backup_file
             
-            if last_backup_file:
-                last_backup_time = datetime.fromtimestamp(last_backup_file.stat().st_mtime)
-                if datetime.now() - last_backup_time < timedelta(days=frequency_days):
-                    logger.info(f"✅ Backup not needed (last backup: {last_backup_time.strftime('%Y-%m-%d %H:%M:%S')})")
+            # The manifest answers "when was the last backup?" without listing
+            # the directory, and carries a preformatted time for the log line
+            backup_entries = None
+            manifest = self._read_backup_manifest(backup_dir)
+            if manifest is not None:
+                if time.time() - manifest["last_backup_epoch"] < frequency_days * 86400:
+                    logger.info("Backup not needed (last backup: %s)", manifest["last_backup_human"])
                     return {
                         "success": True,
                         "skipped": True,
                         "reason": "not_needed",
-                        "last_backup": last_backup_time.isoformat()
+                        "last_backup": manifest["last_backup_ts"]
                     }
+            else:
+                # Only fall back to a directory scan when the manifest is unusable
+                backup_entries = self._scan_backups(backup_dir)
+                last_backup_entry = max(backup_entries, key=lambda e: e.stat().st_mtime_ns, default=None)
+                if last_backup_entry:
+                    last_backup_time = datetime.fromtimestamp(last_backup_entry.stat().st_mtime)
+                    if datetime.now() - last_backup_time < timedelta(days=frequency_days):
+                        logger.info("Backup not needed (last backup: %s)", last_backup_time.strftime('%Y-%m-%d %H:%M:%S'))
+                        return {
+                            "success": True,
+                            "skipped": True,
+                            "reason": "not_needed",
+                            "last_backup": last_backup_time.isoformat()
+                        }
             
             # Create backup filename
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -288,10 +413,16 @@ class HistoryScheduler:
             )
             
             if backup_result["success"]:
-                logger.info(f"✅ Backup completed: {backup_result['exported_count']:,} records exported to {backup_path}")
+                logger.info("Backup completed: %d records exported to %s", backup_result['exported_count'], backup_path)
                 
-                # Clean up old backups
-                self._cleanup_old_backups(backup_dir)
+                self._write_backup_manifest(backup_dir, backup_result.get("output_path", str(backup_path)))
+                
+                # Clean up old backups; the new backup takes one of the kept slots
+                if backup_entries is None:
+                    self._cleanup_old_backups(backup_dir)
+                else:
+                    previous_backups = [e for e in backup_entries if e.name != backup_filename]
+                    self._cleanup_old_backups(backup_dir, previous_backups, new_backups=1)
                 
                 return {
                     "success": True,
@@ -302,45 +433,121 @@ class HistoryScheduler:
                 }
             else:
                 error_msg = backup_result.get("error", "Unknown error")
-                logger.error(f"❌ Backup failed: {error_msg}")
+                logger.error("Backup failed: %s", error_msg)
                 return {
                     "success": False,
                     "error": error_msg
                 }
                 
         except Exception as e:
-            logger.error(f"❌ Backup operation failed: {e}")
+            logger.error("Backup operation failed: %s", e)
             return {
                 "success": False,
                 "error": str(e)
             }
     
-    def _cleanup_old_backups(self, backup_dir: Path) -> None:
-        """Clean up old backup files"""
+    @classmethod
+    def _read_backup_manifest(cls, backup_dir: Path) -> Optional[Dict[str, Any]]:
+        """Return the backup manifest, or None if it is missing, incomplete or stale"""
+        try:
+            with open(backup_dir / cls.BACKUP_MANIFEST_NAME, 'rb') as f:
+                manifest = _loads(f.read())
+            if not all(key in manifest for key in cls.BACKUP_MANIFEST_KEYS):
+                return None
+            if not os.path.exists(manifest["file"]):
+                return None
+            return manifest
+        except (OSError, ValueError, TypeError):
+            return None
+    
+    @classmethod
+    def _write_backup_manifest(cls, backup_dir: Path, backup_path: str) -> None:
+        """Atomically record the backup that was just written"""
+        manifest_path = backup_dir / cls.BACKUP_MANIFEST_NAME
+        tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+        now = datetime.now()
         try:
-            keep_backups = self.config["backup"]["keep_backups"]
+            tmp_path.write_bytes(_dumps({
+                "last_backup_ts": now.isoformat(),
+                "last_backup_epoch": now.timestamp(),
+                "last_backup_human": now.strftime("%Y-%m-%d %H:%M:%S"),
+                "file": str(backup_path)
+            }))
+            os.replace(tmp_path, manifest_path)
+        except OSError as e:
+            logger.warning("Failed to update backup manifest: %s", e)
+    
+    @staticmethod
+    def _scan_backups(backup_dir: Path) -> List[os.DirEntry]:
+        """List backup files with one scandir pass (DirEntry caches stat results)"""
+        with os.scandir(backup_dir) as it:
+            return [
+                entry for entry in it
+                if entry.name.startswith("history_backup_")
+                and ".json" in entry.name[len("history_backup_"):]
+                and entry.is_file()
+            ]
+    
+    @staticmethod
+    def _unlink_backups(backup_dir: Path, entries: List[os.DirEntry]) -> None:
+        """
+        Delete backup files relative to one open directory descriptor
+        
+        ``unlinkat`` against a held directory fd skips resolving the full
+        backup path for every file; platforms without ``dir_fd`` support
+        fall back to plain ``os.unlink``.
+        """
+        if os.unlink not in os.supports_dir_fd:
+            for entry in entries:
+                os.unlink(entry.path)
+                logger.info("Deleted old backup: %s", entry.name)
+            return
+        
+        dir_fd = os.open(backup_dir, os.O_RDONLY)
+        try:
+            for entry in entries:
+                os.unlink(entry.name, dir_fd=dir_fd)
+                logger.info("Deleted old backup: %s", entry.name)
+        finally:
+            os.close(dir_fd)
+    
+    def _cleanup_old_backups(self, backup_dir: Path, backup_entries: List[os.DirEntry] = None,
+                             new_backups: int = 0) -> None:
+        """
+        Clean up old backup files
+        
+        Args:
+            backup_dir: Directory holding the backups
+            backup_entries: Previously scanned backups to reuse instead of rescanning
+            new_backups: Backups written since ``backup_entries`` was scanned
+        """
+        try:
+            keep_backups = max(self.config["backup"]["keep_backups"] - new_backups, 0)
+            if backup_entries is None:
+                backup_entries = self._scan_backups(backup_dir)
             backup_files = sorted(
-                backup_dir.glob("history_backup_*.json*"),
-                key=lambda f: f.stat().st_mtime,
+                backup_entries,
+                key=lambda e: e.stat().st_mtime_ns,
                 reverse=True
             )
             
             if len(backup_files) > keep_backups:
                 files_to_delete = backup_files[keep_backups:]
-                for backup_file in files_to_delete:
-                    backup_file.unlink()
-                    logger.info(f"🗑️ Deleted old backup: {backup_file.name}")
+                self._unlink_backups(backup_dir, files_to_delete)
                 
-                logger.info(f"✅ Cleaned up {len(files_to_delete)} old backup files")
+                logger.info("Cleaned up %d old backup files", len(files_to_delete))
             
         except Exception as e:
-            logger.warning(f"Failed to cleanup old backups: {e}")
+            logger.warning("Failed to cleanup old backups: %s", e)
     
     def run_all(self) -> Dict[str, Any]:
         """Run all scheduled operations"""
         logger.info("🚀 Starting scheduled history maintenance operations...")
         
-        start_time = datetime.now()
+        # One wall-clock read for the report; the duration comes from the
+        # monotonic clock so an NTP step mid-run cannot skew it
+        start_ns = time.monotonic_ns()
+        timestamp = datetime.now().isoformat()
         
         # Check if data manager is available
         if not self.data_manager.is_available():
@@ -348,42 +555,41 @@ class HistoryScheduler:
             return {
                 "success": False,
                 "error": "Data manager not available",
-                "timestamp": start_time.isoformat()
+                "timestamp": timestamp
             }
         
         results = {
             "success": True,
-            "timestamp": start_time.isoformat(),
+            "timestamp": timestamp,
             "operations": {}
         }
         
-        # Run cleanup
-        cleanup_result = self.run_cleanup()
-        results["operations"]["cleanup"] = cleanup_result
-        if not cleanup_result["success"] and not cleanup_result.get("skipped"):
-            results["success"] = False
+        # Cleanup runs first so monitoring and backup see the post-cleanup
+        # collection; those two only read, so they then run concurrently
+        # (monitoring hits MongoDB while backup is mostly disk I/O)
+        operation_results = {"cleanup": self.run_cleanup()}
+        operations = (
+            ("monitoring", self.run_monitoring),
+            ("backup", self.run_backup),
+        )
+        with ThreadPoolExecutor(max_workers=len(operations)) as executor:
+            futures = {name: executor.submit(operation) for name, operation in operations}
+            for name, future in futures.items():
+                operation_results[name] = future.result()
         
-        # Run monitoring
-        monitoring_result = self.run_monitoring()
-        results["operations"]["monitoring"] = monitoring_result
-        if not monitoring_result["success"] and not monitoring_result.get("skipped"):
-            results["success"] = False
-        
-        # Run backup
-        backup_result = self.run_backup()
-        results["operations"]["backup"] = backup_result
-        if not backup_result["success"] and not backup_result.get("skipped"):
-            results["success"] = False
+        for name, operation_result in operation_results.items():
+            results["operations"][name] = operation_result
+            if not operation_result["success"] and not operation_result.get("skipped"):
+                results["success"] = False
         
         # Calculate total duration
-        end_time = datetime.now()
-        results["duration"] = (end_time - start_time).total_seconds()
+        results["duration"] = (time.monotonic_ns() - start_ns) / 1e9
         
         # Log summary
         if results["success"]:
-            logger.info(f"✅ All scheduled operations completed successfully in {results['duration']:.2f} seconds")
+            logger.info("✅ All scheduled operations completed successfully in %.2f seconds", results['duration'])
         else:
-            logger.error(f"❌ Some scheduled operations failed (duration: {results['duration']:.2f} seconds)")
+            logger.error("❌ Some scheduled operations failed (duration: %.2f seconds)", results['duration'])
         
         return results
 
@@ -423,7 +629,8 @@ Configuration file format (JSON):
     "max_size_mb": 1000,
     "max_documents": 100000,
     "max_daily_growth": 1000,
-    "alert_on_warnings": false
+    "alert_on_warnings": false,
+    "cache_ttl_seconds": 0
   },
   "backup": {
     "enabled": false,
@@ -456,7 +663,7 @@ Configuration file format (JSON):
         # Run operations based on arguments
         if args.dry_run:
             logger.info("🔍 Running in dry-run mode (monitoring only)")
-            results = scheduler.run_monitoring()
+            results = scheduler.run_monitoring(dry_run=True)
         elif args.cleanup_only:
             results = scheduler.run_cleanup()
         elif args.monitoring_only:
@@ -471,8 +678,11 @@ Configuration file format (JSON):
             output_path = Path(args.output_json)
             output_path.parent.mkdir(parents=True, exist_ok=True)
             
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(results, f, indent=2, ensure_ascii=False, default=str)
+            # Write the whole payload to a temp file and rename it into place
+            # so report collectors never read a partially written file
+            tmp_path = output_path.with_suffix(output_path.suffix + ".tmp")
+            tmp_path.write_bytes(_dumps(results))
+            os.replace(tmp_path, output_path)
             
             logger.info(f"📄 Results written to {output_path}")
         
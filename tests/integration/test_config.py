@@ -6,12 +6,36 @@ This module provides configuration and utilities for integration tests,
 including test data generation, mock services, and test environment setup.
 """
 
+import atexit
+import copy
 import os
+import random
+import shutil
 import tempfile
+from types import MappingProxyType
+from itertools import chain, cycle
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from functools import lru_cache
+from typing import Dict, List, Any, Mapping, Optional, Tuple
 from pathlib import Path
 
+# The history models are only needed for dataset generation
+try:
+    from web.models.history_models import AnalysisHistoryRecord, AnalysisStatus, MarketType
+    HISTORY_MODELS_AVAILABLE = True
+except ImportError:
+    AnalysisHistoryRecord = AnalysisStatus = MarketType = None
+    HISTORY_MODELS_AVAILABLE = False
+
+# Test data patterns (immutable, shared with TEST_CONFIG)
+_US_SYMBOLS = ('AAPL', 'GOOGL', 'MSFT', 'TSLA', 'AMZN', 'META', 'NVDA')
+_A_SHARE_SYMBOLS = ('000001', '000002', '600036', '600519', '000858', '002415')
+_HK_SYMBOLS = ('0700.HK', '0941.HK', '1299.HK', '2318.HK', '0005.HK')
+
+_US_NAMES = ('Apple Inc.', 'Alphabet Inc.', 'Microsoft Corp.', 'Tesla Inc.', 'Amazon.com Inc.', 'Meta Platforms', 'NVIDIA Corp.')
+_A_SHARE_NAMES = ('平安银行', '万科A', '招商银行', '贵州茅台', '五粮液', '三一重工')
+_HK_NAMES = ('腾讯控股', '中国移动', '友邦保险', '中国平安', '汇丰控股')
+
 # Test configuration constants
 TEST_CONFIG = {
     # Database settings
@@ -35,207 +59,372 @@ TEST_CONFIG = {
     
     # Test data patterns
     'test_symbols': {
-        'us_stocks': ['AAPL', 'GOOGL', 'MSFT', 'TSLA', 'AMZN', 'META', 'NVDA'],
-        'a_shares': ['000001', '000002', '600036', '600519', '000858', '002415'],
-        'hk_stocks': ['0700.HK', '0941.HK', '1299.HK', '2318.HK', '0005.HK']
+        'us_stocks': _US_SYMBOLS,
+        'a_shares': _A_SHARE_SYMBOLS,
+        'hk_stocks': _HK_SYMBOLS
     },
     
     'test_names': {
-        'us_stocks': ['Apple Inc.', 'Alphabet Inc.', 'Microsoft Corp.', 'Tesla Inc.', 'Amazon.com Inc.', 'Meta Platforms', 'NVIDIA Corp.'],
-        'a_shares': ['平安银行', '万科A', '招商银行', '贵州茅台', '五粮液', '三一重工'],
-        'hk_stocks': ['腾讯控股', '中国移动', '友邦保险', '中国平安', '汇丰控股']
+        'us_stocks': _US_NAMES,
+        'a_shares': _A_SHARE_NAMES,
+        'hk_stocks': _HK_NAMES
+    }
+}
+
+# Shared read-only view returned by get_test_config()
+_TEST_CONFIG_VIEW = MappingProxyType(TEST_CONFIG)
+
+
+def _derive_symbol_values(symbol: str) -> Dict[str, Any]:
+    """Derive the mock decision values for a symbol from its hash"""
+    symbol_hash = hash(symbol)
+    return {
+        'action': ("BUY", "HOLD", "SELL")[symbol_hash % 3],
+        'action_cn': ("买入", "持有", "卖出")[symbol_hash % 3],
+        'confidence': 0.6 + (symbol_hash % 40) / 100,
+        'target_price': 100.0 + (symbol_hash % 200)
     }
+
+
+# Mock decision values for the fixed test symbols, derived once at import
+_SYMBOL_DERIVED = {
+    symbol: _derive_symbol_values(symbol)
+    for symbol in chain.from_iterable(TEST_CONFIG['test_symbols'].values())
 }
 
 
+@lru_cache(maxsize=256)
+def _mock_symbol_text(symbol: str) -> Mapping[str, str]:
+    """Format the mock report strings for a symbol (cached per symbol, read-only)"""
+    return MappingProxyType({
+        'reasoning': f"Analysis indicates {symbol} shows strong potential",
+        'market_report': f"Technical analysis for {symbol} shows positive trends",
+        'fundamentals_report': f"Fundamental analysis of {symbol} reveals solid metrics",
+        'news_report': f"Recent news for {symbol} is generally positive",
+        'risk_assessment': f"Risk assessment for {symbol} indicates moderate risk",
+        'reasoning_cn': f"分析显示{symbol}具有强劲潜力",
+        'market_report_cn': f"{symbol}的技术分析显示积极趋势",
+        'fundamentals_report_cn': f"{symbol}的基本面分析显示稳健指标",
+        'news_report_cn': f"{symbol}的最新消息总体积极",
+        'risk_assessment_cn': f"{symbol}的风险评估显示中等风险"
+    })
+
+
+def _mock_analysis_results(symbol: str, status: str) -> Dict[str, Any]:
+    """Build mock analysis results for a symbol and status"""
+    if status == AnalysisStatus.COMPLETED.value:
+        derived = _SYMBOL_DERIVED.get(symbol) or _derive_symbol_values(symbol)
+        text = _mock_symbol_text(symbol)
+        return {
+            "stock_symbol": symbol,
+            "decision": {
+                "action": derived['action'],
+                "confidence": derived['confidence'],
+                "target_price": derived['target_price'],
+                "reasoning": text['reasoning']
+            },
+            "state": {
+                "market_report": text['market_report'],
+                "fundamentals_report": text['fundamentals_report'],
+                "news_report": text['news_report'],
+                "risk_assessment": text['risk_assessment']
+            },
+            "success": True
+        }
+    else:
+        return {
+            "stock_symbol": symbol,
+            "decision": {},
+            "state": {},
+            "success": False,
+            "error": "Analysis failed due to data unavailability"
+        }
+
+
+def _mock_formatted_results(symbol: str, status: str, now_iso: str) -> Dict[str, Any]:
+    """Build mock formatted results for a symbol and status, stamped with now_iso"""
+    if status == AnalysisStatus.COMPLETED.value:
+        derived = _SYMBOL_DERIVED.get(symbol) or _derive_symbol_values(symbol)
+        text = _mock_symbol_text(symbol)
+        return {
+            "stock_symbol": symbol,
+            "decision": {
+                "action": derived['action_cn'],
+                "confidence": derived['confidence'],
+                "target_price": derived['target_price'],
+                "reasoning": text['reasoning_cn']
+            },
+            "state": {
+                "market_report": text['market_report_cn'],
+                "fundamentals_report": text['fundamentals_report_cn'],
+                "news_report": text['news_report_cn'],
+                "risk_assessment": text['risk_assessment_cn']
+            },
+            "metadata": {
+                "analysis_complete": True,
+                "formatted_at": now_iso
+            }
+        }
+    else:
+        return {
+            "stock_symbol": symbol,
+            "error": "分析失败，数据不可用",
+            "metadata": {
+                "analysis_complete": False,
+                "error_type": "data_unavailable"
+            }
+        }
+
+
 class TestDataGenerator:
     """Generate test data for integration tests"""
     
+    __slots__ = ('session_id', 'record_counter', '_cache')
+    
     def __init__(self, session_id: str):
         self.session_id = session_id
         self.record_counter = 0
+        self._cache: Dict[Tuple[str, int], List[Any]] = {}
     
-    def generate_comprehensive_dataset(self, size: int = 20) -> List[Dict[str, Any]]:
-        """Generate a comprehensive dataset covering various scenarios"""
-        from web.models.history_models import AnalysisHistoryRecord, AnalysisStatus, MarketType
-        
-        records = []
+    def generate_comprehensive_dataset(self, size: int = 20, cached: bool = False) -> List[Any]:
+        """
+        Generate a comprehensive dataset covering various scenarios
         
-        # Generate records for each market type
-        markets = [
-            (MarketType.US_STOCK.value, TEST_CONFIG['test_symbols']['us_stocks'], TEST_CONFIG['test_names']['us_stocks']),
-            (MarketType.A_SHARE.value, TEST_CONFIG['test_symbols']['a_shares'], TEST_CONFIG['test_names']['a_shares']),
-            (MarketType.HK_STOCK.value, TEST_CONFIG['test_symbols']['hk_stocks'], TEST_CONFIG['test_names']['hk_stocks'])
-        ]
+        Each call generates fresh records with new analysis IDs. With
+        cached=True the dataset is memoized by (session_id, size): repeated
+        cached calls return the same record objects, so deep-copy them before
+        mutating or call invalidate() to get fresh records.
+        """
+        cache_key = (self.session_id, size)
+        if cached:
+            dataset = self._cache.get(cache_key)
+            if dataset is not None:
+                return dataset
         
-        statuses = [AnalysisStatus.COMPLETED.value, AnalysisStatus.FAILED.value, AnalysisStatus.IN_PROGRESS.value]
-        analysts_combinations = [
-            ['market'],
-            ['market', 'fundamentals'],
-            ['market', 'fundamentals', 'news'],
-            ['market', 'fundamentals', 'news', 'social']
-        ]
+        now = datetime.now()
+        counter_start = self.record_counter
         
-        for i in range(size):
-            market_type, symbols, names = markets[i % len(markets)]
-            symbol = symbols[i % len(symbols)]
-            name = names[i % len(names)]
-            status = statuses[i % len(statuses)]
-            analysts = analysts_combinations[i % len(analysts_combinations)]
-            
-            record = AnalysisHistoryRecord(
-                analysis_id=f"{self.session_id}_{self.record_counter:04d}",
-                stock_symbol=symbol,
-                stock_name=name,
-                market_type=market_type,
-                analysis_date=datetime.now() - timedelta(days=i % 90),
-                status=status,
-                analysis_type="comprehensive",
-                analysts_used=analysts,
-                research_depth=(i % 5) + 1,
-                llm_provider="dashscope" if i % 2 == 0 else "deepseek",
-                llm_model="qwen-plus" if i % 2 == 0 else "deepseek-chat",
-                execution_time=60.0 + (i * 10) % 300,
-                token_usage={
-                    "input_tokens": 1500 + (i * 100) % 5000,
-                    "output_tokens": 800 + (i * 50) % 2000,
-                    "total_cost": 0.03 + (i * 0.01) % 0.20
-                },
-                raw_results=self._generate_mock_analysis_results(symbol, status),
-                formatted_results=self._generate_mock_formatted_results(symbol, status),
-                metadata={
-                    "session_id": f"{self.session_id}_{i}",
-                    "test_record": True,
-                    "test_batch": self.session_id,
-                    "record_index": i
-                }
-            )
-            
-            records.append(record)
-            self.record_counter += 1
+        records = _build_records(self.session_id, counter_start, size, now)
         
+        self.record_counter += size
+        if cached:
+            self._cache[cache_key] = records
         return records
     
-    def _generate_mock_analysis_results(self, symbol: str, status: str) -> Dict[str, Any]:
+    def invalidate(self):
+        """Drop memoized datasets so the next cached call generates fresh records"""
+        self._cache.clear()
+    
+    @staticmethod
+    def _generate_mock_analysis_results(symbol: str, status: str) -> Dict[str, Any]:
         """Generate mock analysis results"""
-        if status == AnalysisStatus.COMPLETED.value:
-            return {
-                "stock_symbol": symbol,
-                "decision": {
-                    "action": "BUY" if hash(symbol) % 3 == 0 else "HOLD" if hash(symbol) % 3 == 1 else "SELL",
-                    "confidence": 0.6 + (hash(symbol) % 40) / 100,
-                    "target_price": 100.0 + (hash(symbol) % 200),
-                    "reasoning": f"Analysis indicates {symbol} shows strong potential"
-                },
-                "state": {
-                    "market_report": f"Technical analysis for {symbol} shows positive trends",
-                    "fundamentals_report": f"Fundamental analysis of {symbol} reveals solid metrics",
-                    "news_report": f"Recent news for {symbol} is generally positive",
-                    "risk_assessment": f"Risk assessment for {symbol} indicates moderate risk"
-                },
-                "success": True
-            }
-        else:
-            return {
-                "stock_symbol": symbol,
-                "decision": {},
-                "state": {},
-                "success": False,
-                "error": "Analysis failed due to data unavailability"
-            }
+        return _mock_analysis_results(symbol, status)
     
-    def _generate_mock_formatted_results(self, symbol: str, status: str) -> Dict[str, Any]:
-        """Generate mock formatted results"""
-        if status == AnalysisStatus.COMPLETED.value:
-            return {
-                "stock_symbol": symbol,
-                "decision": {
-                    "action": "买入" if hash(symbol) % 3 == 0 else "持有" if hash(symbol) % 3 == 1 else "卖出",
-                    "confidence": 0.6 + (hash(symbol) % 40) / 100,
-                    "target_price": 100.0 + (hash(symbol) % 200),
-                    "reasoning": f"分析显示{symbol}具有强劲潜力"
-                },
-                "state": {
-                    "market_report": f"{symbol}的技术分析显示积极趋势",
-                    "fundamentals_report": f"{symbol}的基本面分析显示稳健指标",
-                    "news_report": f"{symbol}的最新消息总体积极",
-                    "risk_assessment": f"{symbol}的风险评估显示中等风险"
-                },
-                "metadata": {
-                    "analysis_complete": True,
-                    "formatted_at": datetime.now().isoformat()
-                }
-            }
-        else:
-            return {
-                "stock_symbol": symbol,
-                "error": "分析失败，数据不可用",
-                "metadata": {
-                    "analysis_complete": False,
-                    "error_type": "data_unavailable"
-                }
+    @staticmethod
+    def _generate_mock_formatted_results(symbol: str, status: str,
+                                         now_iso: Optional[str] = None) -> Dict[str, Any]:
+        """Generate mock formatted results (stamped with now_iso, default: current time)"""
+        return _mock_formatted_results(symbol, status, now_iso or datetime.now().isoformat())
+
+
+def _build_records(session_id: str, counter_start: int, size: int,
+                   now: datetime) -> List[Any]:
+    """Build the dataset records"""
+    if not HISTORY_MODELS_AVAILABLE:
+        raise ImportError("web.models.history_models is required to generate test datasets")
+    
+    records = []
+    
+    # Generate records for each market type
+    markets = (
+        (MarketType.US_STOCK.value, _US_SYMBOLS, _US_NAMES),
+        (MarketType.A_SHARE.value, _A_SHARE_SYMBOLS, _A_SHARE_NAMES),
+        (MarketType.HK_STOCK.value, _HK_SYMBOLS, _HK_NAMES)
+    )
+    
+    statuses = (AnalysisStatus.COMPLETED.value, AnalysisStatus.FAILED.value, AnalysisStatus.IN_PROGRESS.value)
+    analysts_combinations = (
+        ['market'],
+        ['market', 'fundamentals'],
+        ['market', 'fundamentals', 'news'],
+        ['market', 'fundamentals', 'news', 'social']
+    )
+    
+    record_class = AnalysisHistoryRecord
+    generate_raw = _mock_analysis_results
+    generate_formatted = _mock_formatted_results
+    now_iso = now.isoformat()
+    
+    for i, (market_type, symbols, names), status, analysts in zip(
+            range(size), cycle(markets), cycle(statuses), cycle(analysts_combinations)):
+        symbol = symbols[i % len(symbols)]
+        name = names[i % len(names)]
+        
+        record = record_class(
+            analysis_id=f"{session_id}_{counter_start + i:04d}",
+            stock_symbol=symbol,
+            stock_name=name,
+            market_type=market_type,
+            analysis_date=now - timedelta(days=i % 90),
+            status=status,
+            analysis_type="comprehensive",
+            analysts_used=analysts,
+            research_depth=(i % 5) + 1,
+            llm_provider="dashscope" if i % 2 == 0 else "deepseek",
+            llm_model="qwen-plus" if i % 2 == 0 else "deepseek-chat",
+            execution_time=60.0 + (i * 10) % 300,
+            token_usage={
+                "input_tokens": 1500 + (i * 100) % 5000,
+                "output_tokens": 800 + (i * 50) % 2000,
+                "total_cost": 0.03 + (i * 0.01) % 0.20
+            },
+            raw_results=generate_raw(symbol, status),
+            formatted_results=generate_formatted(symbol, status, now_iso),
+            metadata={
+                "session_id": f"{session_id}_{i}",
+                "test_record": True,
+                "test_batch": session_id,
+                "record_index": i
             }
+        )
+        
+        records.append(record)
+    
+    return records
+
+
+# Response templates for MockAnalysisRunner; each call shallow-copies one and
+# fills in the per-call fields. The nested 'decision' dict and the per-symbol
+# 'state' dicts are shared between responses and must be treated as read-only.
+_MOCK_FAIL_TEMPLATE = {
+    'success': False,
+    'error': 'Mock analysis failure',
+    'stock_symbol': None,
+    'analysis_date': None,
+    'session_id': None
+}
+
+_MOCK_SUCCESS_TEMPLATE = {
+    'success': True,
+    'stock_symbol': None,
+    'analysis_date': None,
+    'analysts': None,
+    'research_depth': None,
+    'llm_provider': None,
+    'llm_model': None,
+    'state': None,
+    'decision': {
+        'action': 'BUY',
+        'confidence': 0.75,
+        'target_price': 150.0,
+        'reasoning': 'Mock analysis reasoning'
+    },
+    'session_id': None
+}
+
+# Mock 'state' dicts keyed by stock symbol (which may be None)
+_MOCK_STATE_CACHE: Dict[Any, Dict[str, str]] = {}
 
 
 class MockAnalysisRunner:
     """Mock analysis runner for testing without actual LLM calls"""
     
+    __slots__ = ('call_count', 'should_fail', 'failure_rate', '_failure_bits', '_failure_bits_rate')
+    
+    # Length of the precomputed failure table (a power of two, cycled by call count)
+    FAILURE_TABLE_SIZE = 1024
+    
     def __init__(self):
         self.call_count = 0
         self.should_fail = False
         self.failure_rate = 0.1  # 10% failure rate
+        self._build_failure_bits()
+    
+    def _build_failure_bits(self):
+        """Precompute a deterministic failure table for the current failure rate"""
+        rng = random.Random(0)
+        self._failure_bits = bytes(
+            1 if rng.random() < self.failure_rate else 0
+            for _ in range(self.FAILURE_TABLE_SIZE)
+        )
+        self._failure_bits_rate = self.failure_rate
     
     def mock_run_stock_analysis(self, **kwargs):
         """Mock implementation of run_stock_analysis"""
         self.call_count += 1
         
+        # The failure rate may be changed after construction
+        if self.failure_rate != self._failure_bits_rate:
+            self._build_failure_bits()
+        
+        symbol = kwargs.get('stock_symbol')
+        
         # Simulate occasional failures
-        if self.should_fail or (hash(kwargs.get('stock_symbol', '')) % 10 < self.failure_rate * 10):
-            return {
-                'success': False,
-                'error': 'Mock analysis failure',
-                'stock_symbol': kwargs.get('stock_symbol'),
-                'analysis_date': kwargs.get('analysis_date'),
-                'session_id': f"mock_session_{self.call_count}"
-            }
+        if self.should_fail or self._failure_bits[self.call_count & (self.FAILURE_TABLE_SIZE - 1)]:
+            result = _MOCK_FAIL_TEMPLATE.copy()
+            result['stock_symbol'] = symbol
+            result['analysis_date'] = kwargs.get('analysis_date')
+            result['session_id'] = f"mock_session_{self.call_count}"
+            return result
         
         # Simulate successful analysis
-        return {
-            'success': True,
-            'stock_symbol': kwargs.get('stock_symbol'),
-            'analysis_date': kwargs.get('analysis_date'),
-            'analysts': kwargs.get('analysts', []),
-            'research_depth': kwargs.get('research_depth', 3),
-            'llm_provider': kwargs.get('llm_provider', 'dashscope'),
-            'llm_model': kwargs.get('llm_model', 'qwen-plus'),
-            'state': {
-                'market_report': f"Mock technical analysis for {kwargs.get('stock_symbol')}",
-                'fundamentals_report': f"Mock fundamental analysis for {kwargs.get('stock_symbol')}",
-                'news_report': f"Mock news analysis for {kwargs.get('stock_symbol')}"
-            },
-            'decision': {
-                'action': 'BUY',
-                'confidence': 0.75,
-                'target_price': 150.0,
-                'reasoning': 'Mock analysis reasoning'
-            },
-            'session_id': f"mock_session_{self.call_count}"
-        }
+        result = _MOCK_SUCCESS_TEMPLATE.copy()
+        result['stock_symbol'] = symbol
+        result['analysis_date'] = kwargs.get('analysis_date')
+        result['analysts'] = kwargs.get('analysts', [])
+        result['research_depth'] = kwargs.get('research_depth', 3)
+        result['llm_provider'] = kwargs.get('llm_provider', 'dashscope')
+        result['llm_model'] = kwargs.get('llm_model', 'qwen-plus')
+        state = _MOCK_STATE_CACHE.get(symbol)
+        if state is None:
+            state = _MOCK_STATE_CACHE[symbol] = {
+                'market_report': f"Mock technical analysis for {symbol}",
+                'fundamentals_report': f"Mock fundamental analysis for {symbol}",
+                'news_report': f"Mock news analysis for {symbol}"
+            }
+        result['state'] = state
+        result['session_id'] = f"mock_session_{self.call_count}"
+        return result
 
 
 class TestEnvironmentManager:
     """Manage test environment setup and cleanup"""
     
-    def __init__(self):
+    __slots__ = ('temp_dirs', 'test_records', '_env_snapshot', 'shared_tmp')
+    
+    # Temporary directory shared by managers created with shared_tmp=True
+    _session_tmp: Optional[str] = None
+    
+    def __init__(self, shared_tmp: bool = False):
         self.temp_dirs = []
         self.test_records = []
-        self.original_env = {}
+        self._env_snapshot: Optional[Dict[str, str]] = None
+        self.shared_tmp = shared_tmp
+    
+    @classmethod
+    def get_session_tmp(cls) -> str:
+        """Get the session-wide temporary directory, creating it on first use"""
+        if cls._session_tmp is None:
+            cls._session_tmp = tempfile.mkdtemp(prefix='tradingagents_test_session_')
+            atexit.register(shutil.rmtree, cls._session_tmp, True)
+        return cls._session_tmp
+    
+    @classmethod
+    def reset_session_tmp(cls):
+        """Remove the session-wide temporary directory"""
+        if cls._session_tmp is not None:
+            shutil.rmtree(cls._session_tmp, ignore_errors=True)
+            cls._session_tmp = None
     
     def setup_test_environment(self):
         """Set up test environment"""
-        # Create temporary directories
-        temp_dir = tempfile.mkdtemp(prefix='tradingagents_test_')
-        self.temp_dirs.append(temp_dir)
+        if self.shared_tmp:
+            # Reuse one directory for the whole session; it is removed at exit
+            temp_dir = self.get_session_tmp()
+        else:
+            # Create temporary directories
+            temp_dir = tempfile.mkdtemp(prefix='tradingagents_test_')
+            self.temp_dirs.append(temp_dir)
         
         # Set test environment variables
         test_env_vars = {
@@ -244,28 +433,31 @@ class TestEnvironmentManager:
             'MONGODB_TEST_DB': TEST_CONFIG['test_db_name']
         }
         
-        for key, value in test_env_vars.items():
-            self.original_env[key] = os.environ.get(key)
-            os.environ[key] = value
+        # Snapshot the environment once so cleanup can restore it exactly
+        if self._env_snapshot is None:
+            self._env_snapshot = os.environ.copy()
+        os.environ.update(test_env_vars)
         
         return temp_dir
     
     def cleanup_test_environment(self):
         """Clean up test environment"""
-        # Restore original environment variables
-        for key, original_value in self.original_env.items():
-            if original_value is None:
-                os.environ.pop(key, None)
-            else:
-                os.environ[key] = original_value
+        # Restore the environment snapshot, touching only keys that changed
+        snapshot = self._env_snapshot
+        if snapshot is not None:
+            for key in [key for key in os.environ if key not in snapshot]:
+                del os.environ[key]
+            for key, value in snapshot.items():
+                if os.environ.get(key) != value:
+                    os.environ[key] = value
+            self._env_snapshot = None
         
-        # Clean up temporary directories
-        import shutil
+        # Clean up temporary directories (the shared session directory is
+        # never tracked here)
         for temp_dir in self.temp_dirs:
-            try:
-                shutil.rmtree(temp_dir)
-            except Exception as e:
-                print(f"Warning: Failed to clean up temp dir {temp_dir}: {e}")
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            if os.path.lexists(temp_dir):
+                print(f"Warning: Failed to clean up temp dir {temp_dir}")
         
         self.temp_dirs.clear()
     
@@ -276,9 +468,14 @@ class TestEnvironmentManager:
         self.cleanup_test_environment()
 
 
-def get_test_config() -> Dict[str, Any]:
-    """Get test configuration"""
-    return TEST_CONFIG.copy()
+def get_test_config() -> Mapping[str, Any]:
+    """Get a read-only view of the test configuration"""
+    return _TEST_CONFIG_VIEW
+
+
+def get_test_config_mutable() -> Dict[str, Any]:
+    """Get a private, mutable deep copy of the test configuration"""
+    return copy.deepcopy(TEST_CONFIG)
 
 
 def create_test_data_generator(session_id: str) -> TestDataGenerator:
@@ -291,6 +488,6 @@ def create_mock_analysis_runner() -> MockAnalysisRunner:
     return MockAnalysisRunner()
 
 
-def create_test_environment_manager() -> TestEnvironmentManager:
+def create_test_environment_manager(shared_tmp: bool = False) -> TestEnvironmentManager:
     """Create a test environment manager"""
-    return TestEnvironmentManager()
\ No newline at end of file
+    return TestEnvironmentManager(shared_tmp=shared_tmp)
\ No newline at end of file
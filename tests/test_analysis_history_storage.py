@@ -182,6 +182,23 @@ class TestAnalysisHistoryRecordSerialization(unittest.TestCase):
         self.assertIsInstance(data['analysts_used'], list)
         self.assertIsInstance(data['token_usage'], dict)
     
+    def test_to_dict_returns_independent_copy(self):
+        """Test that mutating a serialized dict does not leak into the record"""
+        data = self.sample_record.to_dict()
+        data['_id'] = 'mongo_id'
+        
+        self.assertNotIn('_id', self.sample_record.to_dict())
+    
+    def test_to_dict_reflects_field_updates(self):
+        """Test that the serialized dict reflects field changes"""
+        self.sample_record.to_dict()
+        self.sample_record.update_status('failed')
+        self.sample_record.execution_time = 12.5
+        
+        data = self.sample_record.to_dict()
+        self.assertEqual(data['status'], 'failed')
+        self.assertEqual(data['execution_time'], 12.5)
+    
     def test_from_dict_deserialization(self):
         """Test record deserialization from dictionary"""
         # Serialize and deserialize
@@ -415,6 +432,39 @@ class TestAnalysisHistoryStorageMocked(unittest.TestCase):
         self.assertIsInstance(result, AnalysisHistoryRecord)
         self.assertEqual(result.analysis_id, self.sample_record.analysis_id)
     
+    @patch('web.utils.history_storage.get_database_manager')
+    def test_get_analysis_by_id_counts_access_once_across_retries(self, mock_get_db_manager):
+        """Test a retried database lookup does not count the access twice"""
+        from pymongo.errors import ConnectionFailure
+        
+        # Mock database manager to return unavailable
+        mock_db_manager = Mock()
+        mock_db_manager.is_mongodb_available.return_value = False
+        mock_get_db_manager.return_value = mock_db_manager
+        
+        # Import and create storage
+        from web.utils.history_storage import AnalysisHistoryStorage
+        storage = AnalysisHistoryStorage()
+        
+        # First lookup fails with a connection error, the retry succeeds
+        storage.collection = Mock()
+        storage.cache_manager = Mock()
+        storage.cache_manager.get_cached_record.return_value = None
+        storage.performance_monitor = Mock()
+        storage.collection.find_one.side_effect = [ConnectionFailure("reset"), self.sample_record.to_dict()]
+        
+        with patch('time.sleep'):
+            result = storage.get_analysis_by_id(self.sample_record.analysis_id)
+        
+        # The access is counted once, in the cache lookup pipeline
+        self.assertEqual(result.analysis_id, self.sample_record.analysis_id)
+        self.assertEqual(storage.collection.find_one.call_count, 2)
+        storage.cache_manager.get_cached_record.assert_called_once()
+        access_time = storage.cache_manager.get_cached_record.call_args[1]['access_time']
+        storage.performance_monitor.record_access.assert_called_once_with(
+            self.sample_record.analysis_id, access_time, shared=False
+        )
+    
     @patch('web.utils.history_storage.get_database_manager')
     def test_get_analysis_by_id_not_found(self, mock_get_db_manager):
         """Test retrieval when record not found"""
@@ -486,6 +536,152 @@ class TestAnalysisHistoryStorageMocked(unittest.TestCase):
         # Verify failure
         self.assertFalse(result)
         storage.collection.delete_one.assert_not_called()
+    
+    @patch('web.utils.history_storage.get_database_manager')
+    def test_get_user_history_bounded_page_and_count(self, mock_get_db_manager):
+        """Test the page is a bounded find and the count a separate query"""
+        # Mock database manager to return unavailable
+        mock_db_manager = Mock()
+        mock_db_manager.is_mongodb_available.return_value = False
+        mock_get_db_manager.return_value = mock_db_manager
+        
+        # Import and create storage
+        from web.utils.history_storage import AnalysisHistoryStorage
+        storage = AnalysisHistoryStorage()
+        
+        # Mock collection and bypass the result cache
+        storage.collection = Mock()
+        storage.cache_manager = Mock()
+        storage.cache_manager.get_cached_query_result.return_value = None
+        cursor = storage.collection.find.return_value
+        cursor.sort.return_value.skip.return_value.limit.return_value = [self.sample_record.to_dict()]
+        storage.collection.count_documents.return_value = 42
+        
+        records, total_count = storage.get_user_history(page=2, page_size=20)
+        
+        # Verify a top-k page on the date index plus a count
+        self.assertEqual(len(records), 1)
+        self.assertEqual(total_count, 42)
+        self.assertEqual(storage.collection.find.call_args[1]['hint'], [('created_at', -1)])
+        self.assertNotIn('allow_disk_use', storage.collection.find.call_args[1])
+        cursor.sort.return_value.skip.assert_called_once_with(20)
+        cursor.sort.return_value.skip.return_value.limit.assert_called_once_with(20)
+        storage.collection.aggregate.assert_not_called()
+        storage.cache_manager.cache_query_result.assert_called_once()
+    
+    @patch('web.utils.history_storage.get_database_manager')
+    def test_get_user_history_other_sort_skips_date_hint(self, mock_get_db_manager):
+        """Test sorts the date index cannot serve are not forced onto it"""
+        # Mock database manager to return unavailable
+        mock_db_manager = Mock()
+        mock_db_manager.is_mongodb_available.return_value = False
+        mock_get_db_manager.return_value = mock_db_manager
+        
+        # Import and create storage
+        from web.utils.history_storage import AnalysisHistoryStorage
+        storage = AnalysisHistoryStorage()
+        
+        # Mock collection and bypass the result cache
+        storage.collection = Mock()
+        storage.cache_manager = Mock()
+        storage.cache_manager.get_cached_query_result.return_value = None
+        storage.collection.find.return_value.sort.return_value.skip.return_value.limit.return_value = []
+        storage.collection.count_documents.return_value = 0
+        
+        storage.get_user_history(sort_by='execution_time')
+        
+        # Verify the planner picks the index and large sorts may spill
+        find_options = storage.collection.find.call_args[1]
+        self.assertNotIn('hint', find_options)
+        self.assertTrue(find_options['allow_disk_use'])
+        storage.collection.find.return_value.sort.assert_called_once_with('execution_time', -1)
+    
+    @patch('web.utils.history_storage.get_database_manager')
+    def test_get_user_history_skip_count(self, mock_get_db_manager):
+        """Test skip_count omits counting and detects a next page"""
+        # Mock database manager to return unavailable
+        mock_db_manager = Mock()
+        mock_db_manager.is_mongodb_available.return_value = False
+        mock_get_db_manager.return_value = mock_db_manager
+        
+        # Import and create storage
+        from web.utils.history_storage import AnalysisHistoryStorage
+        storage = AnalysisHistoryStorage()
+        
+        # Mock collection returning one more document than the page size
+        storage.collection = Mock()
+        storage.cache_manager = Mock()
+        storage.cache_manager.get_cached_query_result.return_value = None
+        limited = storage.collection.find.return_value.sort.return_value.skip.return_value.limit
+        limited.return_value = [self.sample_record.to_dict() for _ in range(3)]
+        
+        records, total_count = storage.get_user_history(page=1, page_size=2, skip_count=True)
+        
+        # Verify the extra document only signals the next page
+        self.assertEqual(len(records), 2)
+        self.assertGreater(total_count, 2)
+        limited.assert_called_once_with(3)
+        storage.collection.count_documents.assert_not_called()
+        storage.cache_manager.cache_query_result.assert_not_called()
+    
+    @patch('web.utils.history_storage.get_database_manager')
+    def test_get_user_history_projection(self, mock_get_db_manager):
+        """Test projected pages return plain dicts and bypass the query cache"""
+        # Mock database manager to return unavailable
+        mock_db_manager = Mock()
+        mock_db_manager.is_mongodb_available.return_value = False
+        mock_get_db_manager.return_value = mock_db_manager
+        
+        # Import and create storage
+        from web.utils.history_storage import AnalysisHistoryStorage
+        storage = AnalysisHistoryStorage()
+        
+        # Mock collection returning a projected document
+        storage.collection = Mock()
+        storage.cache_manager = Mock()
+        projected_doc = {'analysis_id': 'abc', 'status': 'completed'}
+        storage.collection.find.return_value.sort.return_value.skip.return_value.limit.return_value = [projected_doc]
+        storage.collection.count_documents.return_value = 1
+        
+        records, total_count = storage.get_user_history(projection=['analysis_id', 'status'])
+        
+        # Verify the projection and cache bypass
+        self.assertEqual(records, [projected_doc])
+        self.assertEqual(total_count, 1)
+        find_options = storage.collection.find.call_args[1]
+        self.assertEqual(find_options['projection'], {'_id': 0, 'analysis_id': 1, 'status': 1})
+        self.assertNotIn('hint', find_options)
+        storage.cache_manager.get_cached_query_result.assert_not_called()
+        storage.cache_manager.cache_query_result.assert_not_called()
+    
+    @patch('web.utils.history_storage.get_database_manager')
+    def test_get_user_history_cursor_resumes_after_last_record(self, mock_get_db_manager):
+        """Test keyset pagination resumes from the previous page's cursor"""
+        # Mock database manager to return unavailable
+        mock_db_manager = Mock()
+        mock_db_manager.is_mongodb_available.return_value = False
+        mock_get_db_manager.return_value = mock_db_manager
+        
+        # Import and create storage
+        from web.utils.history_storage import AnalysisHistoryStorage
+        storage = AnalysisHistoryStorage()
+        
+        # Mock collection manually
+        storage.collection = MagicMock()
+        mock_doc = self.sample_record.to_dict()
+        mock_doc['_id'] = "507f1f77bcf86cd799439011"
+        storage.collection.find.return_value.sort.return_value.limit.side_effect = lambda n: [dict(mock_doc)]
+        
+        # A full first page yields a cursor for the next one
+        records, next_cursor = storage.get_user_history_cursor(page_size=1)
+        self.assertEqual(len(records), 1)
+        self.assertIsNotNone(next_cursor)
+        
+        # The next page query starts strictly after the last record
+        storage.get_user_history_cursor(cursor=next_cursor, page_size=1)
+        query = storage.collection.find.call_args[0][0]
+        self.assertEqual(query['$or'][0], {'created_at': {'$lt': self.sample_record.created_at}})
+        self.assertEqual(query['$or'][1]['_id'], {'$lt': "507f1f77bcf86cd799439011"})
 
 
 class TestAnalysisHistoryStorageErrorHandling(unittest.TestCase):
@@ -752,6 +948,47 @@ class TestAnalysisHistoryStorageIntegration(unittest.TestCase):
         self.assertEqual(result, 3)
         storage.collection.delete_many.assert_called_once()
     
+    @patch('web.utils.history_storage.get_database_manager')
+    def test_cleanup_old_records_batches_by_id_range(self, mock_get_db_manager):
+        """Test old records are deleted in _id-range batches plus a final sweep"""
+        # Mock database manager
+        mock_db_manager = Mock()
+        mock_db_manager.is_mongodb_available.return_value = False
+        mock_get_db_manager.return_value = mock_db_manager
+        
+        # Import and create storage
+        from web.utils.history_storage import AnalysisHistoryStorage
+        storage = AnalysisHistoryStorage()
+        
+        # Mock collection: a full batch and a partial batch for the _id
+        # range, then a full batch and an empty batch for the sweep
+        storage.collection = MagicMock()
+        storage.collection.find.return_value.sort.return_value.limit.side_effect = [
+            [{'_id': 1}, {'_id': 2}],
+            [{'_id': 3}],
+            [{'_id': 10}, {'_id': 11}],
+            []
+        ]
+        storage.collection.delete_many.side_effect = [
+            Mock(deleted_count=2), Mock(deleted_count=1), Mock(deleted_count=2)
+        ]
+        
+        deleted_count = storage.cleanup_old_records(days_to_keep=30, batch_size=2)
+        
+        # Verify batches walk the _id index and the sweep covers later inserts
+        self.assertEqual(deleted_count, 5)
+        id_range_query = storage.collection.find.call_args_list[0][0][0]
+        self.assertIn('$lt', id_range_query['_id'])
+        storage.collection.find.return_value.sort.assert_called_with('_id', 1)
+        sweep_query = storage.collection.find.call_args_list[-1][0][0]
+        self.assertIn('$gte', sweep_query['_id'])
+        self.assertIn('$lt', sweep_query['created_at'])
+        
+        # Every delete is a bounded $in batch, including the sweep
+        for call in storage.collection.delete_many.call_args_list:
+            self.assertEqual(set(call[0][0]), {'_id'})
+            self.assertLessEqual(len(call[0][0]['_id']['$in']), 2)
+    
     @patch('web.utils.history_storage.get_database_manager')
     def test_stats_collection(self, mock_get_db_manager):
         """Test statistics collection"""
@@ -792,6 +1029,188 @@ class TestAnalysisHistoryStorageIntegration(unittest.TestCase):
         for key in expected_keys:
             self.assertIn(key, stats)
     
+    @patch('web.utils.history_storage.get_database_manager')
+    def test_stats_served_from_fresh_view(self, mock_get_db_manager):
+        """Test statistics are read from a fresh stats view without scanning the collection"""
+        # Mock database manager
+        mock_db_manager = Mock()
+        mock_db_manager.is_mongodb_available.return_value = False
+        mock_get_db_manager.return_value = mock_db_manager
+        
+        # Import and create storage
+        from web.utils.history_storage import AnalysisHistoryStorage
+        storage = AnalysisHistoryStorage()
+        
+        # Mock collection and view buckets
+        storage.collection = Mock()
+        storage.database = MagicMock()
+        storage.cache_manager = Mock()
+        storage.cache_manager.get_cached_stats.return_value = None
+        refreshed_at = datetime.now()
+        today = refreshed_at.replace(hour=0, minute=0, second=0, microsecond=0)
+        view_collection = storage.database.__getitem__.return_value
+        view_collection.find_one.return_value = {'refreshed_at': refreshed_at}
+        view_collection.find.return_value = [
+            {
+                '_id': {'status': 'completed', 'market_type': '美股', 'llm_provider': 'dashscope', 'day': today},
+                'count': 8, 'execution_time_sum': 400.0, 'execution_time_count': 8,
+                'cost_sum': 0.8, 'cost_count': 8, 'refreshed_at': refreshed_at
+            },
+            {
+                '_id': {'status': 'failed', 'market_type': 'A股', 'llm_provider': 'deepseek',
+                        'day': today - timedelta(days=40)},
+                'count': 2, 'execution_time_sum': 100.0, 'execution_time_count': 2,
+                'cost_sum': 0.2, 'cost_count': 2, 'refreshed_at': refreshed_at
+            }
+        ]
+        
+        # Get stats
+        stats = storage.get_history_stats()
+        
+        # Verify the view buckets were folded without touching the collection
+        storage.database.__getitem__.assert_called_with('history_stats_mv')
+        self.assertEqual(stats['total_analyses'], 10)
+        self.assertEqual(stats['success_rate'], 80.0)
+        self.assertEqual(stats['recent_analyses'], 8)
+        self.assertEqual(stats['avg_execution_time'], 50.0)
+        self.assertEqual(stats['status_distribution'], {'completed': 8, 'failed': 2})
+        self.assertEqual(stats['llm_distribution'], {'dashscope': 8, 'deepseek': 2})
+        self.assertEqual(stats['daily_trend'], {today.strftime('%Y-%m-%d'): 8})
+        storage.collection.aggregate.assert_not_called()
+        storage.collection.count_documents.assert_not_called()
+    
+    @patch('web.utils.history_storage.get_database_manager')
+    def test_unsupported_stats_view_is_remembered(self, mock_get_db_manager):
+        """Test a server that rejects $merge falls back to live stats without retrying the view"""
+        from pymongo.errors import OperationFailure
+        
+        # Mock database manager
+        mock_db_manager = Mock()
+        mock_db_manager.is_mongodb_available.return_value = False
+        mock_get_db_manager.return_value = mock_db_manager
+        
+        # Import and create storage
+        from web.utils.history_storage import AnalysisHistoryStorage
+        storage = AnalysisHistoryStorage()
+        
+        # An empty view whose refresh is rejected by the server
+        storage.collection = Mock()
+        storage.database = MagicMock()
+        storage.cache_manager = Mock()
+        storage.cache_manager.get_cached_stats.return_value = None
+        view_collection = storage.database.__getitem__.return_value
+        view_collection.find_one.return_value = None
+        
+        def aggregate(pipeline, **kwargs):
+            if '$merge' in pipeline[-1]:
+                raise OperationFailure("Unrecognized pipeline stage name: '$merge'", code=40324)
+            return []
+        
+        storage.collection.aggregate.side_effect = aggregate
+        storage.collection.count_documents.return_value = 0
+        
+        # Both calls are computed live; only the first one tries the view
+        storage.get_history_stats()
+        storage.get_history_stats()
+        
+        self.assertFalse(storage._has_stats_view)
+        merge_calls = [
+            call for call in storage.collection.aggregate.call_args_list
+            if '$merge' in call.args[0][-1]
+        ]
+        self.assertEqual(len(merge_calls), 1)
+        view_collection.find_one.assert_called_once()
+    
+    @patch('web.utils.history_storage.get_database_manager')
+    def test_get_index_stats_uses_probed_capability(self, mock_get_db_manager):
+        """Test index statistics are only queried when $indexStats is supported"""
+        # Mock database manager
+        mock_db_manager = Mock()
+        mock_db_manager.is_mongodb_available.return_value = False
+        mock_get_db_manager.return_value = mock_db_manager
+        
+        # Import and create storage
+        from web.utils.history_storage import AnalysisHistoryStorage
+        storage = AnalysisHistoryStorage()
+        
+        # Mock collection
+        storage.collection = Mock()
+        storage.collection.aggregate.return_value = [{'name': '_id_', 'accesses': {'ops': 3}}]
+        
+        # Unsupported: no query is issued
+        self.assertEqual(storage.get_index_stats(), [])
+        storage.collection.aggregate.assert_not_called()
+        
+        # Supported: statistics come from the $indexStats stage
+        storage._has_index_stats = storage._probe_index_stats()
+        self.assertTrue(storage._has_index_stats)
+        self.assertEqual(storage.get_index_stats()[0]['name'], '_id_')
+        self.assertEqual(storage.collection.aggregate.call_args[0][0], [{'$indexStats': {}}])
+    
+    @patch('web.utils.history_storage.get_database_manager')
+    def test_drop_unused_indexes_keeps_declared_indexes(self, mock_get_db_manager):
+        """Test only undeclared, unprotected indexes unused for the observation window are dropped"""
+        # Mock database manager
+        mock_db_manager = Mock()
+        mock_db_manager.is_mongodb_available.return_value = False
+        mock_get_db_manager.return_value = mock_db_manager
+        
+        # Import and create storage
+        from web.utils.history_storage import AnalysisHistoryStorage
+        storage = AnalysisHistoryStorage()
+        storage.collection = Mock()
+        
+        long_ago = datetime.utcnow() - timedelta(days=3)
+        recently = datetime.utcnow() - timedelta(hours=1)
+        index_stats = [
+            {'name': '_id_', 'accesses': {'ops': 0, 'since': long_ago}},
+            {'name': 'idx_created_at_desc', 'accesses': {'ops': 0, 'since': long_ago}},
+            {'name': 'legacy_unused', 'accesses': {'ops': 0, 'since': long_ago}},
+            {'name': 'legacy_used', 'accesses': {'ops': 12, 'since': long_ago}},
+            {'name': 'legacy_new', 'accesses': {'ops': 0, 'since': recently}},
+            {'name': 'legacy_unique', 'spec': {'key': {'ref': 1}, 'unique': True},
+             'accesses': {'ops': 0, 'since': long_ago}},
+            {'name': 'legacy_ttl', 'spec': {'key': {'expires_at': 1}, 'expireAfterSeconds': 0},
+             'accesses': {'ops': 0, 'since': long_ago}},
+            {'name': 'legacy_partial', 'spec': {'key': {'status': 1}, 'partialFilterExpression': {}},
+             'accesses': {'ops': 0, 'since': long_ago}},
+            {'name': 'legacy_hidden', 'spec': {'key': {'tag': 1}, 'hidden': True},
+             'accesses': {'ops': 0, 'since': long_ago}},
+        ]
+        
+        # Dry run by default: unused indexes are only reported
+        unused = storage.drop_unused_indexes(index_stats)
+        
+        self.assertEqual(unused, ['legacy_unused'])
+        storage.collection.drop_index.assert_not_called()
+        
+        dropped = storage.drop_unused_indexes(index_stats, dry_run=False)
+        
+        self.assertEqual(dropped, ['legacy_unused'])
+        storage.collection.drop_index.assert_called_once_with('legacy_unused')
+    
+    @patch('web.utils.history_storage.get_database_manager')
+    def test_create_indexes_skips_existing(self, mock_get_db_manager):
+        """Test only missing declared indexes are created"""
+        # Mock database manager
+        mock_db_manager = Mock()
+        mock_db_manager.is_mongodb_available.return_value = False
+        mock_get_db_manager.return_value = mock_db_manager
+        
+        # Import and create storage
+        from web.utils.history_storage import AnalysisHistoryStorage
+        storage = AnalysisHistoryStorage()
+        storage.collection = Mock()
+        declared = [spec['options']['name'] for spec in AnalysisHistoryStorage.INDEX_SPECS]
+        storage.collection.index_information.return_value = {
+            name: {} for name in ['_id_'] + declared[1:]
+        }
+        
+        storage._create_indexes()
+        
+        storage.collection.create_index.assert_called_once()
+        self.assertEqual(storage.collection.create_index.call_args[1]['name'], declared[0])
+    
     @patch('web.utils.history_storage.get_database_manager')
     def test_update_analysis_status(self, mock_get_db_manager):
         """Test updating analysis status"""
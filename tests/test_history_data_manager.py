@@ -27,9 +27,9 @@ class TestHistoryDataManager:
         mock_manager.is_mongodb_available.return_value = True
         
         # Create a proper mock client that supports subscripting
-        mock_client = Mock()
-        mock_database = Mock()
-        mock_client.__getitem__ = Mock(return_value=mock_database)
+        mock_client = MagicMock()
+        mock_database = MagicMock()
+        mock_client.__getitem__.return_value = mock_database
         mock_client.admin.command = Mock(return_value=True)
         
         mock_manager.get_mongodb_client.return_value = mock_client
@@ -66,10 +66,10 @@ class TestHistoryDataManager:
             stock_symbol="AAPL",
             stock_name="Apple Inc.",
             market_type="美股",
-            analysis_date=datetime.now().date(),
+            analysis_date=datetime.now(),
             created_at=datetime.now(),
             analysis_type="comprehensive",
-            status=AnalysisStatus.COMPLETED,
+            status=AnalysisStatus.COMPLETED.value,
             analysts_used=["market", "fundamentals"],
             research_depth=3,
             llm_provider="openai",
@@ -99,7 +99,7 @@ class TestHistoryDataManager:
         """Test cleanup old records in dry run mode"""
         # Mock finding old records
         mock_collection.count_documents.return_value = 5
-        mock_collection.find.return_value = [
+        mock_collection.aggregate.return_value = [
             {"analysis_id": "old_1", "stock_symbol": "AAPL", "created_at": datetime.now(), "status": "completed"},
             {"analysis_id": "old_2", "stock_symbol": "GOOGL", "created_at": datetime.now(), "status": "completed"}
         ]
@@ -110,7 +110,7 @@ class TestHistoryDataManager:
         assert result["total_found"] == 5
         assert result["deleted_count"] == 0
         assert result["dry_run"] == True
-        assert "sample_records" in result
+        assert len(result["sample_records"]) == 2
     
     def test_cleanup_old_records_actual(self, data_manager, mock_collection):
         """Test actual cleanup of old records"""
@@ -141,67 +141,120 @@ class TestHistoryDataManager:
         assert result["total_found"] == 2
         assert result["deleted_count"] == 2
     
+    def test_cleanup_records_combined(self, data_manager, mock_collection):
+        """Test old and failed records are removed with one $or delete"""
+        mock_collection.delete_many.return_value = Mock(deleted_count=7)
+        
+        result = data_manager.cleanup_records(max_age_days=30, failed_record_age_hours=24)
+        
+        assert result["success"] == True
+        assert result["deleted_count"] == 7
+        mock_collection.delete_many.assert_called_once()
+        query = mock_collection.delete_many.call_args[0][0]
+        assert len(query["$or"]) == 2
+    
+    def test_cleanup_records_in_batches(self, data_manager, mock_collection):
+        """Test batched combined cleanup deletes matches by _id until none are left"""
+        batches = [[{"_id": "id1"}, {"_id": "id2"}], [{"_id": "id3"}]]
+        mock_collection.find.return_value = Mock()
+        mock_collection.find.return_value.limit.side_effect = batches
+        mock_collection.delete_many.side_effect = [Mock(deleted_count=2), Mock(deleted_count=1)]
+        
+        result = data_manager.cleanup_records(max_age_days=30, failed_record_age_hours=24, batch_size=2)
+        
+        assert result["success"] == True
+        assert result["deleted_count"] == 3
+        assert result["processed_batches"] == 2
+        assert "$or" in mock_collection.find.call_args[0][0]
+        mock_collection.delete_many.assert_any_call({"_id": {"$in": ["id1", "id2"]}})
+        mock_collection.delete_many.assert_called_with({"_id": {"$in": ["id3"]}})
+    
+    def test_daily_counts_fall_back_without_maintenance_indexes(self, data_manager, mock_collection):
+        """Test a failed index creation is retried and a rejected hint falls back to an unhinted query"""
+        from pymongo.errors import OperationFailure
+        
+        mock_collection.create_index.side_effect = OperationFailure("not authorized", code=13)
+        
+        def aggregate(pipeline, **kwargs):
+            if "hint" in kwargs:
+                raise OperationFailure("hint provided does not correspond to an existing index", code=2)
+            return [{"_id": "2025-01-01", "count": 5}]
+        
+        mock_collection.aggregate.side_effect = aggregate
+        
+        result = data_manager.get_daily_counts(days=30)
+        
+        assert result == {"2025-01-01": 5}
+        assert data_manager._maintenance_indexes_ready == False
+        assert mock_collection.aggregate.call_args_list[0][1]["hint"] == [("created_at", -1)]
+        
+        data_manager.get_daily_counts(days=30)
+        assert mock_collection.create_index.call_count == 4
+    
     def test_get_storage_statistics(self, data_manager, mock_collection):
         """Test getting storage statistics"""
         # Mock database command response
         mock_database = Mock()
         mock_database.command.return_value = {
             "count": 1000,
-            "size": 1024000,
+            "size": 1048576,
             "avgObjSize": 1024,
             "storageSize": 2048000,
             "totalIndexSize": 512000
         }
         data_manager.database = mock_database
         
-        # Mock aggregation results
-        mock_collection.aggregate.side_effect = [
-            [{"_id": "completed", "count": 800}, {"_id": "failed", "count": 200}],  # status
-            [{"_id": "2025-01-01", "count": 50}, {"_id": "2025-01-02", "count": 75}],  # daily
-            [{"_id": "美股", "count": 600}, {"_id": "A股", "count": 400}],  # market
-            [{"_id": None, "avg_execution_time": 120.5, "avg_cost": 0.05}]  # performance
-        ]
+        # Mock the single $facet aggregation result
+        mock_collection.aggregate.return_value = [{
+            "status": [{"_id": "completed", "count": 800}, {"_id": "failed", "count": 200}],
+            "daily": [{"_id": "2025-01-01", "count": 50}, {"_id": "2025-01-02", "count": 75}],
+            "market": [{"_id": "美股", "count": 600}, {"_id": "A股", "count": 400}],
+            "performance": [{"_id": None, "avg_execution_time": 120.5, "avg_cost": 0.05}]
+        }]
         
-        result = data_manager.get_storage_statistics()
+        # The manager's executor is reused instead of a pool per call
+        with patch('web.utils.history_data_manager.ThreadPoolExecutor') as mock_pool:
+            result = data_manager.get_storage_statistics(use_materialized=False)
+        mock_pool.assert_not_called()
         
         assert result["success"] == True
         assert result["storage_info"]["total_documents"] == 1000
-        assert result["storage_info"]["total_size_mb"] == 1.0  # 1024000 bytes = ~1 MB
+        assert result["storage_info"]["total_size_mb"] == 1.0  # 1048576 bytes = 1 MB
         assert "completed" in result["status_distribution"]
         assert "美股" in result["market_distribution"]
+        assert mock_collection.aggregate.call_count == 1
     
     def test_check_storage_alerts(self, data_manager):
         """Test storage alert checking"""
-        # Mock get_storage_statistics
-        with patch.object(data_manager, 'get_storage_statistics') as mock_stats:
-            mock_stats.return_value = {
-                "success": True,
-                "storage_info": {
-                    "total_documents": 90000,  # Below threshold
-                    "total_size_mb": 900.0     # Below threshold
-                },
-                "daily_counts_last_30_days": {
-                    "2025-01-01": 100,
-                    "2025-01-02": 150,
-                    "2025-01-03": 200
-                }
+        stats = {
+            "success": True,
+            "storage_info": {
+                "total_documents": 70000,  # Below warning threshold
+                "total_size_mb": 700.0     # Below warning threshold
+            },
+            "daily_counts_last_30_days": {
+                "2025-01-01": 100,
+                "2025-01-02": 150,
+                "2025-01-03": 200
             }
-            
-            result = data_manager.check_storage_alerts(
-                max_size_mb=1000,
-                max_documents=100000,
-                max_daily_growth=1000
-            )
-            
-            assert result["success"] == True
-            assert result["alert_count"] == 0
-            assert result["warning_count"] == 0
+        }
+        
+        result = data_manager.check_storage_alerts(
+            max_size_mb=1000,
+            max_documents=100000,
+            max_daily_growth=1000,
+            stats=stats
+        )
+        
+        assert result["success"] == True
+        assert result["alert_count"] == 0
+        assert result["warning_count"] == 0
     
     def test_export_data(self, data_manager, mock_collection):
         """Test data export functionality"""
         # Mock collection data
         mock_collection.count_documents.return_value = 2
-        mock_collection.find.return_value = [
+        records = [
             {
                 "analysis_id": "test_1",
                 "stock_symbol": "AAPL",
@@ -216,6 +269,11 @@ class TestHistoryDataManager:
             }
         ]
         
+        # Export streams records from a batched server-side cursor
+        cursor = MagicMock()
+        cursor.__iter__.return_value = iter(records)
+        mock_collection.find.return_value = Mock(batch_size=Mock(return_value=cursor))
+        
         with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json') as temp_file:
             temp_path = temp_file.name
         
@@ -246,7 +304,7 @@ class TestHistoryDataManager:
     def test_export_data_compressed(self, data_manager, mock_collection):
         """Test compressed data export"""
         mock_collection.count_documents.return_value = 1
-        mock_collection.find.return_value = [
+        records = [
             {
                 "analysis_id": "test_1",
                 "stock_symbol": "AAPL",
@@ -255,6 +313,11 @@ class TestHistoryDataManager:
             }
         ]
         
+        # Export streams records from a batched server-side cursor
+        cursor = MagicMock()
+        cursor.__iter__.return_value = iter(records)
+        mock_collection.find.return_value = Mock(batch_size=Mock(return_value=cursor))
+        
         with tempfile.NamedTemporaryFile(delete=False, suffix='.json.gz') as temp_file:
             temp_path = temp_file.name
         
@@ -296,9 +359,10 @@ class TestHistoryDataManager:
             temp_path = temp_file.name
         
         try:
-            # Mock successful insertion
-            mock_collection.find_one.return_value = None  # No existing record
-            mock_collection.insert_many.return_value = Mock(inserted_ids=["id1"])
+            # Mock successful upsert
+            mock_collection.bulk_write.return_value = Mock(
+                bulk_api_result={"nUpserted": 1, "nMatched": 0, "nInserted": 0, "nModified": 0}
+            )
             
             result = data_manager.import_data(
                 input_path=temp_path,
@@ -325,8 +389,10 @@ class TestHistoryDataManager:
             temp_path = temp_file.name
         
         try:
-            # Mock existing record found
-            mock_collection.find_one.return_value = {"_id": "existing"}
+            # Mock existing record matched by the upsert
+            mock_collection.bulk_write.return_value = Mock(
+                bulk_api_result={"nUpserted": 0, "nMatched": 1, "nInserted": 0, "nModified": 0}
+            )
             
             result = data_manager.import_data(
                 input_path=temp_path,
@@ -340,6 +406,37 @@ class TestHistoryDataManager:
         finally:
             Path(temp_path).unlink(missing_ok=True)
     
+    def test_import_data_overwrite_counts_unchanged_records(self, data_manager, mock_collection, sample_record):
+        """Test overwriting counts replaced records even when their stored copy was unchanged"""
+        second_record = sample_record.to_dict()
+        second_record["analysis_id"] = "test_analysis_456"
+        test_data = [sample_record.to_dict(), second_record]
+        
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json') as temp_file:
+            for item in test_data:
+                json.dump(item, temp_file, default=str)
+                temp_file.write('\n')
+            temp_path = temp_file.name
+        
+        try:
+            # Both records exist; only one differed from the stored copy
+            mock_collection.bulk_write.return_value = Mock(
+                bulk_api_result={"nUpserted": 0, "nMatched": 2, "nInserted": 0, "nModified": 1}
+            )
+            
+            result = data_manager.import_data(
+                input_path=temp_path,
+                skip_existing=False
+            )
+            
+            assert result["success"] == True
+            assert result["imported_count"] == 2
+            assert result["skipped_count"] == 0
+            assert result["total_processed"] == len(test_data)
+            
+        finally:
+            Path(temp_path).unlink(missing_ok=True)
+    
     def test_import_data_validation_error(self, data_manager, mock_collection):
         """Test import with validation errors"""
         # Create invalid test data
@@ -369,6 +466,30 @@ class TestHistoryDataManager:
         finally:
             Path(temp_path).unlink(missing_ok=True)
 
+    
+    def test_watch_storage_alerts_resyncs_after_deletes(self, data_manager, mock_collection):
+        """Test the stream opens before the initial counts and deletes trigger a re-sync"""
+        calls = []
+        stream = Mock()
+        stream.try_next.side_effect = [{"operationType": "delete", "documentKey": {"_id": 1}}] + [None] * 10000
+        mock_collection.watch.side_effect = lambda *args, **kwargs: calls.append("watch") or stream
+        
+        def get_daily_counts():
+            calls.append("get_daily_counts")
+            return {}
+        
+        with patch.object(data_manager, 'get_daily_counts', side_effect=get_daily_counts), \
+             patch.object(data_manager, '_get_coll_stats', return_value={}):
+            alerts = data_manager.watch_storage_alerts(interval=0.05)
+            next(alerts)
+            next(alerts)
+            alerts.close()
+        
+        assert calls == ["watch", "get_daily_counts", "get_daily_counts"]
+        pipeline = mock_collection.watch.call_args[0][0]
+        assert pipeline[0]["$match"]["operationType"] == {"$in": ["insert", "delete"]}
+        stream.close.assert_called_once()
+
 
 class TestConvenienceFunctions:
     """Test convenience functions"""
@@ -489,5 +610,27 @@ class TestErrorHandling:
             assert "not found" in result["error"]
 
 
+class TestParallelGzipWriter:
+    """Test cases for the block-parallel gzip export writer"""
+    
+    def test_round_trip_multiple_members(self):
+        """Test concatenated gzip members decompress to the original stream"""
+        from web.utils.history_data_manager import _open_export_writer
+        
+        lines = [json.dumps({"analysis_id": f"id_{i}", "pad": "x" * (i % 40)}).encode() + b"\n"
+                 for i in range(5000)]
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = Path(temp_dir) / "export.json.gz"
+            with patch('web.utils.history_data_manager.shutil.which', return_value=None), \
+                    patch('web.utils.history_data_manager.PARALLEL_GZIP_BLOCK_SIZE', 4096):
+                with _open_export_writer(output_path, True, parallel=True) as f:
+                    for line in lines:
+                        f.write(line)
+            
+            with gzip.open(output_path, 'rb') as f:
+                assert f.read() == b"".join(lines)
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
@@ -7,6 +7,7 @@ pagination, and performance monitoring.
 """
 
 import unittest
+import json
 import time
 from datetime import datetime, timedelta
 from unittest.mock import Mock, patch, MagicMock
@@ -24,6 +25,52 @@ from web.utils.history_cache_warmer import CacheWarmer
 from web.models.history_models import AnalysisHistoryRecord, AnalysisStatus, MarketType
 
 
+class _FakeSortedSetRedis:
+    """In-memory stand-in for the Redis commands behind record and access caching"""
+    
+    def __init__(self):
+        self.sorted_sets = {}
+        self.values = {}
+        self.round_trips = 0
+    
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+    
+    def get(self, key):
+        self.round_trips += 1
+        return self._get(key)
+    
+    def _get(self, key):
+        return self.values.get(key)
+    
+    def zincrby(self, key, amount, member):
+        members = self.sorted_sets.setdefault(key, {})
+        members[member] = members.get(member, 0) + amount
+        return members[member]
+    
+    def expire(self, key, ttl):
+        return key in self.sorted_sets
+    
+    def zrange(self, key, start, end, withscores=False):
+        return sorted(self.sorted_sets.get(key, {}).items(), key=lambda item: item[1])
+
+
+class _FakePipeline:
+    """Buffers fake Redis commands until execute(), which is one round trip"""
+    
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+    
+    def __getattr__(self, name):
+        method = getattr(self.client, '_get' if name == 'get' else name)
+        return lambda *args, **kwargs: self.commands.append((method, args, kwargs))
+    
+    def execute(self):
+        self.client.round_trips += 1
+        return [method(*args, **kwargs) for method, args, kwargs in self.commands]
+
+
 class TestHistoryCacheManager(unittest.TestCase):
     """Test the Redis cache manager"""
     
@@ -68,6 +115,42 @@ class TestHistoryCacheManager(unittest.TestCase):
         self.assertTrue(result)
         self.mock_redis.setex.assert_called_once()
     
+    def test_cache_records_pipelined(self):
+        """Test caching records in pipelined batches"""
+        # Create test records
+        records = [
+            AnalysisHistoryRecord(
+                analysis_id=f"test_{i:03d}",
+                stock_symbol="AAPL",
+                stock_name="Apple Inc.",
+                market_type=MarketType.US_STOCK.value,
+                analysis_date=datetime.now(),
+                created_at=datetime.now(),
+                status=AnalysisStatus.COMPLETED.value,
+                analysis_type="comprehensive",
+                analysts_used=["market"],
+                research_depth=3,
+                llm_provider="openai",
+                llm_model="gpt-4"
+            )
+            for i in range(3)
+        ]
+        
+        # Mock Redis pipeline
+        mock_pipe = Mock()
+        mock_pipe.execute.side_effect = [[True, True], [True]]
+        self.mock_redis.pipeline.return_value = mock_pipe
+        
+        # Test caching
+        result = self.cache_manager.cache_records(records, batch_size=2)
+        
+        # Verify two round trips, no per-record writes
+        self.assertEqual(result, 3)
+        self.assertEqual(mock_pipe.execute.call_count, 2)
+        self.assertEqual(mock_pipe.setex.call_count, 3)
+        self.mock_redis.pipeline.assert_called_with(transaction=False)
+        self.mock_redis.setex.assert_not_called()
+    
     def test_get_cached_record(self):
         """Test retrieving a cached record"""
         # Mock Redis get method
@@ -80,6 +163,39 @@ class TestHistoryCacheManager(unittest.TestCase):
         # Verify Redis was called
         self.mock_redis.get.assert_called_once()
     
+    def test_get_cached_record_counts_access_in_same_round_trip(self):
+        """Test the access count is sent in the cache lookup pipeline"""
+        redis_client = _FakeSortedSetRedis()
+        self.cache_manager.redis_client = redis_client
+        
+        result = self.cache_manager.get_cached_record("test_001", access_time=datetime(2024, 1, 1, 10, 30))
+        
+        self.assertIsNone(result)
+        self.assertEqual(redis_client.round_trips, 1)
+        self.assertEqual(
+            self.cache_manager.get_access_counts(datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11)),
+            {"test_001": 1}
+        )
+    
+    def test_get_cached_records_mget(self):
+        """Test retrieving several cached records with one MGET"""
+        # Mock Redis mget with one hit and one miss
+        test_data = (
+            '{"analysis_id": "test_001", "stock_symbol": "AAPL", "stock_name": "Apple Inc.", '
+            '"market_type": "美股", "analysis_date": "2024-01-01T00:00:00", '
+            '"created_at": "2024-01-01T00:00:00", "status": "completed", '
+            '"analysts_used": ["market"], "llm_provider": "openai", "llm_model": "gpt-4"}'
+        )
+        self.mock_redis.mget.return_value = [test_data.encode('utf-8'), None]
+        
+        # Test retrieval
+        result = self.cache_manager.get_cached_records(["test_001", "test_002"])
+        
+        # Verify a single round trip
+        self.mock_redis.mget.assert_called_once()
+        self.mock_redis.get.assert_not_called()
+        self.assertEqual(list(result), ["test_001"])
+    
     def test_cache_query_result(self):
         """Test caching query results"""
         # Create test records
@@ -111,6 +227,19 @@ class TestHistoryCacheManager(unittest.TestCase):
         self.assertEqual(result, 2)
         self.mock_redis.keys.assert_called_once()
         self.mock_redis.delete.assert_called_once()
+    
+    def test_json_helpers_accept_non_string_keys(self):
+        """Test $group buckets with a None _id encode with and without orjson"""
+        from web.utils import history_json
+        
+        payload = {'market_distribution': {None: 3, 'US': 2}}
+        for orjson_available in {history_json.ORJSON_AVAILABLE, False}:
+            with patch.object(history_json, 'ORJSON_AVAILABLE', orjson_available):
+                line = history_json.dumps(payload, newline=True)
+                
+                self.assertTrue(line.endswith(b'\n'))
+                self.assertEqual(history_json.loads(line),
+                                 {'market_distribution': {'null': 3, 'US': 2}})
 
 
 class TestPerformanceMonitor(unittest.TestCase):
@@ -260,6 +389,72 @@ class TestOptimizedPaginator(unittest.TestCase):
         self.assertEqual(result.total_pages, 1)
         self.assertFalse(result.has_next)
         self.assertFalse(result.has_previous)
+    
+    def test_tune_page_size_uses_p95_with_hysteresis(self):
+        """Test page size only shrinks when every recent window has a slow p95"""
+        # Mostly fast queries with a slow tail: the mean is high, the p95 is not
+        self.paginator.query_times = [0.1] * 95 + [30.0] * 3
+        self.assertGreater(self.paginator.get_performance_stats()['avg_query_time'], 0.5)
+        self.assertLess(self.paginator.get_performance_stats()['p95_query_time'], 0.5)
+        
+        # Only the latest window is slow: the windows disagree, no resize
+        self.paginator.config.default_page_size = 40
+        self.paginator.query_times = [0.1] * 66 + [3.0] * 33
+        self.assertIsNone(self.paginator.tune_page_size())
+        self.assertEqual(self.paginator.config.default_page_size, 40)
+        
+        # Consistently slow tail across all windows: shrink in one call
+        self.paginator.query_times = [3.0] * 99
+        self.assertEqual(self.paginator.tune_page_size(), 'shrink')
+        self.assertEqual(self.paginator.config.default_page_size, 15)
+    
+    def test_optimizer_tunes_page_size_in_one_pass(self):
+        """Test a single optimizer pass applies the p95 resize rule"""
+        sys.path.insert(0, str(project_root / 'scripts'))
+        import optimize_history_performance as optimizer_module
+        
+        with patch.multiple(optimizer_module,
+                            get_history_storage=Mock(),
+                            get_cache_manager=Mock(),
+                            get_performance_monitor=Mock(),
+                            get_cache_warmer=Mock(),
+                            get_paginator=Mock(return_value=self.paginator)):
+            optimizer = optimizer_module.HistoryPerformanceOptimizer()
+        
+        # Fast queries throughout the stored history
+        self.paginator.query_times = [0.1] * 60
+        
+        self.assertTrue(optimizer.optimize_pagination_settings())
+        self.assertEqual(self.paginator.config.default_page_size, 30)
+        self.assertIn('pagination_optimization', optimizer.optimization_results['steps_completed'])
+    
+    def test_optimizer_background_tasks_stay_out_of_results(self):
+        """Test monitoring threads are waited on without entering the results"""
+        sys.path.insert(0, str(project_root / 'scripts'))
+        import optimize_history_performance as optimizer_module
+        
+        with patch.multiple(optimizer_module,
+                            get_history_storage=Mock(),
+                            get_cache_manager=Mock(),
+                            get_performance_monitor=Mock(),
+                            get_cache_warmer=Mock(),
+                            get_paginator=Mock(return_value=self.paginator),
+                            log_performance_summary=Mock()):
+            optimizer = optimizer_module.HistoryPerformanceOptimizer()
+            self.assertTrue(optimizer.setup_performance_monitoring())
+            self.assertTrue(optimizer.wait_for_background_tasks(timeout=5))
+        
+        json.dumps(optimizer.optimization_results)
+        self.assertEqual(len(optimizer._background_threads), 1)
+    
+    def test_tune_page_size_bounds_page_bytes(self):
+        """Test large documents cap the page size to the byte budget"""
+        self.paginator.config.default_page_size = 40
+        self.paginator.avg_document_size = 64 * 1024  # 8 records per 512KB
+        
+        self.assertEqual(self.paginator.bandwidth_page_size(), 8)
+        self.assertEqual(self.paginator.tune_page_size(), 'bandwidth')
+        self.assertEqual(self.paginator.config.default_page_size, 8)
 
 
 class TestCacheWarmer(unittest.TestCase):
@@ -304,6 +499,74 @@ class TestCacheWarmer(unittest.TestCase):
         self.assertTrue(result)
         self.cache_warmer.storage.get_history_stats.assert_called_once()
     
+    def test_window_aware_warming(self):
+        """Test warming the records accessed in the same window yesterday"""
+        now = datetime(2024, 1, 2, 9, 30)
+        monitor = PerformanceMonitor()
+        monitor.record_access("hot", datetime(2024, 1, 1, 10, 0))
+        monitor.record_access("hot", datetime(2024, 1, 1, 11, 0))
+        monitor.record_access("other_window", datetime(2024, 1, 1, 13, 0))
+        self.cache_warmer.performance_monitor = monitor
+        
+        # Mock storage and cache responses
+        self.cache_warmer.storage.get_analyses_by_ids.return_value = [Mock()]
+        self.cache_warmer.cache_manager.cache_records.return_value = 1
+        
+        # Test warming
+        results = self.cache_warmer.window_aware_warming(now)
+        
+        # Verify only the 08:00-12:00 window from yesterday was warmed
+        self.assertEqual(results['strategy'], 'window')
+        self.assertEqual(results['records_warmed'], 1)
+        self.cache_warmer.storage.get_analyses_by_ids.assert_called_once_with(["hot"])
+    
+    def test_window_aware_warming_uses_counts_from_other_processes(self):
+        """Test accesses counted in Redis by another process drive warming"""
+        redis_client = _FakeSortedSetRedis()
+        
+        # The web process records accesses through the shared Redis counts
+        web_cache = HistoryCacheManager()
+        web_cache.redis_client = redis_client
+        web_cache.cache_available = True
+        web_monitor = PerformanceMonitor(cache_manager=web_cache)
+        web_monitor.record_access("hot", datetime(2024, 1, 1, 10, 0))
+        web_monitor.record_access("hot", datetime(2024, 1, 1, 10, 45))
+        web_monitor.record_access("warm", datetime(2024, 1, 1, 11, 0))
+        web_monitor.record_access("other_window", datetime(2024, 1, 1, 13, 0))
+        
+        # A fresh optimizer process has no in-memory access log of its own
+        cli_cache = HistoryCacheManager()
+        cli_cache.redis_client = redis_client
+        cli_cache.cache_available = True
+        cli_monitor = PerformanceMonitor(cache_manager=cli_cache)
+        self.assertEqual(len(cli_monitor.access_log), 0)
+        self.assertEqual(
+            cli_monitor.get_top_accessed(datetime(2024, 1, 1, 8), datetime(2024, 1, 1, 12)),
+            ["hot", "warm"]
+        )
+        
+        # Mock storage and cache responses
+        self.cache_warmer.performance_monitor = cli_monitor
+        self.cache_warmer.storage.get_analyses_by_ids.return_value = [Mock(), Mock()]
+        self.cache_warmer.cache_manager.cache_records.return_value = 2
+        
+        results = self.cache_warmer.window_aware_warming(datetime(2024, 1, 2, 9, 30))
+        
+        # Verify the window strategy was used instead of full warming
+        self.assertEqual(results['strategy'], 'window')
+        self.cache_warmer.storage.get_analyses_by_ids.assert_called_once_with(["hot", "warm"])
+    
+    def test_window_aware_warming_falls_back_to_full(self):
+        """Test full warming is used without access history"""
+        self.cache_warmer.performance_monitor = PerformanceMonitor()
+        
+        with patch.object(self.cache_warmer, 'full_cache_warming', return_value={}) as full_warming:
+            results = self.cache_warmer.window_aware_warming(datetime(2024, 1, 2, 9, 30))
+        
+        # Verify fallback
+        full_warming.assert_called_once()
+        self.assertEqual(results['strategy'], 'full')
+    
     def test_get_warming_stats(self):
         """Test getting warming statistics"""
         stats = self.cache_warmer.get_warming_stats()
@@ -15,7 +15,7 @@ import os
 # Add the project root to the path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from web.utils.report_exporter import ReportExporter
+from web.utils.report_exporter import ReportExporter, ExtractedReport
 from web.models.history_models import AnalysisHistoryRecord
 
 
@@ -146,6 +146,33 @@ class TestReportExporterHistorical(unittest.TestCase):
         self.assertEqual(metadata['analysts'], ['market', 'fundamentals', 'news'])
         self.assertEqual(metadata['research_depth'], 3)
     
+    def test_extracted_report_attribute_access(self):
+        """Test that extraction returns an immutable ExtractedReport"""
+        
+        extracted = self.exporter._extract_historical_data(self.historical_results)
+        
+        self.assertIsInstance(extracted, ExtractedReport)
+        self.assertEqual(extracted.stock_symbol, 'AAPL')
+        self.assertEqual(extracted.metadata['llm_provider'], 'dashscope')
+        self.assertIs(extracted.state, self.historical_results['formatted_results']['state'])
+        with self.assertRaises(AttributeError):
+            extracted.stock_symbol = 'MSFT'
+    
+    def test_export_report_batch_markdown(self):
+        """Test batch export keeps input order and isolates invalid items"""
+        
+        outputs = self.exporter.export_report_batch(
+            [self.historical_results, None, self.current_results], 'markdown'
+        )
+        
+        self.assertEqual(len(outputs), 3)
+        self.assertIn('历史分析报告', outputs[0].decode('utf-8'))
+        self.assertIsNone(outputs[1])
+        self.assertIn('正式分析', outputs[2].decode('utf-8'))
+        
+        with self.assertRaises(ValueError):
+            self.exporter.export_report_batch([self.current_results], 'html')
+    
     def test_generate_markdown_report_current_format(self):
         """Test Markdown generation with current analysis results"""
         
@@ -5,7 +5,7 @@ DeepSeek V3 LLM适配器
 
 import os
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 from langchain_openai import ChatOpenAI
 from langchain.agents import create_openai_functions_agent, AgentExecutor
 from langchain.schema import BaseMessage
@@ -33,7 +33,8 @@ class DeepSeekAdapter:
         model: str = "deepseek-chat",
         temperature: float = 0.1,
         max_tokens: int = 2000,
-        base_url: Optional[str] = None
+        base_url: Optional[str] = None,
+        http_async_client: Optional[Any] = None
     ):
         """
         初始化DeepSeek V3适配器
@@ -44,12 +45,14 @@ class DeepSeekAdapter:
             temperature: 温度参数
             max_tokens: 最大token数
             base_url: API基础URL
+            http_async_client: 共享的httpx.AsyncClient，多个适配器复用同一连接池
         """
         self.api_key = api_key or os.getenv("DEEPSEEK_API_KEY")
         self.model_name = model
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.base_url = base_url or os.getenv("DEEPSEEK_BASE_URL", self.BASE_URL)
+        self.http_async_client = http_async_client
         
         if not self.api_key:
             raise ValueError("需要提供DEEPSEEK_API_KEY")
@@ -64,6 +67,11 @@ class DeepSeekAdapter:
     
     def _init_llm(self):
         """初始化LangChain LLM"""
+        # 仅在提供了共享客户端时传入，保持对旧版本的兼容
+        client_kwargs = {}
+        if self.http_async_client is not None:
+            client_kwargs["http_async_client"] = self.http_async_client
+        
         try:
             # 使用最新的LangChain OpenAI接口
             self.llm = ChatOpenAI(
@@ -72,7 +80,8 @@ class DeepSeekAdapter:
                 base_url=self.base_url,  # 新版本使用base_url而不是openai_api_base
                 temperature=self.temperature,
                 max_tokens=self.max_tokens,
-                streaming=False
+                streaming=False,
+                **client_kwargs
             )
             logger.info("LangChain ChatOpenAI (DeepSeek)初始化成功")
         except Exception as e:
@@ -84,7 +93,8 @@ class DeepSeekAdapter:
                     openai_api_base=self.base_url,
                     temperature=self.temperature,
                     max_tokens=self.max_tokens,
-                    streaming=False
+                    streaming=False,
+                    **client_kwargs
                 )
                 logger.info("LangChain ChatOpenAI (DeepSeek)初始化成功 - 使用兼容模式")
             except Exception as e2:
@@ -164,6 +174,51 @@ class DeepSeekAdapter:
         except Exception as e:
             logger.error(f"聊天调用失败: {e}")
             raise
+
+    async def achat(
+        self, 
+        messages: List[BaseMessage], 
+        **kwargs
+    ) -> str:
+        """
+        异步聊天接口，便于多个请求并发执行
+        
+        Args:
+            messages: 消息列表
+            **kwargs: 其他参数
+            
+        Returns:
+            str: 模型回复
+        """
+        try:
+            response = await self.llm.ainvoke(messages, **kwargs)
+            return response.content
+        except Exception as e:
+            logger.error(f"异步聊天调用失败: {e}")
+            raise
+
+    async def astream_chat(
+        self, 
+        messages: List[BaseMessage], 
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        异步流式聊天接口，逐段返回模型输出
+        
+        Args:
+            messages: 消息列表
+            **kwargs: 其他参数
+            
+        Yields:
+            str: 模型回复片段
+        """
+        try:
+            async for chunk in self.llm.astream(messages, **kwargs):
+                if chunk.content:
+                    yield chunk.content
+        except Exception as e:
+            logger.error(f"流式聊天调用失败: {e}")
+            raise
     
     def get_model_info(self) -> Dict[str, Any]:
         """获取模型信息"""
@@ -175,7 +230,7 @@ class DeepSeekAdapter:
             "max_tokens": self.max_tokens,
             "base_url": self.base_url,
             "supports_tools": True,
-            "supports_streaming": False,
+            "supports_streaming": True,
             "context_length": "128K" if "chat" in self.model else "64K"
         }
     
@@ -207,6 +262,7 @@ class DeepSeekAdapter:
 def create_deepseek_adapter(
     model: str = "deepseek-chat",
     temperature: float = 0.1,
+    http_client: Optional[Any] = None,
     **kwargs
 ) -> DeepSeekAdapter:
     """
@@ -215,6 +271,7 @@ def create_deepseek_adapter(
     Args:
         model: 模型名称
         temperature: 温度参数
+        http_client: 共享的httpx.AsyncClient（可选），用于复用连接
         **kwargs: 其他参数
         
     Returns:
@@ -223,6 +280,7 @@ def create_deepseek_adapter(
     return DeepSeekAdapter(
         model=model,
         temperature=temperature,
+        http_async_client=http_client,
         **kwargs
     )
 
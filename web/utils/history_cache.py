@@ -21,6 +21,9 @@ from web.models.history_models import AnalysisHistoryRecord
 # Setup logging
 logger = logging.getLogger(__name__)
 
+# Record (de)serialization (orjson when installed)
+from web.utils.history_json import dumps as _dumps, loads as _loads
+
 
 class HistoryCacheManager:
     """
@@ -36,17 +39,23 @@ class HistoryCacheManager:
     QUERY_PREFIX = f"{CACHE_PREFIX}query:"
     STATS_PREFIX = f"{CACHE_PREFIX}stats:"
     METADATA_PREFIX = f"{CACHE_PREFIX}meta:"
+    # Hourly sorted sets of record access counts: history:access:<date>:<hour>
+    ACCESS_PREFIX = f"{CACHE_PREFIX}access:"
     
     # Cache expiration times (in seconds)
     RECORD_TTL = 3600  # 1 hour for individual records
     QUERY_TTL = 300    # 5 minutes for query results
     STATS_TTL = 600    # 10 minutes for statistics
     METADATA_TTL = 1800  # 30 minutes for metadata
+    ACCESS_TTL = 2 * 24 * 3600  # 2 days, so yesterday's windows stay readable
     
     # Cache size limits
     MAX_QUERY_CACHE_SIZE = 1000
     MAX_RECORD_CACHE_SIZE = 5000
     
+    # Writes per pipeline flush when caching records in bulk
+    WRITE_BATCH_SIZE = 500
+    
     def __init__(self):
         """Initialize the cache manager"""
         self.db_manager = get_database_manager()
@@ -105,26 +114,25 @@ class HistoryCacheManager:
         
         return self._generate_cache_key(self.QUERY_PREFIX, query_hash)
     
-    def _serialize_record(self, record: AnalysisHistoryRecord) -> str:
+    def _serialize_record(self, record: AnalysisHistoryRecord) -> Union[str, bytes]:
         """Serialize a record for caching"""
         try:
-            record_dict = record.to_dict()
-            return json.dumps(record_dict, default=str)
+            return _dumps(record.to_dict())
         except Exception as e:
             logger.error(f"Failed to serialize record {record.analysis_id}: {e}")
             return None
     
-    def _deserialize_record(self, data: str) -> Optional[AnalysisHistoryRecord]:
+    def _deserialize_record(self, data: Union[str, bytes]) -> Optional[AnalysisHistoryRecord]:
         """Deserialize a record from cache"""
         try:
-            record_dict = json.loads(data)
+            record_dict = _loads(data)
             return AnalysisHistoryRecord.from_dict(record_dict)
         except Exception as e:
             logger.error(f"Failed to deserialize cached record: {e}")
             return None
     
     def _serialize_query_result(self, records: List[AnalysisHistoryRecord], 
-                               total_count: int) -> str:
+                               total_count: int) -> Union[str, bytes]:
         """Serialize query results for caching"""
         try:
             result_data = {
@@ -132,15 +140,15 @@ class HistoryCacheManager:
                 'total_count': total_count,
                 'cached_at': datetime.now().isoformat()
             }
-            return json.dumps(result_data, default=str)
+            return _dumps(result_data)
         except Exception as e:
             logger.error(f"Failed to serialize query result: {e}")
             return None
     
-    def _deserialize_query_result(self, data: str) -> Optional[Tuple[List[AnalysisHistoryRecord], int]]:
+    def _deserialize_query_result(self, data: Union[str, bytes]) -> Optional[Tuple[List[AnalysisHistoryRecord], int]]:
         """Deserialize query results from cache"""
         try:
-            result_data = json.loads(data)
+            result_data = _loads(data)
             records = [AnalysisHistoryRecord.from_dict(record_dict) 
                       for record_dict in result_data['records']]
             total_count = result_data['total_count']
@@ -177,12 +185,56 @@ class HistoryCacheManager:
         
         return False
     
-    def get_cached_record(self, analysis_id: str) -> Optional[AnalysisHistoryRecord]:
+    def cache_records(self, records: List[AnalysisHistoryRecord], batch_size: int = None) -> int:
+        """
+        Cache many analysis records, flushing writes in pipelined batches
+        
+        Args:
+            records: The records to cache
+            batch_size: Writes per pipeline round trip (None for WRITE_BATCH_SIZE)
+            
+        Returns:
+            int: Number of records successfully cached
+        """
+        if not self.is_available() or not records:
+            return 0
+        
+        batch_size = batch_size or self.WRITE_BATCH_SIZE
+        
+        # Serialize up front so each flush is pure network submission
+        entries = []
+        for record in records:
+            serialized_data = self._serialize_record(record)
+            if serialized_data:
+                entries.append((
+                    self._generate_cache_key(self.RECORD_PREFIX, record.analysis_id),
+                    serialized_data
+                ))
+        
+        cached_count = 0
+        for start in range(0, len(entries), batch_size):
+            batch = entries[start:start + batch_size]
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for cache_key, serialized_data in batch:
+                    pipe.setex(cache_key, self.RECORD_TTL, serialized_data)
+                cached_count += sum(1 for result in pipe.execute() if result)
+            except Exception as e:
+                logger.error(f"Failed to cache batch of {len(batch)} records: {e}")
+                self.cache_errors += 1
+        
+        logger.debug(f"Cached {cached_count} records in batches of {batch_size}")
+        return cached_count
+    
+    def get_cached_record(self, analysis_id: str,
+                          access_time: Optional[datetime] = None) -> Optional[AnalysisHistoryRecord]:
         """
         Retrieve a cached analysis record
         
         Args:
             analysis_id: The analysis ID to retrieve
+            access_time: If given, also count the access in its hourly bucket
+                (see increment_access) in the same round trip as the lookup
             
         Returns:
             AnalysisHistoryRecord if found in cache, None otherwise
@@ -192,7 +244,15 @@ class HistoryCacheManager:
         
         try:
             cache_key = self._generate_cache_key(self.RECORD_PREFIX, analysis_id)
-            cached_data = self.redis_client.get(cache_key)
+            if access_time is None:
+                cached_data = self.redis_client.get(cache_key)
+            else:
+                access_key = self._access_key(access_time)
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.get(cache_key)
+                pipe.zincrby(access_key, 1, analysis_id)
+                pipe.expire(access_key, self.ACCESS_TTL)
+                cached_data = pipe.execute()[0]
             
             if cached_data:
                 record = self._deserialize_record(cached_data.decode('utf-8'))
@@ -210,6 +270,107 @@ class HistoryCacheManager:
         
         return None
     
+    def get_cached_records(self, analysis_ids: List[str]) -> Dict[str, AnalysisHistoryRecord]:
+        """
+        Retrieve several cached analysis records with a single MGET
+        
+        Args:
+            analysis_ids: The analysis IDs to retrieve
+            
+        Returns:
+            Dictionary mapping analysis ID to record for the IDs found in cache
+        """
+        if not self.is_available() or not analysis_ids:
+            return {}
+        
+        records = {}
+        try:
+            cache_keys = [self._generate_cache_key(self.RECORD_PREFIX, analysis_id)
+                          for analysis_id in analysis_ids]
+            for analysis_id, cached_data in zip(analysis_ids, self.redis_client.mget(cache_keys)):
+                record = self._deserialize_record(cached_data) if cached_data else None
+                if record:
+                    records[analysis_id] = record
+            
+            self.cache_hits += len(records)
+            self.cache_misses += len(analysis_ids) - len(records)
+            logger.debug(f"Cache hit for {len(records)}/{len(analysis_ids)} records")
+            
+        except Exception as e:
+            logger.error(f"Failed to retrieve cached records: {e}")
+            self.cache_errors += 1
+        
+        return records
+    
+    def _access_key(self, timestamp: datetime) -> str:
+        """Get the hourly access counter key for a timestamp"""
+        return self._generate_cache_key(self.ACCESS_PREFIX, timestamp.strftime('%Y-%m-%d:%H'))
+    
+    def increment_access(self, analysis_id: str, timestamp: datetime) -> bool:
+        """
+        Count an access to a record in its hourly bucket
+        
+        Counts live in Redis so every process (web server, optimizer CLI,
+        warmers) shares them and they survive restarts.
+        
+        Args:
+            analysis_id: The accessed analysis ID
+            timestamp: Access time
+            
+        Returns:
+            True if the access was counted
+        """
+        if not self.is_available():
+            return False
+        
+        try:
+            access_key = self._access_key(timestamp)
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.zincrby(access_key, 1, analysis_id)
+            pipe.expire(access_key, self.ACCESS_TTL)
+            pipe.execute()
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to count access to record {analysis_id}: {e}")
+            self.cache_errors += 1
+            return False
+    
+    def get_access_counts(self, start: datetime, end: datetime) -> Optional[Dict[str, float]]:
+        """
+        Sum the hourly access counts of every bucket overlapping a time range
+        
+        Args:
+            start: Range start; its whole hour is included
+            end: Range end (exclusive)
+            
+        Returns:
+            Dictionary mapping analysis ID to access count, or None if the
+            counts could not be read
+        """
+        if not self.is_available():
+            return None
+        
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            bucket = start.replace(minute=0, second=0, microsecond=0)
+            while bucket < end:
+                pipe.zrange(self._access_key(bucket), 0, -1, withscores=True)
+                bucket += timedelta(hours=1)
+            
+            counts: Dict[str, float] = {}
+            for bucket_counts in pipe.execute():
+                for analysis_id, count in bucket_counts:
+                    if isinstance(analysis_id, bytes):
+                        analysis_id = analysis_id.decode('utf-8')
+                    counts[analysis_id] = counts.get(analysis_id, 0) + count
+            return counts
+            
+        except Exception as e:
+            logger.error(f"Failed to read access counts: {e}")
+            self.cache_errors += 1
+            return None
+    
     def cache_query_result(self, filters: Dict[str, Any], page: int, page_size: int,
                           sort_by: str, sort_order: int, records: List[AnalysisHistoryRecord],
                           total_count: int) -> bool:
@@ -312,6 +473,32 @@ class HistoryCacheManager:
         
         return False
     
+    def invalidate_records(self, analysis_ids: List[str]) -> int:
+        """
+        Invalidate several cached records with a single DEL
+        
+        Args:
+            analysis_ids: The analysis IDs to invalidate
+            
+        Returns:
+            int: Number of cache entries removed
+        """
+        if not self.is_available() or not analysis_ids:
+            return 0
+        
+        try:
+            cache_keys = [self._generate_cache_key(self.RECORD_PREFIX, analysis_id)
+                          for analysis_id in analysis_ids]
+            deleted = self.redis_client.delete(*cache_keys)
+            logger.debug(f"Invalidated {deleted} cached records")
+            return deleted
+            
+        except Exception as e:
+            logger.error(f"Failed to invalidate cached records: {e}")
+            self.cache_errors += 1
+        
+        return 0
+    
     def invalidate_query_cache(self) -> int:
         """
         Invalidate all cached query results
@@ -410,11 +597,7 @@ class HistoryCacheManager:
         if not self.is_available():
             return 0
         
-        cached_count = 0
-        
-        for record in recent_records:
-            if self.cache_record(record):
-                cached_count += 1
+        cached_count = self.cache_records(recent_records)
         
         logger.info(f"Cache warmed with {cached_count} records")
         return cached_count
@@ -10,7 +10,7 @@ import logging
 import time
 import threading
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from web.utils.history_storage import get_history_storage
@@ -38,12 +38,17 @@ class CacheWarmer:
         # Warming configuration
         self.config = {
             'recent_records_limit': 100,
+            'write_batch_size': 500,
             'popular_queries_limit': 20,
             'max_concurrent_threads': 5,
             'warm_on_startup': True,
             'periodic_warming_interval': 3600,  # 1 hour
             'warm_popular_stocks': True,
-            'warm_recent_dates': True
+            'warm_recent_dates': True,
+            # Day split into [start_hour, end_hour) windows; each run warms the
+            # records most accessed in the current window on the previous day
+            'warming_windows': [(0, 4), (4, 8), (8, 12), (12, 16), (16, 20), (20, 24)],
+            'window_top_k': 100
         }
         
         # Track warming statistics
@@ -63,12 +68,13 @@ class CacheWarmer:
             {'filters': {'market_type': '美股'}, 'page': 1, 'page_size': 20},  # US stocks only
         ]
     
-    def warm_recent_records(self, limit: int = None) -> int:
+    def warm_recent_records(self, limit: int = None, batch_size: int = None) -> int:
         """
         Warm cache with recent analysis records
         
         Args:
             limit: Number of recent records to warm (None for config default)
+            batch_size: Cache writes per pipeline flush (None for config default)
             
         Returns:
             Number of records warmed
@@ -92,11 +98,13 @@ class CacheWarmer:
                 sort_order=-1
             )
             
-            # Warm cache with these records
+            # Warm cache with these records in pipelined batches
             warmed_count = 0
-            for record in recent_records:
-                if self.cache_manager.cache_record(record):
-                    warmed_count += 1
+            if recent_records:
+                warmed_count = self.cache_manager.cache_records(
+                    recent_records,
+                    batch_size=batch_size or self.config['write_batch_size']
+                )
             
             duration = time.time() - start_time
             logger.info(f"Warmed {warmed_count} recent records in {duration:.2f}s")
@@ -283,10 +291,13 @@ class CacheWarmer:
         
         return False
     
-    def full_cache_warming(self) -> Dict[str, Any]:
+    def full_cache_warming(self, batch_size: int = None) -> Dict[str, Any]:
         """
         Perform comprehensive cache warming
         
+        Args:
+            batch_size: Cache writes per pipeline flush (None for config default)
+        
         Returns:
             Dictionary containing warming results
         """
@@ -305,7 +316,7 @@ class CacheWarmer:
         
         try:
             # Warm recent records
-            results['records_warmed'] = self.warm_recent_records()
+            results['records_warmed'] = self.warm_recent_records(batch_size=batch_size)
             
             # Warm popular queries
             results['queries_warmed'] = self.warm_popular_queries()
@@ -340,6 +351,81 @@ class CacheWarmer:
         
         return results
     
+    def _get_warming_window(self, now: datetime) -> Optional[Tuple[int, int]]:
+        """Get the configured warming window containing the given time"""
+        for start_hour, end_hour in self.config['warming_windows']:
+            if start_hour <= now.hour < end_hour:
+                return start_hour, end_hour
+        return None
+    
+    def window_aware_warming(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Warm the records most accessed during the current time window on the
+        previous day, falling back to full warming without access history
+        
+        Args:
+            now: Reference time (None for now)
+            
+        Returns:
+            Dictionary containing warming results
+        """
+        now = now or datetime.now()
+        window = self._get_warming_window(now)
+        
+        analysis_ids = []
+        if window:
+            day_start = now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+            analysis_ids = self.performance_monitor.get_top_accessed(
+                day_start + timedelta(hours=window[0]),
+                day_start + timedelta(hours=window[1]),
+                limit=self.config['window_top_k']
+            )
+        
+        if not analysis_ids:
+            logger.info("No access history for the current window, using full cache warming")
+            results = self.full_cache_warming()
+            results['strategy'] = 'full'
+            return results
+        
+        logger.info(f"Starting window-aware cache warming for {window[0]:02d}:00-{window[1]:02d}:00...")
+        start_time = time.time()
+        
+        results = {
+            'started_at': now.isoformat(),
+            'strategy': 'window',
+            'window': window,
+            'candidates': len(analysis_ids),
+            'records_warmed': 0,
+            'total_duration': 0.0,
+            'errors': 0
+        }
+        
+        try:
+            if self.cache_manager.is_available() and self.storage.is_available():
+                records = self.storage.get_analyses_by_ids(analysis_ids)
+                if records:
+                    results['records_warmed'] = self.cache_manager.cache_records(
+                        records, batch_size=self.config['write_batch_size']
+                    )
+            else:
+                logger.warning("Cache or storage not available for warming")
+        except Exception as e:
+            logger.error(f"Window-aware cache warming failed: {e}")
+            self.warming_stats['errors'] += 1
+            results['errors'] += 1
+        
+        results['total_duration'] = time.time() - start_time
+        self.warming_stats.update({
+            'last_warming': datetime.now(),
+            'records_warmed': results['records_warmed'],
+            'warming_duration': results['total_duration']
+        })
+        
+        logger.info(f"Window-aware cache warming completed in {results['total_duration']:.2f}s: "
+                   f"{results['records_warmed']}/{results['candidates']} records")
+        
+        return results
+    
     def start_periodic_warming(self) -> None:
         """
         Start periodic cache warming in background
@@ -353,7 +439,7 @@ class CacheWarmer:
                 try:
                     time.sleep(self.config['periodic_warming_interval'])
                     logger.info("Starting periodic cache warming...")
-                    self.full_cache_warming()
+                    self.window_aware_warming()
                     
                 except Exception as e:
                     logger.error(f"Periodic warming failed: {e}")
@@ -5,25 +5,162 @@ This module provides comprehensive data management utilities for the analysis hi
 including automatic cleanup, storage monitoring, and backup functionality.
 """
 
+import io
 import logging
+import os
+import shutil
+import subprocess
 import time
-import json
 import gzip
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Tuple, Union
+from functools import lru_cache
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
 from pathlib import Path
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo import MongoClient, ASCENDING, DESCENDING, InsertOne, ReplaceOne, UpdateOne
 from pymongo.collection import Collection
 from pymongo.database import Database
-from pymongo.errors import PyMongoError, ConnectionFailure, ServerSelectionTimeoutError
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError, ConnectionFailure, ServerSelectionTimeoutError
 
 from tradingagents.config.database_manager import get_database_manager
 from web.models.history_models import AnalysisHistoryRecord, AnalysisStatus
 from web.utils.error_handler import with_retry, with_error_handling, log_operation_metrics
+from web.utils.history_stats_view import (
+    STATS_VIEW_COLLECTION_NAME, STATS_VIEW_MAX_AGE, is_stats_view_stale, refresh_stats_view,
+    summarize_stats_view
+)
+
+# Per-record export/import (de)serialization (orjson when installed)
+from web.utils.history_json import dumps as _dumps, loads as _loads
+
+# Stream JSON array imports when ijson is installed
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
+# collStats results are reused for this many seconds so that a monitor pass
+# (statistics followed by alert checks) issues the admin command only once
+COLL_STATS_TTL_SECONDS = 5
+
+# Write buffer for export files; NDJSON lines are small, so batching them
+# into 1 MiB chunks keeps per-write overhead out of the export loop
+EXPORT_BUFFER_SIZE = 1 << 20
+
+# Compressed exports estimated above this size are gzipped on all cores when
+# pigz is not installed, in independent blocks of PARALLEL_GZIP_BLOCK_SIZE
+PARALLEL_GZIP_THRESHOLD = 50 << 20
+PARALLEL_GZIP_BLOCK_SIZE = 4 << 20
+
+
+@lru_cache(maxsize=1)
+def _cached_coll_stats(database: Database, collection_name: str, time_bucket: int) -> Dict[str, Any]:
+    """Run collStats; ``time_bucket`` expires the cached result"""
+    return database.command("collStats", collection_name)
+
+
+class _ParallelGzipWriter:
+    """
+    Write-only file object that gzips fixed-size blocks on a thread pool
+    
+    Each block becomes a separate gzip member; concatenated members form a
+    valid gzip stream that ``gzip.open`` reads back transparently. zlib
+    releases the GIL while compressing, so threads spread the work across
+    cores without pickling blocks to worker processes. Output order is
+    preserved and at most two blocks per worker are in flight.
+    """
+    
+    def __init__(self, raw: BinaryIO, block_size: Optional[int] = None,
+                 workers: Optional[int] = None):
+        workers = workers or os.cpu_count() or 1
+        self._raw = raw
+        self._block_size = block_size or PARALLEL_GZIP_BLOCK_SIZE
+        self._buffer = bytearray()
+        self._pending = deque()
+        self._max_pending = workers * 2
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+    
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        if len(self._buffer) >= self._block_size:
+            self._submit_block()
+        return len(data)
+    
+    def _submit_block(self) -> None:
+        block = bytes(self._buffer)
+        self._buffer.clear()
+        self._pending.append(self._executor.submit(gzip.compress, block, 1))
+        while len(self._pending) > self._max_pending:
+            self._raw.write(self._pending.popleft().result())
+    
+    def finish(self) -> None:
+        """Compress the remaining data and write every pending member"""
+        if self._buffer:
+            self._submit_block()
+        while self._pending:
+            self._raw.write(self._pending.popleft().result())
+    
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+@contextmanager
+def _open_export_writer(output_path: Path, compress: bool, parallel: bool = False) -> Iterator[BinaryIO]:
+    """
+    Open a binary writer for an export file
+    
+    Compressed exports are piped through ``pigz`` when it is installed so
+    compression runs on all cores alongside the cursor. Without pigz, large
+    exports (``parallel``) are compressed block-wise on a thread pool and
+    the rest use gzip at level 1 so compression does not become the
+    bottleneck. Every writer buffers at least ``EXPORT_BUFFER_SIZE`` bytes
+    so the per-record lines reach the file, zlib or the pipe in large chunks.
+    """
+    if not compress:
+        with open(output_path, 'wb', buffering=EXPORT_BUFFER_SIZE) as f:
+            yield f
+        return
+    
+    pigz_path = shutil.which("pigz")
+    if pigz_path is None and parallel:
+        with open(output_path, 'wb', buffering=EXPORT_BUFFER_SIZE) as raw_out:
+            writer = _ParallelGzipWriter(raw_out)
+            try:
+                yield writer
+                writer.finish()
+            finally:
+                writer.shutdown()
+        return
+    
+    if pigz_path is None:
+        with gzip.open(output_path, 'wb', compresslevel=1) as gz_out:
+            with io.BufferedWriter(gz_out, buffer_size=EXPORT_BUFFER_SIZE) as f:
+                yield f
+        return
+    
+    with open(output_path, 'wb') as raw_out:
+        proc = subprocess.Popen(
+            [pigz_path, "-p", str(os.cpu_count() or 1), "-1"],
+            stdin=subprocess.PIPE,
+            stdout=raw_out,
+            bufsize=EXPORT_BUFFER_SIZE
+        )
+        try:
+            yield proc.stdin
+        finally:
+            if proc.stdin and not proc.stdin.closed:
+                proc.stdin.close()
+            returncode = proc.wait()
+    
+    if returncode != 0:
+        raise RuntimeError(f"pigz exited with status {returncode}")
+
 
 class HistoryDataManager:
     """
@@ -34,6 +171,8 @@ class HistoryDataManager:
     
     COLLECTION_NAME = "analysis_history"
     BACKUP_COLLECTION_NAME = "analysis_history_backup"
+    STATS_VIEW_COLLECTION_NAME = STATS_VIEW_COLLECTION_NAME
+    STATS_VIEW_MAX_AGE = STATS_VIEW_MAX_AGE
     
     def __init__(self):
         """Initialize the data manager"""
@@ -42,6 +181,12 @@ class HistoryDataManager:
         self.database: Optional[Database] = None
         self.collection: Optional[Collection] = None
         self.backup_collection: Optional[Collection] = None
+        self.stats_view_collection: Optional[Collection] = None
+        self._maintenance_indexes_ready = False
+        
+        # Runs collStats alongside the statistics breakdown; threads are only
+        # started on first use and reused across calls
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="history-data-manager")
         
         # Initialize database connection
         self._initialize_connection()
@@ -74,6 +219,7 @@ class HistoryDataManager:
             self.database = self.client[db_name]
             self.collection = self.database[self.COLLECTION_NAME]
             self.backup_collection = self.database[self.BACKUP_COLLECTION_NAME]
+            self.stats_view_collection = self.database[self.STATS_VIEW_COLLECTION_NAME]
             
             logger.info(f"Data manager connected to MongoDB database '{db_name}'")
             
@@ -83,6 +229,7 @@ class HistoryDataManager:
             self.database = None
             self.collection = None
             self.backup_collection = None
+            self.stats_view_collection = None
             raise
     
     def is_available(self) -> bool:
@@ -91,6 +238,59 @@ class HistoryDataManager:
     
     # Automatic Cleanup Operations
     
+    # Indexes the cleanup and monitoring queries rely on. Mirrors the
+    # definitions in AnalysisHistoryStorage._create_indexes so creating them
+    # here is a no-op when the storage service already did. Queries hint them
+    # by key pattern, which also matches the same keys under another name.
+    CREATED_AT_INDEX = [('created_at', DESCENDING)]
+    STATUS_DATE_INDEX = [('status', ASCENDING), ('created_at', DESCENDING)]
+    MAINTENANCE_INDEXES = (
+        (CREATED_AT_INDEX, 'idx_created_at_desc'),
+        (STATUS_DATE_INDEX, 'idx_status_date'),
+    )
+    
+    # Statuses of analyses that never produced a usable result
+    FAILED_STATUSES = ("failed", "error", "incomplete")
+    
+    def ensure_maintenance_indexes(self) -> None:
+        """
+        Make sure cleanup and monitoring filters are served by an index range scan
+        
+        Creation is retried on the next call until every index exists; a
+        read-only user or an index with the same keys under another name
+        leaves the hinted queries to fall back to unhinted ones.
+        """
+        if self._maintenance_indexes_ready:
+            return
+        
+        ready = True
+        for keys, name in self.MAINTENANCE_INDEXES:
+            try:
+                self.collection.create_index(keys, name=name, background=True)
+            except PyMongoError as e:
+                ready = False
+                logger.warning(f"Failed to ensure cleanup index {name}: {e}")
+        self._maintenance_indexes_ready = ready
+    
+    @staticmethod
+    def _run_hinted(operation, *args, hint: List[Tuple[str, int]], **kwargs):
+        """
+        Run a collection read with an index hint, retrying without the hint
+        if the server rejects it (e.g. the index does not exist)
+        
+        Args:
+            operation: Bound collection method, e.g. ``collection.count_documents``
+            hint: Index key pattern to hint
+            
+        Returns:
+            The result of the operation
+        """
+        try:
+            return operation(*args, hint=hint, **kwargs)
+        except OperationFailure as e:
+            logger.debug(f"Index hint {hint} rejected, retrying without it: {e}")
+            return operation(*args, **kwargs)
+    
     @with_error_handling(context="自动清理旧记录", show_user_error=False)
     @with_retry(max_attempts=2, delay=1.0, retry_on=(ConnectionFailure, ServerSelectionTimeoutError))
     def cleanup_old_records(self, 
@@ -119,8 +319,12 @@ class HistoryDataManager:
             # Find old records
             query = {"created_at": {"$lt": cutoff_date}}
             
-            # Count total records to be cleaned
-            total_count = self.collection.count_documents(query, maxTimeMS=10000)
+            # Count total records to be cleaned; the count, dry-run sample and
+            # deletes all run as created_at index range scans
+            self.ensure_maintenance_indexes()
+            total_count = self._run_hinted(
+                self.collection.count_documents, query, hint=self.CREATED_AT_INDEX, maxTimeMS=10000
+            )
             
             if total_count == 0:
                 logger.info(f"No records older than {max_age_days} days found")
@@ -135,11 +339,13 @@ class HistoryDataManager:
             logger.info(f"Found {total_count} records older than {max_age_days} days")
             
             if dry_run:
-                # Get sample records for analysis
-                sample_records = list(self.collection.find(
-                    query, 
-                    {"analysis_id": 1, "stock_symbol": 1, "created_at": 1, "status": 1}
-                ).limit(10))
+                # Random sample of the matching records for the preview;
+                # avoids walking the match set in index order
+                sample_records = list(self.collection.aggregate([
+                    {"$match": query},
+                    {"$sample": {"size": 10}},
+                    {"$project": {"analysis_id": 1, "stock_symbol": 1, "created_at": 1, "status": 1}}
+                ], maxTimeMS=10000))
                 
                 return {
                     "success": True,
@@ -150,39 +356,14 @@ class HistoryDataManager:
                     "sample_records": sample_records
                 }
             
-            # Perform cleanup in batches
-            deleted_count = 0
-            processed_batches = 0
-            
-            while True:
-                # Find a batch of old records
-                batch_records = list(self.collection.find(
-                    query,
-                    {"_id": 1, "analysis_id": 1}
-                ).limit(batch_size))
-                
-                if not batch_records:
-                    break
-                
-                # Extract IDs for batch deletion
-                record_ids = [record["_id"] for record in batch_records]
-                analysis_ids = [record["analysis_id"] for record in batch_records]
-                
-                # Delete the batch
-                delete_result = self.collection.delete_many({"_id": {"$in": record_ids}})
-                batch_deleted = delete_result.deleted_count
-                deleted_count += batch_deleted
-                processed_batches += 1
-                
-                logger.info(f"Batch {processed_batches}: Deleted {batch_deleted} records")
-                
-                # Log progress for large cleanups
-                if processed_batches % 10 == 0:
-                    logger.info(f"Cleanup progress: {deleted_count}/{total_count} records deleted")
-                
-                # Break if batch was smaller than expected (last batch)
-                if len(batch_records) < batch_size:
-                    break
+            if batch_size >= total_count:
+                # Everything fits in one batch: let the server delete the
+                # whole created_at range in a single pass
+                deleted_count = self.collection.delete_many(query).deleted_count
+                processed_batches = 1
+                logger.info(f"Deleted {deleted_count} records in a single pass")
+            else:
+                deleted_count, processed_batches = self._delete_in_batches(query, batch_size, total_count)
             
             duration = time.time() - start_time
             logger.info(f"Cleanup completed: Deleted {deleted_count} records in {duration:.2f}s")
@@ -226,6 +407,49 @@ class HistoryDataManager:
                 "duration": duration
             }
     
+    def _delete_in_batches(self,
+                           query: Dict[str, Any],
+                           batch_size: int,
+                           total_count: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Delete the records matching a query, at most batch_size per round-trip
+        
+        batch_size caps how much each delete holds up the collection.
+        
+        Args:
+            query: Filter for the records to delete
+            batch_size: Maximum number of records deleted per batch
+            total_count: Expected number of matches, used for progress logging
+            
+        Returns:
+            Tuple of (deleted record count, number of batches)
+        """
+        deleted_count = 0
+        processed_batches = 0
+        
+        while True:
+            record_ids = [
+                record["_id"]
+                for record in self.collection.find(query, {"_id": 1}).limit(batch_size)
+            ]
+            if not record_ids:
+                break
+            
+            batch_deleted = self.collection.delete_many({"_id": {"$in": record_ids}}).deleted_count
+            deleted_count += batch_deleted
+            processed_batches += 1
+            
+            logger.info(f"Batch {processed_batches}: Deleted {batch_deleted} records")
+            
+            # Log progress for large cleanups
+            if total_count is not None and processed_batches % 10 == 0:
+                logger.info(f"Cleanup progress: {deleted_count}/{total_count} records deleted")
+            
+            if batch_deleted == 0 or len(record_ids) < batch_size:
+                break
+        
+        return deleted_count, processed_batches
+    
     @with_error_handling(context="清理失败记录", show_user_error=False)
     def cleanup_failed_records(self, max_age_hours: int = 24, dry_run: bool = False) -> Dict[str, Any]:
         """
@@ -247,11 +471,14 @@ class HistoryDataManager:
         try:
             # Find failed records older than cutoff
             query = {
-                "status": {"$in": ["failed", "error", "incomplete"]},
+                "status": {"$in": list(self.FAILED_STATUSES)},
                 "created_at": {"$lt": cutoff_date}
             }
             
-            total_count = self.collection.count_documents(query, maxTimeMS=5000)
+            self.ensure_maintenance_indexes()
+            total_count = self._run_hinted(
+                self.collection.count_documents, query, hint=self.STATUS_DATE_INDEX, maxTimeMS=5000
+            )
             
             if total_count == 0:
                 logger.info(f"No failed records older than {max_age_hours} hours found")
@@ -274,7 +501,7 @@ class HistoryDataManager:
                     "dry_run": True
                 }
             
-            # Delete failed records
+            # Delete failed records with one range delete on idx_status_date
             delete_result = self.collection.delete_many(query)
             deleted_count = delete_result.deleted_count
             
@@ -297,94 +524,357 @@ class HistoryDataManager:
                 "duration": time.time() - start_time
             }
     
+    @with_error_handling(context="合并清理记录", show_user_error=False)
+    @with_retry(max_attempts=2, delay=1.0, retry_on=(ConnectionFailure, ServerSelectionTimeoutError))
+    def cleanup_records(self,
+                        max_age_days: int = 365,
+                        failed_record_age_hours: Optional[int] = None,
+                        batch_size: Optional[int] = None,
+                        dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Clean up old records and, optionally, stale failed records with one query
+        
+        Both retention rules are combined into a single ``$or`` filter so the
+        scheduler issues one delete instead of one per rule.
+        
+        Args:
+            max_age_days: Maximum age of records to keep
+            failed_record_age_hours: Maximum age of failed records to keep;
+                None leaves failed records to the max_age_days rule
+            batch_size: Delete at most this many records per round-trip;
+                None deletes the whole match set in a single delete_many
+            dry_run: If True, only count records without deleting
+            
+        Returns:
+            Dict with cleanup statistics
+        """
+        if not self.is_available():
+            logger.warning("Data manager not available, cannot cleanup records")
+            return {"success": False, "error": "Data manager not available"}
+        
+        start_time = time.time()
+        now = datetime.now()
+        clauses = [{"created_at": {"$lt": now - timedelta(days=max_age_days)}}]
+        if failed_record_age_hours is not None:
+            clauses.append({
+                "status": {"$in": list(self.FAILED_STATUSES)},
+                "created_at": {"$lt": now - timedelta(hours=failed_record_age_hours)}
+            })
+        query = clauses[0] if len(clauses) == 1 else {"$or": clauses}
+        
+        try:
+            # Each $or clause is planned separately against its own index
+            self.ensure_maintenance_indexes()
+            
+            if dry_run:
+                total_count = self.collection.count_documents(query, maxTimeMS=10000)
+                return {
+                    "success": True,
+                    "total_found": total_count,
+                    "deleted_count": 0,
+                    "duration": time.time() - start_time,
+                    "dry_run": True
+                }
+            
+            if batch_size is None:
+                deleted_count = self.collection.delete_many(query).deleted_count
+                processed_batches = 1
+            else:
+                deleted_count, processed_batches = self._delete_in_batches(query, batch_size)
+            
+            duration = time.time() - start_time
+            logger.info(f"Cleanup completed: Deleted {deleted_count} records in {duration:.2f}s")
+            
+            log_operation_metrics(
+                "cleanup_records",
+                duration,
+                True,
+                additional_metrics={
+                    "max_age_days": max_age_days,
+                    "failed_record_age_hours": failed_record_age_hours,
+                    "deleted_count": deleted_count,
+                    "processed_batches": processed_batches
+                }
+            )
+            
+            return {
+                "success": True,
+                "deleted_count": deleted_count,
+                "processed_batches": processed_batches,
+                "duration": duration,
+                "dry_run": False
+            }
+            
+        except Exception as e:
+            duration = time.time() - start_time
+            logger.error(f"Error during combined cleanup operation: {e}")
+            
+            log_operation_metrics(
+                "cleanup_records",
+                duration,
+                False,
+                error=e
+            )
+            
+            return {
+                "success": False,
+                "error": str(e),
+                "duration": duration
+            }
+    
     # Storage Usage Monitoring
     
-    @with_error_handling(context="获取存储统计", show_user_error=False)
-    def get_storage_statistics(self) -> Dict[str, Any]:
+    def refresh_statistics_view(self) -> Dict[str, Any]:
         """
-        Get comprehensive storage usage statistics
+        Rebuild the materialized statistics collection
+        
+        Groups the history by status, market type, LLM provider and creation
+        day and ``$merge``s the buckets into ``history_stats_mv``. Buckets that
+        no longer exist (e.g. after a cleanup) are removed afterwards.
         
         Returns:
-            Dict with storage statistics
+            Dict with refresh statistics
         """
-        if not self.is_available():
+        if not self.is_available() or self.stats_view_collection is None:
             return {"success": False, "error": "Data manager not available"}
         
         start_time = time.time()
         
         try:
-            # Basic collection statistics
-            stats = self.database.command("collStats", self.COLLECTION_NAME)
+            refresh = refresh_stats_view(self.collection, self.stats_view_collection)
+            duration = time.time() - start_time
             
-            # Count records by status
-            status_pipeline = [
-                {"$group": {"_id": "$status", "count": {"$sum": 1}}},
-                {"$sort": {"count": -1}}
-            ]
-            status_counts = list(self.collection.aggregate(status_pipeline, maxTimeMS=10000))
-            
-            # Count records by date (last 30 days)
-            thirty_days_ago = datetime.now() - timedelta(days=30)
-            date_pipeline = [
-                {"$match": {"created_at": {"$gte": thirty_days_ago}}},
-                {
-                    "$group": {
-                        "_id": {
-                            "$dateToString": {
-                                "format": "%Y-%m-%d",
-                                "date": "$created_at"
+            logger.info(f"Statistics view refreshed in {duration:.2f}s ({refresh['stale_buckets_removed']} stale buckets removed)")
+            
+            return {
+                "success": True,
+                "refreshed_at": refresh["refreshed_at"].isoformat(),
+                "stale_buckets_removed": refresh["stale_buckets_removed"],
+                "duration": duration
+            }
+            
+        except PyMongoError as e:
+            logger.warning(f"Failed to refresh statistics view: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "duration": time.time() - start_time
+            }
+    
+    def _read_statistics_view(self) -> Optional[Dict[str, Any]]:
+        """
+        Build the statistics breakdown from the materialized view
+        
+        The view is refreshed first when it is missing or older than
+        ``STATS_VIEW_MAX_AGE``. Returns None if it cannot be used, so the
+        caller can fall back to live aggregation.
+        """
+        if self.stats_view_collection is None:
+            return None
+        
+        if is_stats_view_stale(self.stats_view_collection, self.STATS_VIEW_MAX_AGE):
+            if not self.refresh_statistics_view()["success"]:
+                return None
+        
+        summary = summarize_stats_view(self.stats_view_collection)
+        status_counts = summary["status_counts"]
+        thirty_days_start = (datetime.now() - timedelta(days=30)).replace(hour=0, minute=0, second=0, microsecond=0)
+        daily_counts = {
+            day.strftime("%Y-%m-%d"): count
+            for day, count in sorted(summary["daily_counts"].items())
+            if day >= thirty_days_start
+        }
+        
+        performance_stats = {}
+        if status_counts:
+            execution_count = summary["execution_time_count"]
+            cost_count = summary["cost_count"]
+            performance_stats = {
+                "_id": None,
+                "avg_execution_time": summary["execution_time_sum"] / execution_count if execution_count else None,
+                "max_execution_time": summary["max_execution_time"],
+                "min_execution_time": summary["min_execution_time"],
+                "avg_cost": summary["cost_sum"] / cost_count if cost_count else None,
+                "total_cost": summary["cost_sum"]
+            }
+        
+        return {
+            "status_distribution": dict(sorted(status_counts.items(), key=lambda item: -item[1])),
+            "daily_counts_last_30_days": daily_counts,
+            "market_distribution": dict(sorted(summary["market_counts"].items(), key=lambda item: -item[1])),
+            "performance_stats": performance_stats
+        }
+    
+    def _compute_live_statistics(self) -> Dict[str, Any]:
+        """
+        Build the statistics breakdown by aggregating the history collection directly
+        
+        All breakdowns run as ``$facet`` sub-pipelines over a single scan, so
+        this costs one round trip instead of one per breakdown.
+        """
+        thirty_days_ago = datetime.now() - timedelta(days=30)
+        pipeline = [
+            {
+                "$facet": {
+                    # Count records by status
+                    "status": [
+                        {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+                        {"$sort": {"count": -1}}
+                    ],
+                    # Count records by date (last 30 days)
+                    "daily": [
+                        {"$match": {"created_at": {"$gte": thirty_days_ago}}},
+                        {
+                            "$group": {
+                                "_id": {
+                                    "$dateToString": {
+                                        "format": "%Y-%m-%d",
+                                        "date": "$created_at"
+                                    }
+                                },
+                                "count": {"$sum": 1}
                             }
                         },
-                        "count": {"$sum": 1}
-                    }
-                },
-                {"$sort": {"_id": 1}}
-            ]
-            daily_counts = list(self.collection.aggregate(date_pipeline, maxTimeMS=10000))
-            
-            # Count records by market type
-            market_pipeline = [
-                {"$group": {"_id": "$market_type", "count": {"$sum": 1}}},
-                {"$sort": {"count": -1}}
-            ]
-            market_counts = list(self.collection.aggregate(market_pipeline, maxTimeMS=5000))
-            
-            # Average execution time and cost analysis
-            performance_pipeline = [
-                {
-                    "$group": {
-                        "_id": None,
-                        "avg_execution_time": {"$avg": "$execution_time"},
-                        "max_execution_time": {"$max": "$execution_time"},
-                        "min_execution_time": {"$min": "$execution_time"},
-                        "avg_cost": {"$avg": "$token_usage.total_cost"},
-                        "total_cost": {"$sum": "$token_usage.total_cost"}
-                    }
+                        {"$sort": {"_id": 1}}
+                    ],
+                    # Count records by market type
+                    "market": [
+                        {"$group": {"_id": "$market_type", "count": {"$sum": 1}}},
+                        {"$sort": {"count": -1}}
+                    ],
+                    # Average execution time and cost analysis
+                    "performance": [
+                        {
+                            "$group": {
+                                "_id": None,
+                                "avg_execution_time": {"$avg": "$execution_time"},
+                                "max_execution_time": {"$max": "$execution_time"},
+                                "min_execution_time": {"$min": "$execution_time"},
+                                "avg_cost": {"$avg": "$token_usage.total_cost"},
+                                "total_cost": {"$sum": "$token_usage.total_cost"}
+                            }
+                        }
+                    ]
                 }
-            ]
-            performance_stats = list(self.collection.aggregate(performance_pipeline, maxTimeMS=5000))
-            
-            # Storage size breakdown
-            storage_info = {
-                "total_documents": stats.get("count", 0),
-                "total_size_bytes": stats.get("size", 0),
-                "total_size_mb": round(stats.get("size", 0) / 1024 / 1024, 2),
-                "average_document_size_bytes": stats.get("avgObjSize", 0),
-                "storage_size_bytes": stats.get("storageSize", 0),
-                "storage_size_mb": round(stats.get("storageSize", 0) / 1024 / 1024, 2),
-                "index_size_bytes": stats.get("totalIndexSize", 0),
-                "index_size_mb": round(stats.get("totalIndexSize", 0) / 1024 / 1024, 2)
             }
+        ]
+        facets = next(iter(self.collection.aggregate(pipeline, maxTimeMS=15000)), {})
+        performance_stats = facets.get("performance", [])
+        
+        return {
+            "status_distribution": {item["_id"]: item["count"] for item in facets.get("status", [])},
+            "daily_counts_last_30_days": {item["_id"]: item["count"] for item in facets.get("daily", [])},
+            "market_distribution": {item["_id"]: item["count"] for item in facets.get("market", [])},
+            "performance_stats": performance_stats[0] if performance_stats else {}
+        }
+    
+    def _get_coll_stats(self) -> Dict[str, Any]:
+        """Get collStats for the history collection, shared for COLL_STATS_TTL_SECONDS"""
+        return _cached_coll_stats(
+            self.database,
+            self.COLLECTION_NAME,
+            int(time.monotonic() // COLL_STATS_TTL_SECONDS)
+        )
+    
+    @staticmethod
+    def _build_storage_info(stats: Dict[str, Any]) -> Dict[str, Any]:
+        """Storage size breakdown from a collStats result"""
+        return {
+            "total_documents": stats.get("count", 0),
+            "total_size_bytes": stats.get("size", 0),
+            "total_size_mb": round(stats.get("size", 0) / 1024 / 1024, 2),
+            "average_document_size_bytes": stats.get("avgObjSize", 0),
+            "storage_size_bytes": stats.get("storageSize", 0),
+            "storage_size_mb": round(stats.get("storageSize", 0) / 1024 / 1024, 2),
+            "index_size_bytes": stats.get("totalIndexSize", 0),
+            "index_size_mb": round(stats.get("totalIndexSize", 0) / 1024 / 1024, 2)
+        }
+    
+    def get_daily_counts(self, days: int = 30) -> Dict[str, int]:
+        """
+        Count records created per day over the last ``days`` days
+        
+        The leading ``$match`` on ``created_at`` is hinted to the
+        ``created_at`` index so only the recent index range is read.
+        
+        Args:
+            days: Number of days to look back
+            
+        Returns:
+            Dict mapping ``YYYY-MM-DD`` to the number of records
+        """
+        self.ensure_maintenance_indexes()
+        
+        since = datetime.now() - timedelta(days=days)
+        pipeline = [
+            {"$match": {"created_at": {"$gte": since}}},
+            {
+                "$group": {
+                    "_id": {
+                        "$dateToString": {
+                            "format": "%Y-%m-%d",
+                            "date": "$created_at"
+                        }
+                    },
+                    "count": {"$sum": 1}
+                }
+            },
+            {"$sort": {"_id": 1}}
+        ]
+        daily_counts = self._run_hinted(
+            self.collection.aggregate, pipeline, hint=self.CREATED_AT_INDEX, maxTimeMS=10000
+        )
+        return {item["_id"]: item["count"] for item in daily_counts}
+    
+    def _get_statistics_breakdown(self, use_materialized: bool) -> Tuple[Dict[str, Any], str]:
+        """Get the statistics breakdown and the name of the source it came from"""
+        if use_materialized:
+            try:
+                breakdown = self._read_statistics_view()
+                if breakdown is not None:
+                    return breakdown, "materialized"
+            except PyMongoError as e:
+                logger.warning(f"Statistics view unavailable, falling back to live aggregation: {e}")
+        
+        return self._compute_live_statistics(), "live"
+    
+    @with_error_handling(context="获取存储统计", show_user_error=False)
+    def get_storage_statistics(self, use_materialized: bool = True) -> Dict[str, Any]:
+        """
+        Get comprehensive storage usage statistics
+        
+        The status, market, daily and performance breakdowns are read from
+        the materialized ``history_stats_mv`` collection when possible, so
+        the cost no longer grows with the history size. Live aggregation is
+        used as a fallback.
+        
+        Args:
+            use_materialized: Read breakdowns from the materialized view
+        
+        Returns:
+            Dict with storage statistics
+        """
+        if not self.is_available():
+            return {"success": False, "error": "Data manager not available"}
+        
+        start_time = time.time()
+        
+        try:
+            # collStats and the breakdown are independent round trips, so
+            # run collStats in the background while the breakdown is read
+            coll_stats_future = self._executor.submit(self._get_coll_stats)
+            breakdown, source = self._get_statistics_breakdown(use_materialized)
+            stats = coll_stats_future.result()
+            
+            storage_info = self._build_storage_info(stats)
             
             duration = time.time() - start_time
             
             return {
                 "success": True,
                 "storage_info": storage_info,
-                "status_distribution": {item["_id"]: item["count"] for item in status_counts},
-                "daily_counts_last_30_days": {item["_id"]: item["count"] for item in daily_counts},
-                "market_distribution": {item["_id"]: item["count"] for item in market_counts},
-                "performance_stats": performance_stats[0] if performance_stats else {},
+                **breakdown,
+                "source": source,
                 "query_duration": duration,
                 "timestamp": datetime.now().isoformat()
             }
@@ -400,7 +890,8 @@ class HistoryDataManager:
     def check_storage_alerts(self, 
                            max_size_mb: int = 1000,
                            max_documents: int = 100000,
-                           max_daily_growth: int = 1000) -> Dict[str, Any]:
+                           max_daily_growth: int = 1000,
+                           stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Check for storage usage alerts and warnings
         
@@ -408,20 +899,32 @@ class HistoryDataManager:
             max_size_mb: Maximum storage size in MB before alert
             max_documents: Maximum number of documents before alert
             max_daily_growth: Maximum daily document growth before alert
+            stats: Result of get_storage_statistics() to reuse, if the caller
+                already has one
             
         Returns:
             Dict with alert information
         """
-        stats = self.get_storage_statistics()
-        
-        if not stats["success"]:
+        if stats is None:
+            # The checks only need collection sizes and recent daily counts,
+            # both far cheaper than the full statistics
+            if not self.is_available():
+                return {"success": False, "error": "Data manager not available"}
+            try:
+                storage_info = self._build_storage_info(self._get_coll_stats())
+                daily_counts = self.get_daily_counts()
+            except PyMongoError as e:
+                logger.error(f"Error checking storage alerts: {e}")
+                return {"success": False, "error": str(e)}
+        elif not stats["success"]:
             return stats
+        else:
+            storage_info = stats["storage_info"]
+            daily_counts = stats["daily_counts_last_30_days"]
         
         alerts = []
         warnings = []
         
-        storage_info = stats["storage_info"]
-        
         # Check total size
         if storage_info["total_size_mb"] > max_size_mb:
             alerts.append({
@@ -455,7 +958,6 @@ class HistoryDataManager:
             })
         
         # Check daily growth (if we have recent data)
-        daily_counts = stats["daily_counts_last_30_days"]
         if daily_counts:
             recent_days = sorted(daily_counts.keys())[-7:]  # Last 7 days
             if len(recent_days) >= 2:
@@ -487,8 +989,156 @@ class HistoryDataManager:
             "timestamp": datetime.now().isoformat()
         }
     
+    def watch_storage_alerts(self,
+                             interval: float = 60,
+                             max_size_mb: int = 1000,
+                             max_documents: int = 100000,
+                             max_daily_growth: int = 1000,
+                             resync_every: int = 10) -> Iterator[Dict[str, Any]]:
+        """
+        Continuously check storage alerts, yielding a report every ``interval`` seconds
+        
+        Daily counts are computed once and then kept current from a change
+        stream on inserts, so most checks only cost a cached ``collStats``
+        call. Delete events carry no ``created_at``, so a check that saw
+        deletes re-queries the daily counts; they are also re-queried every
+        ``resync_every`` checks to absorb anything the stream missed.
+        Without change stream support (standalone servers) the daily counts
+        are re-queried on every check instead.
+        
+        Args:
+            interval: Seconds between alert reports
+            max_size_mb: Maximum storage size in MB before alert
+            max_documents: Maximum number of documents before alert
+            max_daily_growth: Maximum daily document growth before alert
+            resync_every: Re-query the daily counts after this many checks
+            
+        Yields:
+            Dicts in the same shape as :meth:`check_storage_alerts`
+        """
+        if not self.is_available():
+            yield {"success": False, "error": "Data manager not available"}
+            return
+        
+        try:
+            stream = self.collection.watch(
+                [{"$match": {"operationType": {"$in": ["insert", "delete"]}}}],
+                max_await_time_ms=1000
+            )
+        except OperationFailure as e:
+            logger.warning(f"Change streams unavailable, polling daily counts every {interval}s: {e}")
+            stream = None
+        
+        # Counted after the stream is open so no insert is missed; one that
+        # lands in between may be counted twice until the next re-sync
+        daily_counts = self.get_daily_counts()
+        checks_since_resync = 0
+        
+        next_check = time.monotonic()
+        try:
+            while True:
+                if stream is None:
+                    time.sleep(max(0.0, next_check - time.monotonic()))
+                    daily_counts = self.get_daily_counts()
+                else:
+                    resync = checks_since_resync >= resync_every
+                    while time.monotonic() < next_check:
+                        change = stream.try_next()
+                        if change is None:
+                            continue
+                        if change.get("operationType") == "delete":
+                            # Only the _id of a deleted record is known
+                            resync = True
+                            continue
+                        created_at = change.get("fullDocument", {}).get("created_at")
+                        if isinstance(created_at, datetime):
+                            day = created_at.strftime("%Y-%m-%d")
+                            daily_counts[day] = daily_counts.get(day, 0) + 1
+                    
+                    if resync:
+                        daily_counts = self.get_daily_counts()
+                        checks_since_resync = 0
+                    else:
+                        # Drop days that fell out of the 30-day window
+                        oldest_day = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+                        daily_counts = {day: count for day, count in daily_counts.items() if day >= oldest_day}
+                    checks_since_resync += 1
+                
+                stats = {
+                    "success": True,
+                    "storage_info": self._build_storage_info(self._get_coll_stats()),
+                    "daily_counts_last_30_days": daily_counts
+                }
+                yield self.check_storage_alerts(
+                    max_size_mb=max_size_mb,
+                    max_documents=max_documents,
+                    max_daily_growth=max_daily_growth,
+                    stats=stats
+                )
+                next_check = time.monotonic() + interval
+        finally:
+            if stream is not None:
+                stream.close()
+    
     # Data Export/Import Functionality
     
+    EXPORT_DATE_FIELDS = ('created_at', 'updated_at', 'analysis_date')
+    EXPORT_INTERNAL_FIELDS = ('_id', '_retry_count', '_last_save_attempt')
+    
+    @staticmethod
+    def _build_export_query(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Translate export filters into a MongoDB query"""
+        query: Dict[str, Any] = {}
+        if filters:
+            if "date_from" in filters:
+                query.setdefault("created_at", {})["$gte"] = filters["date_from"]
+            if "date_to" in filters:
+                query.setdefault("created_at", {})["$lt"] = filters["date_to"]
+            if "status" in filters:
+                query["status"] = filters["status"]
+            if "market_type" in filters:
+                query["market_type"] = filters["market_type"]
+        return query
+    
+    def iter_export_lines(self, query: Dict[str, Any], batch_size: int = 1000) -> Iterator[bytes]:
+        """
+        Stream matching records as NDJSON lines
+        
+        Records are pulled from a server-side cursor one batch at a time, so
+        memory stays bounded by ``batch_size`` regardless of collection size.
+        
+        Args:
+            query: MongoDB query selecting the records to export
+            batch_size: Cursor batch size
+            
+        Yields:
+            One UTF-8 JSON-encoded record per line, including the trailing newline
+        """
+        cursor = self.collection.find(query, no_cursor_timeout=True).batch_size(batch_size)
+        try:
+            for doc in cursor:
+                # Remove MongoDB internal fields
+                for field in self.EXPORT_INTERNAL_FIELDS:
+                    doc.pop(field, None)
+                
+                # Convert datetime objects to ISO strings
+                for field in self.EXPORT_DATE_FIELDS:
+                    value = doc.get(field)
+                    if isinstance(value, datetime):
+                        doc[field] = value.isoformat()
+                
+                yield _dumps(doc, newline=True)
+        finally:
+            cursor.close()
+    
+    def _estimate_export_bytes(self, record_count: int) -> int:
+        """Rough uncompressed size of exporting ``record_count`` records"""
+        try:
+            return record_count * int(self._get_coll_stats().get("avgObjSize", 0))
+        except PyMongoError as e:
+            logger.warning(f"Could not estimate export size: {e}")
+            return 0
+    
     @with_error_handling(context="导出历史数据", show_user_error=False)
     def export_data(self, 
                    output_path: Union[str, Path],
@@ -496,7 +1146,10 @@ class HistoryDataManager:
                    compress: bool = True,
                    batch_size: int = 1000) -> Dict[str, Any]:
         """
-        Export analysis history data to JSON file
+        Export analysis history data to an NDJSON file
+        
+        The first line holds export metadata; each following line is one
+        record streamed from :meth:`iter_export_lines`.
         
         Args:
             output_path: Path to output file
@@ -517,18 +1170,7 @@ class HistoryDataManager:
             # Ensure output directory exists
             output_path.parent.mkdir(parents=True, exist_ok=True)
             
-            # Build query
-            query = {}
-            if filters:
-                # Apply basic filters
-                if "date_from" in filters:
-                    query.setdefault("created_at", {})["$gte"] = filters["date_from"]
-                if "date_to" in filters:
-                    query.setdefault("created_at", {})["$lt"] = filters["date_to"]
-                if "status" in filters:
-                    query["status"] = filters["status"]
-                if "market_type" in filters:
-                    query["market_type"] = filters["market_type"]
+            query = self._build_export_query(filters)
             
             # Count total records
             total_count = self.collection.count_documents(query, maxTimeMS=10000)
@@ -545,16 +1187,16 @@ class HistoryDataManager:
             
             logger.info(f"Exporting {total_count} records to {output_path}")
             
-            # Open output file
-            if compress and not output_path.suffix == '.gz':
+            if compress and output_path.suffix != '.gz':
                 output_path = output_path.with_suffix(output_path.suffix + '.gz')
-                file_opener = gzip.open
-            else:
-                file_opener = open
+            
+            # Large exports get block-parallel gzip when pigz is missing; size
+            # is estimated from the collection's average document size
+            parallel = compress and self._estimate_export_bytes(total_count) > PARALLEL_GZIP_THRESHOLD
             
             exported_count = 0
             
-            with file_opener(output_path, 'wt', encoding='utf-8') as f:
+            with _open_export_writer(output_path, compress, parallel=parallel) as f:
                 # Write export metadata
                 export_metadata = {
                     "export_timestamp": datetime.now().isoformat(),
@@ -562,27 +1204,10 @@ class HistoryDataManager:
                     "filters_applied": filters or {},
                     "version": "1.0"
                 }
-                f.write(json.dumps(export_metadata) + '\n')
+                f.write(_dumps(export_metadata, newline=True))
                 
-                # Export records in batches
-                cursor = self.collection.find(query).batch_size(batch_size)
-                
-                for doc in cursor:
-                    # Remove MongoDB internal fields
-                    doc.pop('_id', None)
-                    doc.pop('_retry_count', None)
-                    doc.pop('_last_save_attempt', None)
-                    
-                    # Convert datetime objects to ISO strings
-                    if 'created_at' in doc and isinstance(doc['created_at'], datetime):
-                        doc['created_at'] = doc['created_at'].isoformat()
-                    if 'updated_at' in doc and isinstance(doc['updated_at'], datetime):
-                        doc['updated_at'] = doc['updated_at'].isoformat()
-                    if 'analysis_date' in doc and isinstance(doc['analysis_date'], datetime):
-                        doc['analysis_date'] = doc['analysis_date'].isoformat()
-                    
-                    # Write record as JSON line
-                    f.write(json.dumps(doc, ensure_ascii=False) + '\n')
+                for line in self.iter_export_lines(query, batch_size=batch_size):
+                    f.write(line)
                     exported_count += 1
                     
                     # Log progress for large exports
@@ -653,33 +1278,16 @@ class HistoryDataManager:
             
             logger.info(f"Starting import from {input_path}")
             
-            with file_opener(input_path, 'rt', encoding='utf-8') as f:
-                # Read and validate export metadata
-                first_line = f.readline().strip()
-                try:
-                    metadata = json.loads(first_line)
-                    if "export_timestamp" in metadata:
-                        logger.info(f"Importing data exported on {metadata['export_timestamp']}")
-                        total_expected = metadata.get("total_records", 0)
-                    else:
-                        # First line is actually a record, reset file pointer
-                        f.seek(0)
-                        total_expected = None
-                except json.JSONDecodeError:
-                    # First line is a record, reset file pointer
-                    f.seek(0)
-                    total_expected = None
-                
-                # Process records line by line
-                for line_num, line in enumerate(f, 1):
-                    line = line.strip()
-                    if not line:
+            with file_opener(input_path, 'rb') as f:
+                # Records are parsed one at a time from either NDJSON or a
+                # JSON array, so memory stays bounded by the batch size
+                for line_num, doc in self._iter_import_documents(f):
+                    if isinstance(doc, ValueError):
+                        logger.warning(f"Invalid JSON at line {line_num}: {doc}")
+                        error_count += 1
                         continue
                     
                     try:
-                        # Parse JSON record
-                        doc = json.loads(line)
-                        
                         # Convert ISO strings back to datetime objects
                         for date_field in ['created_at', 'updated_at', 'analysis_date']:
                             if date_field in doc and isinstance(doc[date_field], str):
@@ -698,23 +1306,13 @@ class HistoryDataManager:
                                 error_count += 1
                                 continue
                         
-                        # Check if record already exists
-                        if skip_existing and "analysis_id" in doc:
-                            existing = self.collection.find_one(
-                                {"analysis_id": doc["analysis_id"]}, 
-                                {"_id": 1},
-                                maxTimeMS=1000
-                            )
-                            if existing:
-                                skipped_count += 1
-                                continue
-                        
                         batch_records.append(doc)
                         
                         # Process batch when full
                         if len(batch_records) >= batch_size:
                             batch_result = self._import_batch(batch_records, skip_existing)
                             imported_count += batch_result["imported"]
+                            skipped_count += batch_result["skipped"]
                             error_count += batch_result["errors"]
                             batch_records = []
                             
@@ -722,10 +1320,6 @@ class HistoryDataManager:
                             if imported_count % 10000 == 0:
                                 logger.info(f"Import progress: {imported_count} records imported")
                     
-                    except json.JSONDecodeError as e:
-                        logger.warning(f"Invalid JSON at line {line_num}: {e}")
-                        error_count += 1
-                        continue
                     except Exception as e:
                         logger.warning(f"Error processing line {line_num}: {e}")
                         error_count += 1
@@ -735,6 +1329,7 @@ class HistoryDataManager:
                 if batch_records:
                     batch_result = self._import_batch(batch_records, skip_existing)
                     imported_count += batch_result["imported"]
+                    skipped_count += batch_result["skipped"]
                     error_count += batch_result["errors"]
             
             duration = time.time() - start_time
@@ -759,49 +1354,114 @@ class HistoryDataManager:
                 "duration": time.time() - start_time
             }
     
+    @staticmethod
+    def _iter_import_documents(f: BinaryIO) -> Iterator[Tuple[int, Any]]:
+        """
+        Stream documents from an export file opened in binary mode
+        
+        Supports the NDJSON layout written by :meth:`export_data` (an optional
+        metadata line followed by one record per line) and plain JSON arrays,
+        which are parsed incrementally with ``ijson``.
+        
+        Yields:
+            ``(position, document)`` pairs; lines that fail to parse are
+            yielded as the ``ValueError`` instead of a document
+        """
+        if f.peek(64).lstrip()[:1] == b'[':
+            if not IJSON_AVAILABLE:
+                raise ImportError("Importing JSON array files requires ijson: pip install ijson")
+            
+            for position, doc in enumerate(ijson.items(f, 'item', use_float=True), 1):
+                if position == 1 and isinstance(doc, dict) and "export_timestamp" in doc:
+                    logger.info(f"Importing data exported on {doc['export_timestamp']}")
+                    continue
+                yield position, doc
+            return
+        
+        first_record = True
+        for line_num, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            
+            try:
+                doc = _loads(line)
+            except ValueError as e:
+                first_record = False
+                yield line_num, e
+                continue
+            
+            # The first line may hold export metadata rather than a record
+            if first_record and isinstance(doc, dict) and "export_timestamp" in doc:
+                logger.info(f"Importing data exported on {doc['export_timestamp']}")
+                first_record = False
+                continue
+            
+            first_record = False
+            yield line_num, doc
+    
     def _import_batch(self, records: List[Dict[str, Any]], skip_existing: bool) -> Dict[str, int]:
-        """Import a batch of records"""
-        try:
-            if skip_existing:
-                # Use upsert for each record to handle duplicates
-                imported = 0
-                errors = 0
-                
-                for record in records:
-                    try:
-                        if "analysis_id" in record:
-                            result = self.collection.replace_one(
-                                {"analysis_id": record["analysis_id"]},
-                                record,
-                                upsert=True
-                            )
-                            if result.upserted_id or result.modified_count > 0:
-                                imported += 1
-                        else:
-                            self.collection.insert_one(record)
-                            imported += 1
-                    except Exception as e:
-                        logger.warning(f"Error importing record {record.get('analysis_id', 'unknown')}: {e}")
-                        errors += 1
-                
-                return {"imported": imported, "errors": errors}
+        """
+        Import a batch of records with a single unordered bulk_write
+        
+        Records with an ``analysis_id`` are upserted: with ``skip_existing``
+        the document is only written when it does not exist yet
+        (``$setOnInsert``), otherwise it replaces the stored copy. Records
+        without an ``analysis_id`` are inserted as-is.
+        
+        Returns:
+            Dict with ``imported``, ``skipped`` and ``errors`` counts
+        """
+        operations = []
+        for record in records:
+            if "analysis_id" in record:
+                selector = {"analysis_id": record["analysis_id"]}
+                if skip_existing:
+                    operations.append(UpdateOne(selector, {"$setOnInsert": record}, upsert=True))
+                else:
+                    operations.append(ReplaceOne(selector, record, upsert=True))
             else:
-                # Bulk insert all records
-                result = self.collection.insert_many(records, ordered=False)
-                return {"imported": len(result.inserted_ids), "errors": 0}
-                
-        except Exception as e:
+                operations.append(InsertOne(record))
+        
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            counts = result.bulk_api_result
+            errors = 0
+        except BulkWriteError as bwe:
+            # ordered=False keeps going past bad records; the partial result
+            # still reports what was written
+            counts = bwe.details
+            errors = len(counts.get("writeErrors", []))
+            logger.warning(f"Bulk import reported {errors} write errors")
+        except PyMongoError as e:
             logger.error(f"Error importing batch: {e}")
-            return {"imported": 0, "errors": len(records)}
+            return {"imported": 0, "skipped": 0, "errors": len(records)}
+        
+        upserted = counts.get("nUpserted", 0)
+        inserted = counts.get("nInserted", 0)
+        matched = counts.get("nMatched", 0)
+        
+        if skip_existing:
+            # Matched upserts hit an existing analysis_id and were left untouched
+            return {"imported": upserted + inserted, "skipped": matched, "errors": errors}
+        
+        # Every matched record was replaced, including ones whose stored copy
+        # was already identical (counted in nMatched but not nModified)
+        return {"imported": upserted + inserted + matched, "skipped": 0, "errors": errors}
 
 
 # Convenience functions for external use
 
+@lru_cache(maxsize=1)
 def get_data_manager() -> HistoryDataManager:
-    """Get a singleton instance of the data manager"""
-    if not hasattr(get_data_manager, '_instance'):
-        get_data_manager._instance = HistoryDataManager()
-    return get_data_manager._instance
+    """
+    Get the process-wide data manager instance
+    
+    The instance, and with it the pooled MongoDB client, is reused for the
+    lifetime of the process; call ``get_data_manager.cache_clear()`` to force
+    a reconnect.
+    """
+    return HistoryDataManager()
 
 
 def cleanup_old_analysis_records(max_age_days: int = 365, dry_run: bool = False) -> Dict[str, Any]:
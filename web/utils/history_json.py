@@ -0,0 +1,53 @@
+"""
+Analysis History JSON Helpers
+
+This module provides the JSON encoding used by the history cache, data
+manager, maintenance scheduler and performance optimizer. orjson is used when
+it is installed, with the standard library json module as the fallback.
+"""
+
+import json
+from typing import Any, Union
+
+# Prefer orjson for (de)serialization when it is installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def dumps(obj: Any, indent: bool = False, newline: bool = False) -> bytes:
+    """
+    Encode an object as UTF-8 JSON bytes
+
+    Non-string dict keys (such as the None _id of a $group bucket) and
+    non-JSON values are stringified on both the orjson and json paths.
+
+    Args:
+        obj: Object to encode
+        indent: Indent the output by two spaces
+        newline: Append a trailing newline (for NDJSON lines)
+
+    Returns:
+        Encoded JSON bytes
+    """
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if newline:
+            option |= orjson.OPT_APPEND_NEWLINE
+        return orjson.dumps(obj, default=str, option=option)
+
+    data = json.dumps(obj, indent=2 if indent else None, ensure_ascii=False, default=str)
+    if newline:
+        data += '\n'
+    return data.encode('utf-8')
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Decode a JSON document produced by dumps()"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
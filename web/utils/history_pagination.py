@@ -13,6 +13,7 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple, Union
 from dataclasses import dataclass
 import math
+import statistics
 
 from web.utils.history_cache import get_cache_manager
 from web.utils.history_performance import get_performance_monitor, PerformanceMetric
@@ -31,6 +32,14 @@ class PaginationConfig:
     cursor_threshold: int = 1000  # Switch to cursor-based pagination for large datasets
     cache_pages: bool = True
     prefetch_next_page: bool = True
+    # p95 query time bounds (seconds) for tuning the default page size, and
+    # how many consecutive windows of tracked query times must agree before
+    # it changes
+    slow_query_p95: float = 2.0
+    fast_query_p95: float = 0.5
+    resize_after_samples: int = 3
+    # Upper bound on the bytes of records fetched for one page
+    target_page_bytes: int = 512 * 1024
 
 
 @dataclass
@@ -70,6 +79,9 @@ class OptimizedPaginator:
         self.query_times = []
         self.cache_hit_rates = []
         
+        # Average record size in bytes, sampled from the collection by callers
+        self.avg_document_size: Optional[int] = None
+        
     def _calculate_optimal_page_size(self, estimated_total: int, 
                                    avg_query_time: float) -> int:
         """
@@ -381,6 +393,43 @@ class OptimizedPaginator:
         except Exception as e:
             logger.debug(f"Failed to start prefetch: {e}")
     
+    def _query_time_percentiles(self, query_times: Optional[List[float]] = None) -> Tuple[float, float, float]:
+        """
+        Get the p50, p95 and p99 of query times
+        
+        Args:
+            query_times: Query times to summarize (None for all tracked times)
+        
+        Returns:
+            Tuple of (p50, p95, p99) in seconds
+        """
+        if query_times is None:
+            query_times = self.query_times
+        
+        if len(query_times) < 2:
+            value = query_times[0] if query_times else 0.0
+            return value, value, value
+        
+        cut_points = statistics.quantiles(query_times, n=100, method='inclusive')
+        return cut_points[49], cut_points[94], cut_points[98]
+    
+    def _query_time_windows(self) -> List[List[float]]:
+        """
+        Split the most recent query times into resize_after_samples
+        consecutive, equally sized windows
+        
+        Returns:
+            List of windows (a single window when there are too few samples)
+        """
+        count = self.config.resize_after_samples
+        window_size = len(self.query_times) // count
+        if window_size == 0:
+            return [self.query_times]
+        
+        end = len(self.query_times)
+        return [self.query_times[end - (i + 1) * window_size:end - i * window_size]
+                for i in range(count)]
+    
     def get_performance_stats(self) -> Dict[str, Any]:
         """
         Get pagination performance statistics
@@ -393,14 +442,22 @@ class OptimizedPaginator:
                 'avg_query_time': 0.0,
                 'min_query_time': 0.0,
                 'max_query_time': 0.0,
+                'p50_query_time': 0.0,
+                'p95_query_time': 0.0,
+                'p99_query_time': 0.0,
                 'total_queries': 0,
                 'cache_enabled': self.config.cache_pages
             }
         
+        p50, p95, p99 = self._query_time_percentiles()
+        
         return {
             'avg_query_time': sum(self.query_times) / len(self.query_times),
             'min_query_time': min(self.query_times),
             'max_query_time': max(self.query_times),
+            'p50_query_time': p50,
+            'p95_query_time': p95,
+            'p99_query_time': p99,
             'total_queries': len(self.query_times),
             'cache_enabled': self.config.cache_pages,
             'adaptive_sizing': self.config.adaptive_sizing,
@@ -408,6 +465,73 @@ class OptimizedPaginator:
                                if len(self.query_times) >= 10 else 0.0)
         }
     
+    def bandwidth_page_size(self) -> Optional[int]:
+        """
+        Get the largest page size whose records fit in target_page_bytes
+        
+        Returns:
+            Page size clamped to the configured bounds, or None if the
+            average document size is unknown
+        """
+        if not self.avg_document_size:
+            return None
+        
+        page_size = self.config.target_page_bytes // self.avg_document_size
+        return max(self.config.min_page_size, min(self.config.max_page_size, page_size))
+    
+    def tune_page_size(self) -> Optional[str]:
+        """
+        Adjust the default page size from the p95 query time, bounded by
+        the bandwidth-aware page size when the document size is known
+        
+        A resize only happens when the p95 of each of the last
+        resize_after_samples windows of tracked query times agrees on its
+        direction, so page size does not oscillate around the thresholds.
+        
+        Returns:
+            'shrink' or 'grow' if the default page size was changed by the
+            latency rule, 'bandwidth' if only the size bound lowered it,
+            None otherwise
+        """
+        bandwidth_size = self.bandwidth_page_size()
+        ceiling = bandwidth_size or self.config.max_page_size
+        
+        # Large documents cap the page size regardless of latency
+        capped = self.config.default_page_size > ceiling
+        if capped:
+            self.config.default_page_size = ceiling
+            logger.info(f"Page size capped at {ceiling} for "
+                        f"{self.avg_document_size}-byte documents")
+        
+        if not self.query_times:
+            return 'bandwidth' if capped else None
+        
+        directions = set()
+        for window in self._query_time_windows():
+            _, window_p95, _ = self._query_time_percentiles(window)
+            if window_p95 > self.config.slow_query_p95:
+                directions.add('shrink')
+            elif window_p95 < self.config.fast_query_p95:
+                directions.add('grow')
+            else:
+                directions.add(None)
+        
+        direction = directions.pop() if len(directions) == 1 else None
+        if direction is None:
+            return 'bandwidth' if capped else None
+        
+        if direction == 'shrink':
+            # Slow queries - reduce default page size
+            self.config.default_page_size = min(15, self.config.default_page_size)
+        else:
+            # Fast queries - can increase page size
+            self.config.default_page_size = min(30, ceiling)
+        
+        _, p95, _ = self._query_time_percentiles()
+        logger.info(f"Page size tuning ({direction}, p95 {p95:.3f}s): "
+                    f"default page size {self.config.default_page_size}")
+        return direction
+    
     def clear_cache(self) -> int:
         """
         Clear pagination cache
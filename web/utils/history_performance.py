@@ -13,7 +13,7 @@ import threading
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Callable
 from dataclasses import dataclass, field
-from collections import defaultdict, deque
+from collections import Counter, defaultdict, deque
 import statistics
 
 # Setup logging
@@ -41,15 +41,23 @@ class PerformanceMonitor:
     recommendations based on usage patterns.
     """
     
-    def __init__(self, max_metrics: int = 10000):
+    def __init__(self, max_metrics: int = 10000, max_accesses: int = 50000,
+                 cache_manager: Optional[Any] = None):
         """
         Initialize the performance monitor
         
         Args:
             max_metrics: Maximum number of metrics to keep in memory
+            max_accesses: Maximum number of record accesses to keep in memory
+            cache_manager: Cache manager whose Redis holds the shared access
+                counts (None to only track accesses in this process)
         """
         self.max_metrics = max_metrics
         self.metrics: deque = deque(maxlen=max_metrics)
+        # (timestamp, analysis_id) pairs used to learn access patterns when
+        # the shared Redis access counts are unavailable
+        self.access_log: deque = deque(maxlen=max_accesses)
+        self.cache_manager = cache_manager
         self.operation_stats: Dict[str, List[float]] = defaultdict(list)
         self.cache_stats = {
             'hits': 0,
@@ -99,6 +107,55 @@ class PerformanceMonitor:
                 if len(self.slow_queries) > 100:
                     self.slow_queries = self.slow_queries[-100:]
     
+    def record_access(self, analysis_id: str, timestamp: Optional[datetime] = None,
+                      shared: bool = True) -> None:
+        """
+        Record an access to an analysis record
+        
+        Args:
+            analysis_id: The accessed analysis ID
+            timestamp: Access time (None for now)
+            shared: Also count the access in Redis; pass False when the
+                caller already counted it (e.g. in the cache lookup pipeline)
+        """
+        timestamp = timestamp or datetime.now()
+        with self._lock:
+            self.access_log.append((timestamp, analysis_id))
+        
+        if shared and self.cache_manager is not None:
+            self.cache_manager.increment_access(analysis_id, timestamp)
+    
+    def get_top_accessed(self, start: datetime, end: datetime, limit: int = 100) -> List[str]:
+        """
+        Get the most accessed analysis IDs within a time range
+        
+        The access counts shared through Redis are used when available, so
+        accesses recorded by other processes or before a restart count too;
+        they are bucketed by hour. Otherwise this process's access log is used.
+        
+        Args:
+            start: Range start (inclusive)
+            end: Range end (exclusive)
+            limit: Maximum number of IDs to return
+            
+        Returns:
+            Analysis IDs ordered by access count, most accessed first
+        """
+        shared_counts = None
+        if self.cache_manager is not None:
+            shared_counts = self.cache_manager.get_access_counts(start, end)
+        
+        if shared_counts is not None:
+            counts = Counter(shared_counts)
+        else:
+            with self._lock:
+                counts = Counter(
+                    analysis_id for timestamp, analysis_id in self.access_log
+                    if start <= timestamp < end
+                )
+        
+        return [analysis_id for analysis_id, _ in counts.most_common(limit)]
+    
     def get_operation_stats(self, operation: str, 
                            time_window: Optional[timedelta] = None) -> Dict[str, Any]:
         """
@@ -279,6 +336,7 @@ class PerformanceMonitor:
             self.operation_stats.clear()
             self.cache_stats = {'hits': 0, 'misses': 0, 'errors': 0}
             self.slow_queries.clear()
+            self.access_log.clear()
     
     def export_metrics(self, time_window: Optional[timedelta] = None) -> Dict[str, Any]:
         """
@@ -388,7 +446,8 @@ def get_performance_monitor() -> PerformanceMonitor:
     """Get the global performance monitor instance"""
     global _performance_monitor
     if _performance_monitor is None:
-        _performance_monitor = PerformanceMonitor()
+        from web.utils.history_cache import get_cache_manager
+        _performance_monitor = PerformanceMonitor(cache_manager=get_cache_manager())
     return _performance_monitor
 
 
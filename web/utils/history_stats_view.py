@@ -0,0 +1,161 @@
+"""
+Analysis History Statistics View
+
+This module maintains the materialized ``history_stats_mv`` collection that
+backs the statistics of both the history storage service and the data
+manager. The view holds one bucket per status, market type, LLM provider and
+creation day, so statistics can be read without scanning the history.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from pymongo import DESCENDING
+from pymongo.collection import Collection
+from pymongo.errors import OperationFailure
+
+STATS_VIEW_COLLECTION_NAME = "history_stats_mv"
+
+# Both the storage service and the data manager refresh the view once it is
+# older than this
+STATS_VIEW_MAX_AGE = timedelta(minutes=5)
+
+# Server error codes for pipeline stages and operators the server does not
+# know ($merge before MongoDB 4.2, $dateTrunc before 5.0)
+UNSUPPORTED_PIPELINE_CODES = frozenset({40324, 168})
+
+
+def refresh_stats_view(collection: Collection, view_collection: Collection) -> Dict[str, Any]:
+    """
+    Rebuild the materialized statistics collection
+    
+    Groups the history into buckets and ``$merge``s them into the view.
+    Buckets that no longer exist (e.g. after a cleanup) are removed
+    afterwards.
+    
+    Args:
+        collection: The analysis history collection
+        view_collection: The materialized statistics collection
+    
+    Returns:
+        Dict with the refresh time and the number of stale buckets removed
+    
+    Raises:
+        PyMongoError: If the aggregation or the stale bucket removal fails
+    """
+    refreshed_at = datetime.now()
+    
+    pipeline = [
+        {
+            "$group": {
+                "_id": {
+                    "status": "$status",
+                    "market_type": "$market_type",
+                    "llm_provider": "$llm_provider",
+                    "day": {"$dateTrunc": {"date": "$created_at", "unit": "day"}}
+                },
+                "count": {"$sum": 1},
+                # $avg skips non-numeric values; keep the matching counts
+                # so averages can be rebuilt from the buckets
+                "execution_time_sum": {"$sum": "$execution_time"},
+                "execution_time_count": {"$sum": {"$cond": [{"$isNumber": "$execution_time"}, 1, 0]}},
+                "max_execution_time": {"$max": "$execution_time"},
+                "min_execution_time": {"$min": "$execution_time"},
+                "cost_sum": {"$sum": "$token_usage.total_cost"},
+                "cost_count": {"$sum": {"$cond": [{"$isNumber": "$token_usage.total_cost"}, 1, 0]}}
+            }
+        },
+        {"$set": {"refreshed_at": refreshed_at}},
+        {
+            "$merge": {
+                "into": view_collection.name,
+                "whenMatched": "replace",
+                "whenNotMatched": "insert"
+            }
+        }
+    ]
+    
+    collection.aggregate(pipeline, maxTimeMS=60000)
+    stale = view_collection.delete_many({"refreshed_at": {"$lt": refreshed_at}})
+    
+    return {
+        "refreshed_at": refreshed_at,
+        "stale_buckets_removed": stale.deleted_count
+    }
+
+
+def get_stats_view_refreshed_at(view_collection: Collection) -> Optional[datetime]:
+    """Get the time of the last view refresh, None if the view is empty"""
+    latest = view_collection.find_one({}, {"refreshed_at": 1}, sort=[("refreshed_at", DESCENDING)])
+    return latest["refreshed_at"] if latest else None
+
+
+def is_stats_view_stale(view_collection: Collection, max_age: timedelta) -> bool:
+    """Check whether the view is empty or older than max_age"""
+    refreshed_at = get_stats_view_refreshed_at(view_collection)
+    return refreshed_at is None or datetime.now() - refreshed_at > max_age
+
+
+def is_unsupported_pipeline_error(error: Exception) -> bool:
+    """Check whether an error means the server cannot run the view pipeline at all"""
+    return isinstance(error, OperationFailure) and error.code in UNSUPPORTED_PIPELINE_CODES
+
+
+def summarize_stats_view(view_collection: Collection) -> Dict[str, Any]:
+    """
+    Fold the view buckets into per-dimension totals
+    
+    Args:
+        view_collection: The materialized statistics collection
+    
+    Returns:
+        Dict with status, market, LLM provider and per-day counts (keyed by
+        the bucket day) and the execution time and cost sums needed to
+        rebuild averages
+    """
+    summary = {
+        "status_counts": {},
+        "market_counts": {},
+        "llm_counts": {},
+        "daily_counts": {},
+        "execution_time_sum": 0,
+        "execution_time_count": 0,
+        "max_execution_time": None,
+        "min_execution_time": None,
+        "cost_sum": 0,
+        "cost_count": 0,
+        "refreshed_at": None
+    }
+    status_counts = summary["status_counts"]
+    market_counts = summary["market_counts"]
+    llm_counts = summary["llm_counts"]
+    daily_counts = summary["daily_counts"]
+    
+    for bucket in view_collection.find({}):
+        key = bucket["_id"]
+        count = bucket["count"]
+        status_counts[key.get("status")] = status_counts.get(key.get("status"), 0) + count
+        market_counts[key.get("market_type")] = market_counts.get(key.get("market_type"), 0) + count
+        llm_counts[key.get("llm_provider")] = llm_counts.get(key.get("llm_provider"), 0) + count
+        
+        day = key.get("day")
+        if isinstance(day, datetime):
+            daily_counts[day] = daily_counts.get(day, 0) + count
+        
+        summary["execution_time_sum"] += bucket.get("execution_time_sum") or 0
+        summary["execution_time_count"] += bucket.get("execution_time_count") or 0
+        summary["cost_sum"] += bucket.get("cost_sum") or 0
+        summary["cost_count"] += bucket.get("cost_count") or 0
+        
+        bucket_max = bucket.get("max_execution_time")
+        if bucket_max is not None and (summary["max_execution_time"] is None or bucket_max > summary["max_execution_time"]):
+            summary["max_execution_time"] = bucket_max
+        bucket_min = bucket.get("min_execution_time")
+        if bucket_min is not None and (summary["min_execution_time"] is None or bucket_min < summary["min_execution_time"]):
+            summary["min_execution_time"] = bucket_min
+        
+        refreshed_at = bucket.get("refreshed_at")
+        if refreshed_at is not None and (summary["refreshed_at"] is None or refreshed_at > summary["refreshed_at"]):
+            summary["refreshed_at"] = refreshed_at
+    
+    return summary
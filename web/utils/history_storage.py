@@ -5,10 +5,12 @@ This module provides the storage infrastructure for analysis history records,
 including MongoDB collection management, indexing, and CRUD operations.
 """
 
+import base64
 import logging
 import time
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Any, Optional, Tuple
+import bson
 from pymongo import MongoClient, ASCENDING, DESCENDING
 from pymongo.collection import Collection
 from pymongo.database import Database
@@ -40,6 +42,12 @@ from web.utils.history_performance import get_performance_monitor, PerformanceMe
 # Import optimized pagination
 from web.utils.history_pagination import get_paginator
 
+# Import the materialized statistics view shared with the data manager
+from web.utils.history_stats_view import (
+    STATS_VIEW_COLLECTION_NAME, STATS_VIEW_MAX_AGE, is_stats_view_stale,
+    is_unsupported_pipeline_error, refresh_stats_view, summarize_stats_view
+)
+
 
 class AnalysisHistoryStorage:
     """
@@ -51,6 +59,110 @@ class AnalysisHistoryStorage:
     
     COLLECTION_NAME = "analysis_history"
     
+    # Index options whose indexes do work that $indexStats never counts
+    # (constraint checks, TTL deletes) or are deliberately hidden
+    PROTECTED_INDEX_OPTIONS = ('unique', 'expireAfterSeconds', 'partialFilterExpression', 'hidden')
+    
+    # The materialized statistics view is refreshed once it is older than this
+    STATS_VIEW_MAX_AGE = STATS_VIEW_MAX_AGE
+    
+    # Records deleted per round trip by cleanup_old_records
+    CLEANUP_BATCH_SIZE = 10000
+    
+    # Indexes declared for the collection; these are never dropped as unused
+    INDEX_SPECS = [
+        # Unique index for analysis_id (primary key)
+        {
+            'keys': [('analysis_id', ASCENDING)],
+            'options': {'unique': True, 'name': 'idx_analysis_id_unique'}
+        },
+        # Optimized compound index for stock symbol and date queries
+        {
+            'keys': [('stock_symbol', ASCENDING), ('created_at', DESCENDING)],
+            'options': {'name': 'idx_stock_symbol_date', 'background': True}
+        },
+        # Primary date index for chronological queries
+        {
+            'keys': [('created_at', DESCENDING)],
+            'options': {'name': 'idx_created_at_desc', 'background': True}
+        },
+        # Keyset pagination walks (created_at, _id) so ties on
+        # created_at still page deterministically
+        {
+            'keys': [('created_at', DESCENDING), ('_id', DESCENDING)],
+            'options': {'name': 'idx_created_at_id_desc', 'background': True}
+        },
+        # Chronological listing index covering summary projections
+        # (created_at, status, analysis_id) without fetching documents
+        {
+            'keys': [('created_at', DESCENDING), ('status', ASCENDING), ('analysis_id', ASCENDING)],
+            'options': {'name': 'idx_created_at_status_id', 'background': True}
+        },
+        # Status filtering with date for efficient pagination
+        {
+            'keys': [('status', ASCENDING), ('created_at', DESCENDING)],
+            'options': {'name': 'idx_status_date', 'background': True}
+        },
+        # Market type filtering with date
+        {
+            'keys': [('market_type', ASCENDING), ('created_at', DESCENDING)],
+            'options': {'name': 'idx_market_type_date', 'background': True}
+        },
+        # Comprehensive compound index for complex queries
+        {
+            'keys': [
+                ('market_type', ASCENDING),
+                ('status', ASCENDING),
+                ('created_at', DESCENDING)
+            ],
+            'options': {'name': 'idx_market_status_date', 'background': True}
+        },
+        # Analysis type filtering
+        {
+            'keys': [('analysis_type', ASCENDING), ('created_at', DESCENDING)],
+            'options': {'name': 'idx_analysis_type_date', 'background': True}
+        },
+        # LLM provider analysis
+        {
+            'keys': [('llm_provider', ASCENDING), ('created_at', DESCENDING)],
+            'options': {'name': 'idx_llm_provider_date', 'background': True}
+        },
+        # Performance metrics index
+        {
+            'keys': [('execution_time', DESCENDING), ('created_at', DESCENDING)],
+            'options': {'name': 'idx_execution_time_date', 'background': True}
+        },
+        # Cost analysis index
+        {
+            'keys': [('token_usage.total_cost', DESCENDING), ('created_at', DESCENDING)],
+            'options': {'name': 'idx_cost_date', 'background': True}
+        },
+        # Text index for full-text search
+        {
+            'keys': [('stock_name', 'text'), ('stock_symbol', 'text')],
+            'options': {
+                'name': 'idx_text_search',
+                'background': True,
+                'weights': {'stock_name': 10, 'stock_symbol': 5}
+            }
+        },
+        # Sparse index for analysts used (only when field exists)
+        {
+            'keys': [('analysts_used', ASCENDING)],
+            'options': {'name': 'idx_analysts_used', 'sparse': True, 'background': True}
+        },
+        # TTL index for automatic cleanup (if needed)
+        # Uncomment if automatic cleanup is desired
+        # {
+        #     'keys': [('created_at', ASCENDING)],
+        #     'options': {
+        #         'name': 'idx_ttl_cleanup',
+        #         'expireAfterSeconds': 365 * 24 * 60 * 60,  # 1 year
+        #         'background': True
+        #     }
+        # }
+    ]
+    
     def __init__(self):
         """Initialize the storage service"""
         self.db_manager = get_database_manager()
@@ -67,12 +179,20 @@ class AnalysisHistoryStorage:
         # Initialize optimized pagination
         self.paginator = get_paginator()
         
+        # Whether the server supports the $indexStats aggregation stage
+        self._has_index_stats = False
+        
+        # Whether the server can build the materialized statistics view;
+        # cleared the first time it rejects the $merge pipeline
+        self._has_stats_view = True
+        
         # Initialize database connection
         self._initialize_connection()
         
-        # Create indexes if connection is available
+        # Create indexes and probe index statistics support if connection is available
         if self.collection is not None:
             self._create_indexes()
+            self._has_index_stats = self._probe_index_stats()
     
     @with_retry(
         max_attempts=3, 
@@ -180,90 +300,13 @@ class AnalysisHistoryStorage:
             return
         
         try:
-            # Create indexes for efficient querying with performance optimizations
-            indexes_to_create = [
-                # Unique index for analysis_id (primary key)
-                {
-                    'keys': [('analysis_id', ASCENDING)],
-                    'options': {'unique': True, 'name': 'idx_analysis_id_unique'}
-                },
-                # Optimized compound index for stock symbol and date queries
-                {
-                    'keys': [('stock_symbol', ASCENDING), ('created_at', DESCENDING)],
-                    'options': {'name': 'idx_stock_symbol_date', 'background': True}
-                },
-                # Primary date index for chronological queries
-                {
-                    'keys': [('created_at', DESCENDING)],
-                    'options': {'name': 'idx_created_at_desc', 'background': True}
-                },
-                # Status filtering with date for efficient pagination
-                {
-                    'keys': [('status', ASCENDING), ('created_at', DESCENDING)],
-                    'options': {'name': 'idx_status_date', 'background': True}
-                },
-                # Market type filtering with date
-                {
-                    'keys': [('market_type', ASCENDING), ('created_at', DESCENDING)],
-                    'options': {'name': 'idx_market_type_date', 'background': True}
-                },
-                # Comprehensive compound index for complex queries
-                {
-                    'keys': [
-                        ('market_type', ASCENDING),
-                        ('status', ASCENDING),
-                        ('created_at', DESCENDING)
-                    ],
-                    'options': {'name': 'idx_market_status_date', 'background': True}
-                },
-                # Analysis type filtering
-                {
-                    'keys': [('analysis_type', ASCENDING), ('created_at', DESCENDING)],
-                    'options': {'name': 'idx_analysis_type_date', 'background': True}
-                },
-                # LLM provider analysis
-                {
-                    'keys': [('llm_provider', ASCENDING), ('created_at', DESCENDING)],
-                    'options': {'name': 'idx_llm_provider_date', 'background': True}
-                },
-                # Performance metrics index
-                {
-                    'keys': [('execution_time', DESCENDING), ('created_at', DESCENDING)],
-                    'options': {'name': 'idx_execution_time_date', 'background': True}
-                },
-                # Cost analysis index
-                {
-                    'keys': [('token_usage.total_cost', DESCENDING), ('created_at', DESCENDING)],
-                    'options': {'name': 'idx_cost_date', 'background': True}
-                },
-                # Text index for full-text search
-                {
-                    'keys': [('stock_name', 'text'), ('stock_symbol', 'text')],
-                    'options': {
-                        'name': 'idx_text_search',
-                        'background': True,
-                        'weights': {'stock_name': 10, 'stock_symbol': 5}
-                    }
-                },
-                # Sparse index for analysts used (only when field exists)
-                {
-                    'keys': [('analysts_used', ASCENDING)],
-                    'options': {'name': 'idx_analysts_used', 'sparse': True, 'background': True}
-                },
-                # TTL index for automatic cleanup (if needed)
-                # Uncomment if automatic cleanup is desired
-                # {
-                #     'keys': [('created_at', ASCENDING)],
-                #     'options': {
-                #         'name': 'idx_ttl_cleanup',
-                #         'expireAfterSeconds': 365 * 24 * 60 * 60,  # 1 year
-                #         'background': True
-                #     }
-                # }
-            ]
+            # Only create declared indexes that do not exist yet
+            existing_indexes = set(self.collection.index_information())
             
             # Create each index
-            for index_spec in indexes_to_create:
+            for index_spec in self.INDEX_SPECS:
+                if index_spec['options']['name'] in existing_indexes:
+                    continue
                 try:
                     self.collection.create_index(
                         index_spec['keys'],
@@ -280,10 +323,112 @@ class AnalysisHistoryStorage:
         except Exception as e:
             logger.error(f"Failed to create indexes: {e}")
     
+    def drop_unused_indexes(self, index_stats: Optional[List[Dict[str, Any]]] = None,
+                            min_observed: timedelta = timedelta(hours=24),
+                            dry_run: bool = True) -> List[str]:
+        """
+        Find, and optionally drop, indexes that have not been used since their
+        statistics started
+        
+        Indexes declared in INDEX_SPECS and the _id index are always kept, as
+        are unique, TTL, partial and hidden indexes: constraint checks and
+        TTL deletes never count as accesses. An index is only considered
+        when its usage has been tracked for at least min_observed, since
+        $indexStats counters reset on restart. The counters are also
+        per-node, so check secondaries before dropping an index that may
+        serve secondary reads.
+        
+        Args:
+            index_stats: Result of get_index_stats() (None to query it)
+            min_observed: Minimum time usage must have been tracked
+            dry_run: Only report the unused indexes without dropping them
+            
+        Returns:
+            Names of the unused indexes (dropped unless dry_run)
+        """
+        if not self.is_available():
+            return []
+        
+        if index_stats is None:
+            index_stats = self.get_index_stats()
+        
+        keep = {'_id_'} | {spec['options']['name'] for spec in self.INDEX_SPECS}
+        observed_before = datetime.now(timezone.utc) - min_observed
+        unused = []
+        
+        for stat in index_stats:
+            name = stat.get('name')
+            accesses = stat.get('accesses', {})
+            since = accesses.get('since')
+            if name in keep or accesses.get('ops', 0) > 0 or since is None:
+                continue
+            
+            spec = stat.get('spec', {})
+            if any(option in spec for option in self.PROTECTED_INDEX_OPTIONS):
+                continue
+            
+            # pymongo returns naive UTC datetimes by default
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            if since > observed_before:
+                continue
+            
+            if dry_run:
+                unused.append(name)
+                logger.info(f"Unused index (not dropped, dry run): {name}")
+                continue
+            
+            try:
+                self.collection.drop_index(name)
+                unused.append(name)
+                logger.info(f"Dropped unused index: {name}")
+            except PyMongoError as e:
+                logger.warning(f"Failed to drop unused index {name}: {e}")
+        
+        return unused
+    
     def is_available(self) -> bool:
         """Check if the storage service is available"""
         return self.collection is not None
     
+    def _probe_index_stats(self) -> bool:
+        """Check once whether the $indexStats aggregation stage is usable"""
+        try:
+            self.collection.aggregate([{'$indexStats': {}}, {'$limit': 1}])
+            return True
+        except PyMongoError as e:
+            logger.debug(f"$indexStats not available: {e}")
+            return False
+    
+    def get_avg_document_size(self) -> int:
+        """
+        Get the average BSON size of analysis records from collStats
+        
+        Returns:
+            Average document size in bytes, 0 if unknown
+        """
+        if not self.is_available() or self.database is None:
+            return 0
+        
+        try:
+            stats = self.database.command('collStats', self.COLLECTION_NAME)
+            return int(stats.get('avgObjSize', 0))
+        except PyMongoError as e:
+            logger.debug(f"Could not read collection stats: {e}")
+            return 0
+    
+    def get_index_stats(self) -> List[Dict[str, Any]]:
+        """
+        Get per-index usage statistics via the $indexStats aggregation stage
+        
+        Returns:
+            List of index statistics documents, empty if unsupported
+        """
+        if not self.is_available() or not self._has_index_stats:
+            return []
+        
+        return list(self.collection.aggregate([{'$indexStats': {}}]))
+    
     @performance_timer("save_analysis")
     @log_storage_operation("save_analysis")
     @with_error_handling(context="保存分析记录", show_user_error=False)
@@ -369,7 +514,6 @@ class AnalysisHistoryStorage:
     
     @performance_timer("get_analysis_by_id")
     @with_error_handling(context="获取分析记录", show_user_error=False)
-    @with_retry(max_attempts=2, delay=0.5, retry_on=(ConnectionFailure, ServerSelectionTimeoutError))
     def get_analysis_by_id(self, analysis_id: str) -> Optional[AnalysisHistoryRecord]:
         """
         Retrieve an analysis record by its ID with caching and error handling
@@ -384,8 +528,13 @@ class AnalysisHistoryStorage:
             logger.warning(f"Invalid analysis_id provided: {analysis_id}")
             return None
         
+        # Track access patterns for time-windowed cache warming; the shared
+        # Redis count rides along with the cache lookup below
+        access_time = datetime.now()
+        self.performance_monitor.record_access(analysis_id, access_time, shared=False)
+        
         # Try cache first
-        cached_record = self.cache_manager.get_cached_record(analysis_id)
+        cached_record = self.cache_manager.get_cached_record(analysis_id, access_time=access_time)
         if cached_record:
             logger.debug(f"Retrieved record from cache: {analysis_id}")
             return cached_record
@@ -394,6 +543,11 @@ class AnalysisHistoryStorage:
             logger.warning("Storage service not available, cannot retrieve analysis")
             return None
         
+        return self._find_analysis_by_id(analysis_id)
+    
+    @with_retry(max_attempts=2, delay=0.5, retry_on=(ConnectionFailure, ServerSelectionTimeoutError))
+    def _find_analysis_by_id(self, analysis_id: str) -> Optional[AnalysisHistoryRecord]:
+        """Load an analysis record from the database and cache it (retried, unlike the access count)"""
         try:
             doc = self.collection.find_one(
                 {'analysis_id': analysis_id},
@@ -427,6 +581,38 @@ class AnalysisHistoryStorage:
             logger.error(f"Error retrieving analysis record {analysis_id}: {e}")
             return None
     
+    @performance_timer("get_analyses_by_ids")
+    @with_error_handling(context="批量获取分析记录", show_user_error=False)
+    def get_analyses_by_ids(self, analysis_ids: List[str]) -> List[AnalysisHistoryRecord]:
+        """
+        Retrieve several analysis records in a single query, bypassing the cache
+        
+        Args:
+            analysis_ids: The analysis IDs to retrieve
+            
+        Returns:
+            List of the records found, in no particular order
+        """
+        if not analysis_ids or not self.is_available():
+            return []
+        
+        records = []
+        cursor = self.collection.find(
+            {'analysis_id': {'$in': list(analysis_ids)}},
+            max_time_ms=10000
+        )
+        for doc in cursor:
+            # Remove MongoDB internal fields
+            doc.pop('_id', None)
+            doc.pop('_retry_count', None)
+            doc.pop('_last_save_attempt', None)
+            try:
+                records.append(AnalysisHistoryRecord.from_dict(doc))
+            except Exception as e:
+                logger.warning(f"Failed to parse record {doc.get('analysis_id', 'unknown')}: {e}")
+        
+        return records
+    
     @performance_timer("get_user_history")
     @log_storage_operation("get_user_history")
     @with_error_handling(context="获取历史记录列表", show_user_error=False)
@@ -442,7 +628,9 @@ class AnalysisHistoryStorage:
                         page: int = 1,
                         page_size: int = 20,
                         sort_by: str = 'created_at',
-                        sort_order: int = -1) -> Tuple[List[AnalysisHistoryRecord], int]:
+                        sort_order: int = -1,
+                        skip_count: bool = False,
+                        projection: Optional[List[str]] = None) -> Tuple[List[AnalysisHistoryRecord], int]:
         """
         Retrieve user's analysis history with filtering and pagination
         
@@ -452,6 +640,12 @@ class AnalysisHistoryStorage:
             page_size: Number of records per page
             sort_by: Field to sort by
             sort_order: Sort order (1 for ascending, -1 for descending)
+            skip_count: Skip counting matching records. The returned total is
+                then a lower bound that exceeds page * page_size only when
+                a next page exists.
+            projection: Only return these fields, as plain dicts without _id,
+                so an index covering them can answer the page without fetching
+                documents. Projected pages bypass the query cache.
             
         Returns:
             Tuple of (records, total_count)
@@ -476,13 +670,14 @@ class AnalysisHistoryStorage:
             query = self._build_query(filters or {})
             
             # Try cache first for query results
-            cached_result = self.cache_manager.get_cached_query_result(
-                filters or {}, page, page_size, sort_by, sort_order
-            )
-            if cached_result:
-                records, total_count = cached_result
-                logger.debug(f"Retrieved {len(records)} records from cache (page {page}, total {total_count})")
-                return records, total_count
+            if projection is None:
+                cached_result = self.cache_manager.get_cached_query_result(
+                    filters or {}, page, page_size, sort_by, sort_order
+                )
+                if cached_result:
+                    records, total_count = cached_result
+                    logger.debug(f"Retrieved {len(records)} records from cache (page {page}, total {total_count})")
+                    return records, total_count
             
             # Log query details for debugging
             logger.debug(f"Executing history query: {query}")
@@ -490,32 +685,57 @@ class AnalysisHistoryStorage:
             
             # Add query timeout and performance hints
             query_options = {
-                'max_time_ms': 10000,  # 10 second timeout
-                'hint': [('created_at', -1)]  # Use index hint for better performance
+                'max_time_ms': 10000  # 10 second timeout
             }
-            
-            # Get total count with timeout and performance logging
-            count_start_time = time.time()
-            total_count = self.collection.count_documents(query, maxTimeMS=5000)
-            count_duration = time.time() - count_start_time
-            
-            logger.debug(f"Count query completed in {count_duration:.3f}s, found {total_count} total records")
+            if projection is not None:
+                # Projected queries leave the index choice to the planner so a
+                # covering index can answer the page without fetching documents
+                query_options['projection'] = {'_id': 0, **{field: 1 for field in projection}}
+            elif sort_by == 'created_at':
+                # The date index serves this sort, so the server can stop
+                # after skip + limit documents (top-k sort)
+                query_options['hint'] = [('created_at', -1)]
+            if sort_by != 'created_at':
+                # Other sort fields may need an in-memory sort; let large
+                # result sets spill to disk instead of failing
+                query_options['allow_disk_use'] = True
+            
+            # Get total count unless the caller only needs next-page detection
+            if not skip_count:
+                count_start_time = time.time()
+                total_count = self.collection.count_documents(query, maxTimeMS=5000)
+                count_duration = time.time() - count_start_time
+                logger.debug(f"Count query completed in {count_duration:.3f}s, found {total_count} total records")
             
             # Calculate skip value
             skip = (page - 1) * page_size
             
+            # Fetch one extra document to detect whether a next page exists
+            limit = page_size + 1 if skip_count else page_size
+            
             # Execute query with pagination and sorting
             find_start_time = time.time()
-            cursor = self.collection.find(query, **query_options).sort(sort_by, sort_order).skip(skip).limit(page_size)
+            docs = list(
+                self.collection.find(query, **query_options)
+                .sort(sort_by, sort_order).skip(skip).limit(limit)
+            )
             find_duration = time.time() - find_start_time
             
-            logger.debug(f"Find query setup completed in {find_duration:.3f}s")
+            if skip_count:
+                total_count = skip + len(docs)
+                docs = docs[:page_size]
+            
+            logger.debug(f"History query completed in {find_duration:.3f}s")
             
             # Convert documents to records with error handling
             records = []
             parse_errors = 0
             
-            for doc in cursor:
+            for doc in docs:
+                if projection is not None:
+                    # Partial documents cannot be parsed into records
+                    records.append(doc)
+                    continue
                 try:
                     # Remove MongoDB internal fields
                     doc.pop('_id', None)
@@ -547,10 +767,12 @@ class AnalysisHistoryStorage:
                 None
             )
             
-            # Cache the query result for future requests
-            self.cache_manager.cache_query_result(
-                filters or {}, page, page_size, sort_by, sort_order, records, total_count
-            )
+            # Cache the query result for future requests; uncounted totals
+            # are only lower bounds and must not be served as exact counts
+            if not skip_count and projection is None:
+                self.cache_manager.cache_query_result(
+                    filters or {}, page, page_size, sort_by, sort_order, records, total_count
+                )
             
             logger.debug(f"Retrieved {len(records)} records (page {page}, total {total_count}) in {total_duration:.3f}s")
             return records, total_count
@@ -584,6 +806,75 @@ class AnalysisHistoryStorage:
             logger.error(f"Error retrieving user history: {e}")
             return [], 0
     
+    @staticmethod
+    def _encode_history_cursor(created_at: datetime, doc_id: Any) -> str:
+        """Encode the sort key of the last record on a page as an opaque cursor"""
+        return base64.urlsafe_b64encode(bson.encode({'t': created_at, 'i': doc_id})).decode('ascii')
+    
+    @staticmethod
+    def _decode_history_cursor(cursor: str) -> Tuple[datetime, Any]:
+        """Decode a cursor produced by _encode_history_cursor"""
+        position = bson.decode(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return position['t'], position['i']
+    
+    @performance_timer("get_user_history_cursor")
+    @with_error_handling(context="游标分页获取历史记录", show_user_error=False)
+    def get_user_history_cursor(self,
+                                cursor: Optional[str] = None,
+                                page_size: int = 20,
+                                filters: Optional[Dict[str, Any]] = None) -> Tuple[List[AnalysisHistoryRecord], Optional[str]]:
+        """
+        Retrieve history newest-first using keyset (cursor) pagination
+        
+        Unlike ``get_user_history`` no ``skip`` is involved: each page resumes
+        from the ``(created_at, _id)`` of the previous page's last record, so
+        page N costs the same index walk as page 1.
+        
+        Args:
+            cursor: Cursor returned with the previous page, None for the first page
+            page_size: Number of records per page
+            filters: Optional filters to apply
+            
+        Returns:
+            Tuple of (records, next_cursor); next_cursor is None on the last page
+        """
+        if not self.is_available():
+            logger.warning("Storage service not available, cannot retrieve history")
+            return [], None
+        
+        page_size = max(1, min(100, int(page_size)))
+        query = self._build_query(filters or {})
+        
+        if cursor:
+            last_created_at, last_id = self._decode_history_cursor(cursor)
+            position = {'$or': [
+                {'created_at': {'$lt': last_created_at}},
+                {'created_at': last_created_at, '_id': {'$lt': last_id}}
+            ]}
+            query = {'$and': [query, position]} if query else position
+        
+        docs = list(
+            self.collection.find(query, max_time_ms=10000)
+            .sort([('created_at', DESCENDING), ('_id', DESCENDING)])
+            .limit(page_size)
+        )
+        
+        next_cursor = None
+        if len(docs) == page_size:
+            next_cursor = self._encode_history_cursor(docs[-1].get('created_at'), docs[-1]['_id'])
+        
+        records = []
+        for doc in docs:
+            try:
+                doc.pop('_id', None)
+                doc.pop('_retry_count', None)
+                doc.pop('_last_save_attempt', None)
+                records.append(AnalysisHistoryRecord.from_dict(doc))
+            except Exception as e:
+                logger.warning(f"Failed to parse record {doc.get('analysis_id', 'unknown')}: {e}")
+        
+        return records, next_cursor
+    
     def _build_query(self, filters: Dict[str, Any]) -> Dict[str, Any]:
         """
         Build MongoDB query from filters with proper type handling
@@ -793,6 +1084,10 @@ class AnalysisHistoryStorage:
         """
         Get comprehensive statistics about the analysis history with caching
         
+        Statistics are served from the materialized ``history_stats_mv``
+        view shared with the data manager when available, falling back to
+        computing them from the collection.
+        
         Returns:
             Dictionary containing various statistics
         """
@@ -816,104 +1111,13 @@ class AnalysisHistoryStorage:
         try:
             stats_start_time = time.time()
             
-            # Basic counts
-            total_analyses = self.collection.count_documents({})
-            completed_analyses = self.collection.count_documents({'status': AnalysisStatus.COMPLETED.value})
-            failed_analyses = self.collection.count_documents({'status': AnalysisStatus.FAILED.value})
-            
-            # Recent analyses (last 7 days)
-            seven_days_ago = datetime.now() - timedelta(days=7)
-            recent_analyses = self.collection.count_documents({
-                'created_at': {'$gte': seven_days_ago}
-            })
-            
-            # Aggregation for cost and execution time
-            pipeline = [
-                {
-                    '$group': {
-                        '_id': None,
-                        'total_cost': {'$sum': '$token_usage.total_cost'},
-                        'avg_execution_time': {'$avg': '$execution_time'},
-                        'total_execution_time': {'$sum': '$execution_time'}
-                    }
-                }
-            ]
-            
-            agg_result = list(self.collection.aggregate(pipeline))
-            
-            if agg_result:
-                stats = agg_result[0]
-                total_cost = stats.get('total_cost', 0.0) or 0.0
-                avg_execution_time = stats.get('avg_execution_time', 0.0) or 0.0
-                total_execution_time = stats.get('total_execution_time', 0.0) or 0.0
-            else:
-                total_cost = 0.0
-                avg_execution_time = 0.0
-                total_execution_time = 0.0
-            
-            # Market type distribution
-            market_pipeline = [
-                {'$group': {'_id': '$market_type', 'count': {'$sum': 1}}},
-                {'$sort': {'count': -1}}
-            ]
-            market_stats = list(self.collection.aggregate(market_pipeline))
-            
-            # Status distribution
-            status_pipeline = [
-                {'$group': {'_id': '$status', 'count': {'$sum': 1}}},
-                {'$sort': {'count': -1}}
-            ]
-            status_stats = list(self.collection.aggregate(status_pipeline))
-            
-            # LLM provider distribution
-            llm_pipeline = [
-                {'$group': {'_id': '$llm_provider', 'count': {'$sum': 1}}},
-                {'$sort': {'count': -1}}
-            ]
-            llm_stats = list(self.collection.aggregate(llm_pipeline))
-            
-            # Daily analysis trend (last 30 days)
-            thirty_days_ago = datetime.now() - timedelta(days=30)
-            daily_pipeline = [
-                {
-                    '$match': {
-                        'created_at': {'$gte': thirty_days_ago}
-                    }
-                },
-                {
-                    '$group': {
-                        '_id': {
-                            '$dateToString': {
-                                'format': '%Y-%m-%d',
-                                'date': '$created_at'
-                            }
-                        },
-                        'count': {'$sum': 1}
-                    }
-                },
-                {'$sort': {'_id': 1}}
-            ]
-            daily_stats = list(self.collection.aggregate(daily_pipeline))
+            stats_result = self._read_stats_view()
+            if stats_result is None:
+                stats_result = self._compute_history_stats()
             
             stats_duration = time.time() - stats_start_time
             logger.debug(f"Statistics calculation completed in {stats_duration:.3f}s")
-            
-            stats_result = {
-                'total_analyses': total_analyses,
-                'completed_analyses': completed_analyses,
-                'failed_analyses': failed_analyses,
-                'recent_analyses': recent_analyses,
-                'success_rate': (completed_analyses / total_analyses * 100) if total_analyses > 0 else 0,
-                'total_cost': total_cost,
-                'avg_execution_time': avg_execution_time,
-                'total_execution_time': total_execution_time,
-                'market_distribution': {item['_id']: item['count'] for item in market_stats},
-                'status_distribution': {item['_id']: item['count'] for item in status_stats},
-                'llm_distribution': {item['_id']: item['count'] for item in llm_stats},
-                'daily_trend': {item['_id']: item['count'] for item in daily_stats},
-                'storage_available': True,
-                'calculation_time': stats_duration
-            }
+            stats_result['calculation_time'] = stats_duration
             
             # Cache the statistics for future requests
             self.cache_manager.cache_stats(stats_result)
@@ -933,12 +1137,178 @@ class AnalysisHistoryStorage:
                 'error': str(e)
             }
     
-    def cleanup_old_records(self, days_to_keep: int = 90) -> int:
+    def _read_stats_view(self) -> Optional[Dict[str, Any]]:
+        """
+        Build the statistics from the materialized view, refreshing it when
+        missing or older than STATS_VIEW_MAX_AGE
+        
+        Returns:
+            Statistics dictionary, or None if the view cannot be used
+        """
+        if self.database is None or not self._has_stats_view:
+            return None
+        
+        view_collection = self.database[STATS_VIEW_COLLECTION_NAME]
+        
+        try:
+            if is_stats_view_stale(view_collection, self.STATS_VIEW_MAX_AGE):
+                refresh_start_time = time.time()
+                refresh_stats_view(self.collection, view_collection)
+                logger.debug(f"Refreshed statistics view in {time.time() - refresh_start_time:.3f}s")
+            summary = summarize_stats_view(view_collection)
+        except PyMongoError as e:
+            if is_unsupported_pipeline_error(e):
+                # $merge needs MongoDB 4.2+ and $dateTrunc 5.0+; don't retry
+                self._has_stats_view = False
+            logger.debug(f"Could not use statistics view: {e}")
+            return None
+        
+        if summary['refreshed_at'] is None:
+            return None
+        
+        status_counts = summary['status_counts']
+        total_analyses = sum(status_counts.values())
+        completed_analyses = status_counts.get(AnalysisStatus.COMPLETED.value, 0)
+        execution_count = summary['execution_time_count']
+        
+        # The view buckets records by creation day, so the recent and daily
+        # windows start at midnight
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        seven_days_start = today - timedelta(days=7)
+        thirty_days_start = today - timedelta(days=30)
+        daily_counts = sorted(summary['daily_counts'].items())
+        
+        def by_count(counts: Dict[Any, int]) -> Dict[Any, int]:
+            return dict(sorted(counts.items(), key=lambda item: -item[1]))
+        
+        return {
+            'total_analyses': total_analyses,
+            'completed_analyses': completed_analyses,
+            'failed_analyses': status_counts.get(AnalysisStatus.FAILED.value, 0),
+            'recent_analyses': sum(count for day, count in daily_counts if day >= seven_days_start),
+            'success_rate': (completed_analyses / total_analyses * 100) if total_analyses > 0 else 0,
+            'total_cost': summary['cost_sum'],
+            'avg_execution_time': summary['execution_time_sum'] / execution_count if execution_count else 0.0,
+            'total_execution_time': summary['execution_time_sum'],
+            'market_distribution': by_count(summary['market_counts']),
+            'status_distribution': by_count(status_counts),
+            'llm_distribution': by_count(summary['llm_counts']),
+            'daily_trend': {
+                day.strftime('%Y-%m-%d'): count
+                for day, count in daily_counts if day >= thirty_days_start
+            },
+            'storage_available': True,
+            'stats_refreshed_at': summary['refreshed_at'].isoformat()
+        }
+    
+    def _compute_history_stats(self) -> Dict[str, Any]:
+        """Compute statistics directly from the analysis collection"""
+        # Basic counts
+        total_analyses = self.collection.count_documents({})
+        completed_analyses = self.collection.count_documents({'status': AnalysisStatus.COMPLETED.value})
+        failed_analyses = self.collection.count_documents({'status': AnalysisStatus.FAILED.value})
+        
+        # Recent analyses (last 7 days)
+        seven_days_ago = datetime.now() - timedelta(days=7)
+        recent_analyses = self.collection.count_documents({
+            'created_at': {'$gte': seven_days_ago}
+        })
+        
+        # Aggregation for cost and execution time
+        pipeline = [
+            {
+                '$group': {
+                    '_id': None,
+                    'total_cost': {'$sum': '$token_usage.total_cost'},
+                    'avg_execution_time': {'$avg': '$execution_time'},
+                    'total_execution_time': {'$sum': '$execution_time'}
+                }
+            }
+        ]
+        
+        agg_result = list(self.collection.aggregate(pipeline))
+        
+        if agg_result:
+            stats = agg_result[0]
+            total_cost = stats.get('total_cost', 0.0) or 0.0
+            avg_execution_time = stats.get('avg_execution_time', 0.0) or 0.0
+            total_execution_time = stats.get('total_execution_time', 0.0) or 0.0
+        else:
+            total_cost = 0.0
+            avg_execution_time = 0.0
+            total_execution_time = 0.0
+        
+        # Market type distribution
+        market_pipeline = [
+            {'$group': {'_id': '$market_type', 'count': {'$sum': 1}}},
+            {'$sort': {'count': -1}}
+        ]
+        market_stats = list(self.collection.aggregate(market_pipeline))
+        
+        # Status distribution
+        status_pipeline = [
+            {'$group': {'_id': '$status', 'count': {'$sum': 1}}},
+            {'$sort': {'count': -1}}
+        ]
+        status_stats = list(self.collection.aggregate(status_pipeline))
+        
+        # LLM provider distribution
+        llm_pipeline = [
+            {'$group': {'_id': '$llm_provider', 'count': {'$sum': 1}}},
+            {'$sort': {'count': -1}}
+        ]
+        llm_stats = list(self.collection.aggregate(llm_pipeline))
+        
+        # Daily analysis trend (last 30 days)
+        thirty_days_ago = datetime.now() - timedelta(days=30)
+        daily_pipeline = [
+            {
+                '$match': {
+                    'created_at': {'$gte': thirty_days_ago}
+                }
+            },
+            {
+                '$group': {
+                    '_id': {
+                        '$dateToString': {
+                            'format': '%Y-%m-%d',
+                            'date': '$created_at'
+                        }
+                    },
+                    'count': {'$sum': 1}
+                }
+            },
+            {'$sort': {'_id': 1}}
+        ]
+        daily_stats = list(self.collection.aggregate(daily_pipeline))
+        
+        return {
+            'total_analyses': total_analyses,
+            'completed_analyses': completed_analyses,
+            'failed_analyses': failed_analyses,
+            'recent_analyses': recent_analyses,
+            'success_rate': (completed_analyses / total_analyses * 100) if total_analyses > 0 else 0,
+            'total_cost': total_cost,
+            'avg_execution_time': avg_execution_time,
+            'total_execution_time': total_execution_time,
+            'market_distribution': {item['_id']: item['count'] for item in market_stats},
+            'status_distribution': {item['_id']: item['count'] for item in status_stats},
+            'llm_distribution': {item['_id']: item['count'] for item in llm_stats},
+            'daily_trend': {item['_id']: item['count'] for item in daily_stats},
+            'storage_available': True
+        }
+    
+    def cleanup_old_records(self, days_to_keep: int = 90, batch_size: Optional[int] = None) -> int:
         """
         Clean up old analysis records
         
+        Records are deleted in batches walked along the built-in _id index,
+        whose ObjectIds embed the insertion time, followed by a sweep of
+        records inserted after the cutoff but created before it.
+        
         Args:
             days_to_keep: Number of days to keep records for
+            batch_size: Records deleted per round trip (None for CLEANUP_BATCH_SIZE)
             
         Returns:
             int: Number of records deleted
@@ -947,14 +1317,26 @@ class AnalysisHistoryStorage:
             logger.warning("Storage service not available, cannot cleanup records")
             return 0
         
+        batch_size = batch_size or self.CLEANUP_BATCH_SIZE
+        
         try:
             cutoff_date = datetime.now() - timedelta(days=days_to_keep)
+            cutoff_oid = bson.ObjectId.from_datetime(
+                datetime.now(timezone.utc) - timedelta(days=days_to_keep)
+            )
             
-            result = self.collection.delete_many({
-                'created_at': {'$lt': cutoff_date}
-            })
+            # created_at never postdates insertion, so everything it selects
+            # below the cutoff ObjectId is a bounded _id index range
+            deleted_count = self._delete_in_batches(
+                {'_id': {'$lt': cutoff_oid}, 'created_at': {'$lt': cutoff_date}}, batch_size
+            )
+            
+            # Records inserted after the cutoff with an older created_at
+            # (e.g. imported history) lie outside the _id range
+            deleted_count += self._delete_in_batches(
+                {'_id': {'$gte': cutoff_oid}, 'created_at': {'$lt': cutoff_date}}, batch_size
+            )
             
-            deleted_count = result.deleted_count
             logger.info(f"Cleaned up {deleted_count} old analysis records (older than {days_to_keep} days)")
             
             return deleted_count
@@ -963,6 +1345,33 @@ class AnalysisHistoryStorage:
             logger.error(f"Error cleaning up old records: {e}")
             return 0
     
+    def _delete_in_batches(self, query: Dict[str, Any], batch_size: int) -> int:
+        """
+        Delete the records matching a query in _id order, batch_size at a time
+        
+        Args:
+            query: Filter selecting the records to delete
+            batch_size: Records deleted per round trip
+            
+        Returns:
+            int: Number of records deleted
+        """
+        deleted_count = 0
+        while True:
+            record_ids = [
+                doc['_id'] for doc in self.collection.find(query, {'_id': 1})
+                .sort('_id', ASCENDING)
+                .limit(batch_size)
+            ]
+            if not record_ids:
+                break
+            
+            deleted_count += self.collection.delete_many({'_id': {'$in': record_ids}}).deleted_count
+            if len(record_ids) < batch_size:
+                break
+        
+        return deleted_count
+    
     def get_cache_metrics(self) -> Dict[str, Any]:
         """
         Get cache performance metrics
@@ -10,9 +10,11 @@ import os
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import tempfile
 import base64
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
@@ -81,6 +83,39 @@ except ImportError as e:
     logger.info(f"请安装: pip install pypandoc markdown")
 
 
+# 历史数据格式的特征字段
+HISTORICAL_INDICATORS = frozenset({
+    'formatted_results',
+    'raw_results',
+    'analysis_id',
+    'created_at'
+})
+
+
+# 报告中各分析模块: (state字段, 标题, 说明)
+ANALYSIS_MODULES = (
+    ('market_report', '📈 市场技术分析', '技术指标、价格趋势、支撑阻力位分析'),
+    ('fundamentals_report', '💰 基本面分析', '财务数据、估值水平、盈利能力分析'),
+    ('sentiment_report', '💭 市场情绪分析', '投资者情绪、社交媒体情绪指标'),
+    ('news_report', '📰 新闻事件分析', '相关新闻事件、市场动态影响分析'),
+    ('risk_assessment', '⚠️ 风险评估', '风险因素识别、风险等级评估'),
+    ('investment_plan', '📋 投资建议', '具体投资策略、仓位管理建议')
+)
+
+
+@dataclass(frozen=True, slots=True)
+class ExtractedReport:
+    """从分析结果中提取的报告数据"""
+    stock_symbol: str
+    decision: Dict[str, Any]
+    state: Dict[str, Any]
+    metadata: Dict[str, Any]
+
+    def __iter__(self):
+        """兼容旧的元组解包用法: stock_symbol, decision, state, metadata = ..."""
+        return iter((self.stock_symbol, self.decision, self.state, self.metadata))
+
+
 class ReportExporter:
     """报告导出器"""
 
@@ -169,11 +204,14 @@ class ReportExporter:
         
         # 根据数据格式提取信息
         if is_historical:
-            stock_symbol, decision, state, metadata = self._extract_historical_data(results)
+            extracted = self._extract_historical_data(results)
         else:
-            stock_symbol, decision, state, metadata = self._extract_current_data(results)
+            extracted = self._extract_current_data(results)
         
-        stock_symbol = self._clean_text_for_markdown(stock_symbol)
+        decision = extracted.decision
+        state = extracted.state
+        metadata = extracted.metadata
+        stock_symbol = self._clean_text_for_markdown(extracted.stock_symbol)
         
         # 生成时间戳 - 对于历史报告使用原始创建时间
         if is_historical and metadata.get('created_at'):
@@ -203,10 +241,11 @@ class ReportExporter:
         is_demo = results.get('is_demo', False)
         report_type = "历史分析报告" if is_historical else ("演示模式" if is_demo else "正式分析")
         
-        md_content = f"""# {stock_symbol} 股票分析报告
+        # 使用列表收集片段，最后一次性拼接，避免字符串反复 += 带来的二次复制
+        parts = [f"""# {stock_symbol} 股票分析报告
 
 **生成时间**: {timestamp}
-**报告类型**: {report_type}"""
+**报告类型**: {report_type}"""]
 
         # Add historical metadata if available
         if is_historical:
@@ -216,12 +255,12 @@ class ReportExporter:
                     created_str = created_at.strftime('%Y-%m-%d %H:%M:%S')
                 else:
                     created_str = str(created_at)
-                md_content += f"\n**原始创建时间**: {created_str}"
+                parts.append(f"\n**原始创建时间**: {created_str}")
             
             if metadata.get('analysis_id'):
-                md_content += f"\n**分析ID**: {metadata['analysis_id']}"
+                parts.append(f"\n**分析ID**: {metadata['analysis_id']}")
 
-        md_content += f"""
+        parts.append(f"""
 
 | 指标 | 数值 |
 |------|------|
@@ -240,7 +279,7 @@ class ReportExporter:
 - **LLM提供商**: {metadata.get('llm_provider', 'N/A')}
 - **AI模型**: {metadata.get('llm_model', 'N/A')}
 - **分析师数量**: {len(metadata.get('analysts', []))}个
-- **研究深度**: {metadata.get('research_depth', 'N/A')}"""
+- **研究深度**: {metadata.get('research_depth', 'N/A')}""")
 
         # Add historical-specific information
         if is_historical:
@@ -252,15 +291,15 @@ class ReportExporter:
                     minutes = int(exec_time // 60)
                     seconds = exec_time % 60
                     exec_time_str = f"{minutes}分{seconds:.1f}秒"
-                md_content += f"\n- **执行时长**: {exec_time_str}"
+                parts.append(f"\n- **执行时长**: {exec_time_str}")
             
             if metadata.get('cost_summary'):
-                md_content += f"\n- **分析成本**: {metadata['cost_summary']}"
+                parts.append(f"\n- **分析成本**: {metadata['cost_summary']}")
             
             if metadata.get('market_type'):
-                md_content += f"\n- **市场类型**: {metadata['market_type']}"
+                parts.append(f"\n- **市场类型**: {metadata['market_type']}")
         
-        md_content += f"""
+        parts.append(f"""
 
 ### 参与分析师
 {', '.join(metadata.get('analysts', []))}
@@ -269,37 +308,24 @@ class ReportExporter:
 
 ## 📊 详细分析报告
 
-"""
+""")
         
         # 添加各个分析模块的内容
-        analysis_modules = [
-            ('market_report', '📈 市场技术分析', '技术指标、价格趋势、支撑阻力位分析'),
-            ('fundamentals_report', '💰 基本面分析', '财务数据、估值水平、盈利能力分析'),
-            ('sentiment_report', '💭 市场情绪分析', '投资者情绪、社交媒体情绪指标'),
-            ('news_report', '📰 新闻事件分析', '相关新闻事件、市场动态影响分析'),
-            ('risk_assessment', '⚠️ 风险评估', '风险因素识别、风险等级评估'),
-            ('investment_plan', '📋 投资建议', '具体投资策略、仓位管理建议')
-        ]
-        
-        for key, title, description in analysis_modules:
-            md_content += f"\n### {title}\n\n"
-            md_content += f"*{description}*\n\n"
+        for key, title, description in ANALYSIS_MODULES:
+            parts.append(f"\n### {title}\n\n*{description}*\n\n")
             
             if key in state and state[key]:
                 content = state[key]
-                if isinstance(content, str):
-                    md_content += f"{content}\n\n"
-                elif isinstance(content, dict):
+                if isinstance(content, dict):
                     for sub_key, sub_value in content.items():
-                        md_content += f"#### {sub_key.replace('_', ' ').title()}\n\n"
-                        md_content += f"{sub_value}\n\n"
+                        parts.append(f"#### {sub_key.replace('_', ' ').title()}\n\n{sub_value}\n\n")
                 else:
-                    md_content += f"{content}\n\n"
+                    parts.append(f"{content}\n\n")
             else:
-                md_content += "暂无数据\n\n"
+                parts.append("暂无数据\n\n")
         
         # 添加风险提示
-        md_content += f"""
+        parts.append(f"""
 ---
 
 ## ⚠️ 重要风险提示
@@ -313,9 +339,9 @@ class ReportExporter:
 
 ---
 *报告生成时间: {timestamp}*
-"""
+""")
         
-        return md_content
+        return "".join(parts)
     
     def _is_historical_data_format(self, results: Dict[str, Any]) -> bool:
         """
@@ -327,23 +353,15 @@ class ReportExporter:
         - 包含 analysis_id 字段
         - 包含 created_at 字段
         """
-        historical_indicators = [
-            'formatted_results',
-            'raw_results', 
-            'analysis_id',
-            'created_at'
-        ]
-        
-        # 如果包含多个历史数据特征，认为是历史格式
-        indicator_count = sum(1 for indicator in historical_indicators if indicator in results)
-        return indicator_count >= 2
+        # 如果包含多个历史数据特征，认为是历史格式（集合求交在C层完成）
+        return len(HISTORICAL_INDICATORS & results.keys()) >= 2
     
-    def _extract_historical_data(self, results: Dict[str, Any]) -> tuple:
+    def _extract_historical_data(self, results: Dict[str, Any]) -> ExtractedReport:
         """
         从历史数据格式中提取报告所需信息
         
         Returns:
-            tuple: (stock_symbol, decision, state, metadata)
+            ExtractedReport: 包含 stock_symbol, decision, state, metadata
         """
         # 从 formatted_results 中提取主要数据
         formatted_results = results.get('formatted_results', {})
@@ -376,14 +394,14 @@ class ReportExporter:
             else:
                 metadata['cost_summary'] = f"¥{cost:.2f}"
         
-        return stock_symbol, decision, state, metadata
+        return ExtractedReport(stock_symbol, decision, state, metadata)
     
-    def _extract_current_data(self, results: Dict[str, Any]) -> tuple:
+    def _extract_current_data(self, results: Dict[str, Any]) -> ExtractedReport:
         """
         从当前分析结果格式中提取报告所需信息
         
         Returns:
-            tuple: (stock_symbol, decision, state, metadata)
+            ExtractedReport: 包含 stock_symbol, decision, state, metadata
         """
         stock_symbol = results.get('stock_symbol', 'N/A')
         decision = results.get('decision', {})
@@ -400,7 +418,7 @@ class ReportExporter:
             'market_type': results.get('market_type', 'N/A')
         }
         
-        return stock_symbol, decision, state, metadata
+        return ExtractedReport(stock_symbol, decision, state, metadata)
     
     @with_error_handling(context="生成Word文档", show_user_error=False)
     @with_retry(max_attempts=2, delay=1.0, retry_on=(OSError, IOError))
@@ -720,6 +738,52 @@ class ReportExporter:
             
             return None
 
+    def export_report_batch(self, items: List[Dict[str, Any]], format_type: str,
+                            max_concurrency: int = 8) -> List[Optional[bytes]]:
+        """
+        批量导出多份报告（不显示逐条的界面进度）
+        
+        Word/PDF 导出主要耗时在 pandoc 子进程上，使用线程池并发执行；
+        Markdown 生成是纯 Python 的 CPU 计算，线程无法加速，按顺序生成。
+        
+        Args:
+            items: 分析结果列表（当前格式或历史格式均可）
+            format_type: 导出格式 ('markdown', 'docx', 'pdf')
+            max_concurrency: 最大并发数
+            
+        Returns:
+            List[Optional[bytes]]: 与输入顺序一致的导出内容，失败的条目为 None
+        """
+        generators = {
+            'markdown': lambda results: self.generate_markdown_report(results).encode('utf-8'),
+            'docx': self.generate_docx_report,
+            'pdf': self.generate_pdf_report
+        }
+        if format_type not in generators:
+            raise ValueError(f"不支持的导出格式: {format_type}")
+        
+        if not self.export_available or (format_type != 'markdown' and not self.pandoc_available):
+            logger.error(f"❌ {format_type}格式导出不可用，跳过 {len(items)} 份报告")
+            return [None] * len(items)
+        
+        generator = generators[format_type]
+        
+        def _export_one(results: Dict[str, Any]) -> Optional[bytes]:
+            if not results or not isinstance(results, dict):
+                return None
+            try:
+                return generator(results)
+            except Exception as e:
+                logger.error(f"❌ 批量导出中单份报告失败: {e}")
+                return None
+        
+        logger.info(f"🚀 开始批量导出报告: format={format_type}, count={len(items)}")
+        if format_type == 'markdown' or len(items) <= 1:
+            return [_export_one(results) for results in items]
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(items)))) as executor:
+            return list(executor.map(_export_one, items))
+
 
 # 创建全局导出器实例
 report_exporter = ReportExporter()
@@ -782,8 +846,9 @@ def render_export_buttons(results: Dict[str, Any]):
     is_historical = report_exporter._is_historical_data_format(results)
     
     if is_historical:
-        stock_symbol, _, _, metadata = report_exporter._extract_historical_data(results)
-        analysis_date = metadata.get('analysis_date')
+        extracted = report_exporter._extract_historical_data(results)
+        stock_symbol = extracted.stock_symbol
+        analysis_date = extracted.metadata.get('analysis_date')
         if isinstance(analysis_date, datetime):
             timestamp = analysis_date.strftime('%Y%m%d_%H%M%S')
         else: